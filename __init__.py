@@ -1,51 +1,60 @@
-
+"""The Prana ventilation integration."""
 from __future__ import annotations
 
+import asyncio
+from collections.abc import Iterable
+import logging
+from typing import TYPE_CHECKING
+
+from homeassistant.components import bluetooth
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant, Event
 from homeassistant.const import CONF_MAC, EVENT_HOMEASSISTANT_STOP
-from homeassistant.components import bluetooth
-
-from datetime import timedelta
-import asyncio
+from homeassistant.core import HomeAssistant, Event
+from homeassistant.exceptions import ConfigEntryNotReady
+from homeassistant.helpers import config_validation as cv
 
 from .const import DOMAIN
-from .coordinator import PranaCoordinator
-import logging
+from .services import async_setup_services
+
+if TYPE_CHECKING:
+    from .coordinator import PranaCoordinator
 
-PLATFORMS = ["fan", "switch"]
-CLIENT = "client"
-CONFIG = "config"
-SENSOR_TYPES = {
-    "voc": ["VOC", "ppb", "mdi:gauge"],
-    "co2": ["CO2", "ppm", "mdi:gauge"],
-    
-    # "temperature": ["Temperature", "°C", "mdi:thermometer"],
-    # "humidity": ["Humidity", "%", "mdi:water-percent"],
-    "speed": ["Speed", "level", "mdi:gauge"],
-}
-
-SCAN_INTERVAL = timedelta(seconds=30)
-DEFAULT_MEDIAN = 1
-CONF_MEDIAN = "median"
+PLATFORMS = ["fan", "sensor", "switch"]
 LOGGER = logging.getLogger(__name__)
 
-from homeassistant.helpers import config_validation as cv
-from homeassistant.helpers.discovery import load_platform, async_load_platform
-from homeassistant.helpers.dispatcher import dispatcher_send
-from homeassistant.helpers.event import async_track_time_interval, call_later
-from homeassistant.exceptions import ConfigEntryNotReady
-from homeassistant.const import (
-    CONF_MAC,
-    CONF_DEVICES,
-    CONF_MONITORED_CONDITIONS,
-    CONF_NAME,
-    CONF_SENSORS,
-    CONF_SCAN_INTERVAL,
-    EVENT_HOMEASSISTANT_START,
-)
-
-async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry_LOGGER) -> bool:
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+# Overall deadline for disconnecting every device on shutdown or unload
+STOP_TIMEOUT = 10
+
+
+async def async_setup(hass: HomeAssistant, config: dict) -> bool:
+    """Set up the Prana integration."""
+    async_setup_services(hass)
+
+    async def _async_stop(event: Event) -> None:
+        """Close the connections of all devices."""
+        await async_stop_coordinators(hass.data.get(DOMAIN, {}).values())
+
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _async_stop)
+    return True
+
+async def async_stop_coordinators(
+    coordinators: Iterable[PranaCoordinator], timeout: float = STOP_TIMEOUT
+) -> None:
+    """Stop coordinators concurrently, abandoning those not done within timeout."""
+    tasks = {asyncio.create_task(coordinator.stop()): coordinator for coordinator in coordinators}
+    if not tasks:
+        return
+    done, pending = await asyncio.wait(tasks, timeout=timeout)
+    for task in done:
+        if not task.cancelled() and (error := task.exception()) is not None:
+            LOGGER.warning("%s: Error while stopping: %s", tasks[task].mac, error)
+    for task in pending:
+        LOGGER.warning("%s: Did not disconnect within %s s, giving up", tasks[task].mac, timeout)
+        task.cancel()
+
+async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up PRANA from a config entry."""
     address = entry.data[CONF_MAC]
 
@@ -54,22 +63,25 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry_LOGGER) -> b
             f"Could not find Prana with address {address}. Try power cycling the device or move the bluetooth coordinator closer"
         )
 
-    coordinator = PranaCoordinator(address, hass)
+    # Imported here so loading the package for a config flow skips the BLE client
+    from .coordinator import PranaCoordinator
+
+    coordinator = PranaCoordinator(address, hass, entry.options, ble_device)
     hass.data.setdefault(DOMAIN, {})[entry.entry_id] = coordinator
+    await coordinator.async_load_runtime()
+    await coordinator.async_load_link_model()
 
     # Fetch initial data
     await coordinator.async_config_entry_first_refresh()
 
-    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
-    entry.async_on_unload(entry.add_update_listener(_async_update_listener))
+    if coordinator.export_metrics:
+        # Imported here to keep the view out of the import time of every setup
+        from .metrics import async_register_metrics_view
 
-    async def _async_stop(event: Event) -> None:
-        """Close the connection."""
-        await coordinator.stop()
+        async_register_metrics_view(hass)
 
-    entry.async_on_unload(
-        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _async_stop)
-    )
+    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    entry.async_on_unload(entry.add_update_listener(_async_update_listener))
     return True
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
@@ -77,11 +89,9 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok:
         coordinator = hass.data[DOMAIN].pop(entry.entry_id)
-        await coordinator.stop()
+        await async_stop_coordinators([coordinator])
     return unload_ok
 
 async def _async_update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
     """Handle options update."""
-    coordinator = hass.data[DOMAIN].pop(entry.entry_id)
-    if entry.title != coordinator.name:
-        await hass.config_entries.async_reload(entry.entry_id)
+    await hass.config_entries.async_reload(entry.entry_id)
@@ -0,0 +1 @@
+"""Benchmarks running the integration against the simulated Prana device."""
@@ -0,0 +1,47 @@
+"""Helpers shared by the benchmark scripts."""
+from __future__ import annotations
+
+from collections.abc import Sequence
+import json
+import statistics
+import tempfile
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+
+
+async def async_create_hass() -> HomeAssistant:
+    """Create a bare Home Assistant instance for coordinators to run in."""
+    return HomeAssistant(tempfile.mkdtemp(prefix="prana-bench-"))
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Return the pct percentile using the nearest-rank method."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def summarize(values: Sequence[float], scale: float = 1000) -> dict[str, float]:
+    """Return mean/p50/p95/p99/max of values, scaled (seconds to ms by default)."""
+    if not values:
+        return {}
+    return {
+        "mean": round(statistics.fmean(values) * scale, 3),
+        "p50": round(percentile(values, 50) * scale, 3),
+        "p95": round(percentile(values, 95) * scale, 3),
+        "p99": round(percentile(values, 99) * scale, 3),
+        "max": round(max(values) * scale, 3),
+    }
+
+
+def write_results(path: str | None, results: dict[str, Any]) -> None:
+    """Write results as JSON to path, or stdout when no path is given."""
+    text = json.dumps(results, indent=2)
+    if path is None:
+        print(text)
+        return
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(text + "\n")
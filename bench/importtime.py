@@ -0,0 +1,113 @@
+"""Import time of the integration's modules, checked against budgets.
+
+Each module is imported in a fresh interpreter under -X importtime after
+the modules Home Assistant has already loaded by the time it gets there
+(core helpers and the bluetooth dependency, plus the integration and its
+coordinator for the platforms), so only the cost the module adds is
+counted. The config flow is measured with the package it lives in, which
+Home Assistant loads for it before any entry is set up. Run from the
+Home Assistant config directory:
+
+    python -m custom_components.prana.bench.importtime --runs 5 --check
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from typing import Any
+
+from .common import write_results
+
+INTEGRATION = __package__.rsplit(".", 1)[0]
+INTEGRATION_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MARKER = "prana-importtime-start"
+
+HA_BASELINE = (
+    "homeassistant.core",
+    "homeassistant.config_entries",
+    "homeassistant.helpers.config_validation",
+    "homeassistant.helpers.entity_platform",
+    "homeassistant.helpers.update_coordinator",
+    "homeassistant.components.bluetooth",
+)
+# Platforms are loaded by async_setup_entry, after it imported the coordinator
+LOADED_INTEGRATION = HA_BASELINE + (INTEGRATION, f"{INTEGRATION}.coordinator")
+
+# (module, modules imported before it, budget in ms)
+BUDGETS = (
+    # prana_ble is imported from the integration directory, without Home Assistant,
+    # into a process that already runs asyncio
+    ("prana_ble", ("asyncio", "logging"), 10),
+    ("prana_ble.client", ("asyncio", "logging", "prana_ble"), 120),
+    (INTEGRATION, HA_BASELINE, 20),
+    (f"{INTEGRATION}.config_flow", HA_BASELINE, 28),
+    (f"{INTEGRATION}.fan", LOADED_INTEGRATION + ("homeassistant.components.fan",), 6),
+    (f"{INTEGRATION}.sensor", LOADED_INTEGRATION + ("homeassistant.components.sensor",), 8),
+    (f"{INTEGRATION}.switch", LOADED_INTEGRATION + ("homeassistant.components.switch",), 5),
+    (f"{INTEGRATION}.diagnostics", LOADED_INTEGRATION + ("homeassistant.components.diagnostics",), 3),
+)
+
+
+def measure(module: str, preload: tuple[str, ...]) -> tuple[float, list[tuple[str, float]]]:
+    """Import module after preload in a new interpreter.
+
+    Returns the milliseconds spent in imports the module triggered and
+    those imports with their own (self) time.
+    """
+    code = (
+        "import sys\n"
+        f"for name in {preload!r}: __import__(name)\n"
+        f"sys.stderr.write({MARKER!r} + '\\n')\n"
+        # importlib.import_module would bypass the timing of the module itself
+        f"__import__({module!r})\n"
+    )
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, (INTEGRATION_DIR, os.environ.get("PYTHONPATH")))))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, env=env, check=False,
+    )
+    if result.returncode:
+        raise RuntimeError(f"importing {module} failed:\n{result.stderr[-2000:]}")
+    lines = result.stderr.split(MARKER + "\n", 1)[1].splitlines()
+    imports = []
+    for line in lines:
+        if not line.startswith("import time:"):
+            continue
+        self_us, _cumulative, name = line[len("import time:"):].split("|")
+        imports.append((name.strip(), int(self_us) / 1000))
+    return sum(ms for _, ms in imports), imports
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="imports per module, the median counts")
+    parser.add_argument("--top", type=int, default=5, help="heaviest imports to list per module")
+    parser.add_argument("--check", action="store_true", help="exit with status 1 when over budget")
+    parser.add_argument("--output", help="write JSON results to this file instead of stdout")
+    args = parser.parse_args()
+
+    results: dict[str, Any] = {}
+    over_budget = []
+    for module, preload, budget in BUDGETS:
+        measure(module, preload)  # Warm up the bytecode cache
+        runs = [measure(module, preload) for _ in range(args.runs)]
+        median = statistics.median(total for total, _ in runs)
+        heaviest = sorted(runs[-1][1], key=lambda item: item[1], reverse=True)[: args.top]
+        results[module] = {
+            "ms": round(median, 2),
+            "budget_ms": budget,
+            "modules_imported": len(runs[-1][1]),
+            "heaviest": {name: round(ms, 2) for name, ms in heaviest},
+        }
+        if median > budget:
+            over_budget.append(module)
+    write_results(args.output, {"benchmark": "importtime", "over_budget": over_budget, "modules": results})
+    if args.check and over_budget:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""End-to-end command latency benchmark.
+
+Measures wall-clock latency and GATT writes of representative coordinator
+operations against the simulated device:
+
+    python -m custom_components.prana.bench.latency --latency 0.03 --output latency.json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections.abc import Awaitable, Callable
+import logging
+import time
+from typing import Any, Optional
+
+from ..coordinator import PranaCoordinator
+from ..prana_ble.codec import MAX_BRIGHTNESS
+from ..prana_ble.simulator import FIRMWARE_CO2, SimulatedPrana
+from .common import async_create_hass, summarize, write_results
+
+Setup = Callable[[SimulatedPrana], None]
+Operation = Callable[[PranaCoordinator], Awaitable[Any]]
+
+
+def _device_state(**state: Any) -> Setup:
+    """Return a setup step forcing the simulated device into a state."""
+    def _setup(device: SimulatedPrana) -> None:
+        for key, value in state.items():
+            setattr(device, key, value)
+    return _setup
+
+
+def operations() -> list[tuple[str, Optional[Setup], Operation]]:
+    """Return (name, device setup, operation) for every benchmarked path."""
+    ops: list[tuple[str, Optional[Setup], Operation]] = [
+        ("set_speed 1->10", _device_state(is_on=True, speed_locked=1, speed_in=1, speed_out=1),
+         lambda coordinator: coordinator.device.set_speed(10)),
+        ("set_speed 10->1", _device_state(is_on=True, speed_locked=10, speed_in=10, speed_out=10),
+         lambda coordinator: coordinator.device.set_speed(1)),
+        ("turn_on", _device_state(is_on=False), lambda coordinator: coordinator.device.turn_on()),
+        ("turn_off", _device_state(is_on=True), lambda coordinator: coordinator.device.turn_off()),
+        ("set_heating on", _device_state(mini_heating_enabled=False),
+         lambda coordinator: coordinator.device.set_heating(True)),
+        ("set_heating off", _device_state(mini_heating_enabled=True),
+         lambda coordinator: coordinator.device.set_heating(False)),
+        ("set_direction forward", _device_state(is_on=True, is_input_fan_on=True, is_output_fan_on=True),
+         lambda coordinator: coordinator.device.set_direction("forward")),
+        ("set_direction reverse", _device_state(is_on=True, is_input_fan_on=True, is_output_fan_on=True),
+         lambda coordinator: coordinator.device.set_direction("reverse")),
+        ("set_direction reverse from forward",
+         _device_state(is_on=True, is_input_fan_on=False, is_output_fan_on=True),
+         lambda coordinator: coordinator.device.set_direction("reverse")),
+    ]
+    for start in range(1, MAX_BRIGHTNESS + 1):
+        ops.append((
+            f"set_brightness from {start}",
+            _device_state(brightness=start),
+            # Every start level to the level below it is the longest way round
+            lambda coordinator, start=start: coordinator.device.set_brightness(
+                (start - 2) % MAX_BRIGHTNESS + 1
+            ),
+        ))
+    return ops
+
+
+async def _measure(
+    hass: Any, args: argparse.Namespace, setup: Optional[Setup], operation: Operation
+) -> dict[str, Any]:
+    device = SimulatedPrana(
+        firmware=args.firmware, latency=args.latency, jitter=args.jitter,
+        connect_latency=args.connect_latency, seed=args.seed,
+    )
+    coordinator = PranaCoordinator(device.address, hass, ble_device=device.ble_device)
+    device.attach(coordinator.device)
+    latencies, writes = [], []
+    try:
+        for _ in range(args.runs):
+            # Let frames of the previous run land, then sync the coordinator
+            # with the device outside of the measurement
+            await asyncio.sleep(2 * (args.latency + args.jitter))
+            if setup is not None:
+                setup(device)
+            await coordinator.async_read_state()
+            before = device.writes
+            start = time.perf_counter()
+            await operation(coordinator)
+            latencies.append(time.perf_counter() - start)
+            writes.append(device.writes - before)
+    finally:
+        await coordinator.stop()
+    return {"latency_ms": summarize(latencies), "gatt_writes": max(writes)}
+
+
+async def _measure_cold_connect(hass: Any, args: argparse.Namespace) -> dict[str, Any]:
+    latencies, writes = [], []
+    for run in range(args.runs):
+        device = SimulatedPrana(
+            firmware=args.firmware, latency=args.latency, jitter=args.jitter,
+            connect_latency=args.connect_latency, seed=args.seed + run,
+        )
+        coordinator = PranaCoordinator(device.address, hass, ble_device=device.ble_device)
+        device.attach(coordinator.device)
+        start = time.perf_counter()
+        await coordinator.async_read_state()
+        latencies.append(time.perf_counter() - start)
+        writes.append(device.writes)
+        await coordinator.stop()
+    return {"latency_ms": summarize(latencies), "gatt_writes": max(writes)}
+
+
+async def async_run(args: argparse.Namespace) -> dict[str, Any]:
+    hass = await async_create_hass()
+    results: dict[str, Any] = {}
+    try:
+        results["cold connect + first refresh"] = await _measure_cold_connect(hass, args)
+        for name, setup, operation in operations():
+            results[name] = await _measure(hass, args, setup, operation)
+    finally:
+        await hass.async_stop(force=True)
+    return {
+        "benchmark": "latency",
+        "config": {
+            "runs": args.runs,
+            "latency": args.latency,
+            "jitter": args.jitter,
+            "connect_latency": args.connect_latency,
+            "firmware": args.firmware,
+        },
+        "results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.03, help="one-way GATT latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--connect-latency", type=float, default=1.0)
+    parser.add_argument("--firmware", default=FIRMWARE_CO2)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write JSON results to this file instead of stdout")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    write_results(args.output, asyncio.run(async_run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Replay captured frames through a coordinator.
+
+Feeds frames recorded with the capture option back through the decoder
+and coordinator, at recorded speed or as fast as possible, and reports
+throughput and the resulting state:
+
+    python -m custom_components.prana.bench.replay prana_captures/001122334455.bin --fast
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import logging
+import time
+from typing import Any
+
+from ..prana_ble.capture import async_replay, capture_files, read_capture
+from ..coordinator import PranaCoordinator
+from ..prana_ble.simulator import SimulatedBLEDevice
+from .common import async_create_hass, write_results
+
+
+async def async_run(args: argparse.Namespace) -> dict[str, Any]:
+    files = [path for capture in args.captures for path in capture_files(capture)]
+    frames = list(itertools.chain.from_iterable(read_capture(path) for path in files))
+    if args.mac:
+        frames = [frame for frame in frames if frame.mac == args.mac.upper()]
+    macs = sorted({frame.mac for frame in frames})
+
+    hass = await async_create_hass()
+    results: dict[str, Any] = {}
+    try:
+        for mac in macs:
+            device = SimulatedBLEDevice(mac, "PRNA-REPLAY", -60)
+            coordinator = PranaCoordinator(mac, hass, ble_device=device)
+            start = time.perf_counter()
+            count = await async_replay(
+                (frame for frame in frames if frame.mac == mac),
+                coordinator.device._notification_handler,
+                None if args.fast else args.speed,
+            )
+            elapsed = time.perf_counter() - start
+            results[mac] = {
+                "frames": count,
+                "elapsed_s": round(elapsed, 3),
+                "frames_per_s": round(count / elapsed, 1) if elapsed else None,
+                "state": {
+                    "is_on": coordinator.is_on,
+                    "speed": coordinator.speed,
+                    "sensors": coordinator.sensors,
+                },
+                "stats": coordinator.stats.as_dict(),
+            }
+    finally:
+        await hass.async_stop(force=True)
+    return {"benchmark": "replay", "files": files, "devices": results}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("captures", nargs="+", help="capture files, rotated backups are picked up too")
+    parser.add_argument("--mac", help="only replay frames of this device")
+    parser.add_argument("--fast", action="store_true", help="ignore recorded timing")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed factor when not --fast")
+    parser.add_argument("--output", help="write JSON results to this file instead of stdout")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    write_results(args.output, asyncio.run(async_run(args)))
+
+
+if __name__ == "__main__":
+    main()
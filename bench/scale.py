@@ -0,0 +1,164 @@
+"""Multi-device scale test.
+
+Starts N coordinators on one event loop, all sharing a simulated adapter
+with a limited number of connection slots, drives periodic polls and random
+user commands and reports event-loop lag, connection contention and command
+latency:
+
+    python -m custom_components.prana.bench.scale --devices 20 50 100 --slots 3 --duration 120
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import random
+import time
+from typing import Any
+
+from ..coordinator import PranaCoordinator
+from ..prana_ble.simulator import SimulatedAdapter, SimulatedPrana
+from .common import async_create_hass, summarize, write_results
+
+LAG_SAMPLE_INTERVAL = 0.05
+
+
+async def _sample_loop_lag(samples: list[float], stop: asyncio.Event) -> None:
+    """Record how late the loop wakes a task up after a fixed sleep."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(LAG_SAMPLE_INTERVAL)
+        samples.append(max(0.0, time.perf_counter() - start - LAG_SAMPLE_INTERVAL))
+
+
+async def _poll(coordinator: PranaCoordinator, interval: float, stop: asyncio.Event) -> None:
+    """Poll like the coordinator's update interval would, with a random phase."""
+    await asyncio.sleep(random.uniform(0, interval))
+    while not stop.is_set():
+        await coordinator._async_update_data()
+        await asyncio.sleep(interval)
+
+
+async def _user_commands(
+    coordinator: PranaCoordinator,
+    interval: float,
+    stop: asyncio.Event,
+    latencies: list[float],
+    failures: list[str],
+) -> None:
+    """Issue random commands with exponentially distributed gaps."""
+    commands = (
+        lambda: coordinator.device.set_speed(random.randint(1, 10)),
+        lambda: coordinator.device.turn_on(),
+        lambda: coordinator.device.set_heating(random.random() < 0.5),
+        lambda: coordinator.device.set_winter_mode(random.random() < 0.5),
+    )
+    while True:
+        await asyncio.sleep(random.expovariate(1 / interval))
+        if stop.is_set():
+            return
+        start = time.perf_counter()
+        try:
+            await random.choice(commands)()
+        except Exception as err:  # pylint: disable=broad-except
+            failures.append(type(err).__name__)
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+async def async_run_scale(hass: Any, devices: int, args: argparse.Namespace) -> dict[str, Any]:
+    """Run one scale scenario with the given number of devices."""
+    random.seed(args.seed)
+    adapter = SimulatedAdapter(args.slots)
+    sims, coordinators = [], []
+    for index in range(devices):
+        sim = SimulatedPrana(
+            address=f"00:00:00:00:{index // 256:02X}:{index % 256:02X}",
+            latency=args.latency,
+            jitter=args.latency / 2,
+            connect_latency=args.connect_latency,
+            disconnect_rate=args.disconnect_rate,
+            seed=args.seed + index,
+            adapter=adapter,
+        )
+        coordinator = PranaCoordinator(sim.address, hass, ble_device=sim.ble_device)
+        sim.attach(coordinator.device)
+        sims.append(sim)
+        coordinators.append(coordinator)
+
+    stop = asyncio.Event()
+    lag: list[float] = []
+    latencies: list[float] = []
+    failures: list[str] = []
+    tasks = [asyncio.create_task(_sample_loop_lag(lag, stop))]
+    for coordinator in coordinators:
+        tasks.append(asyncio.create_task(_poll(coordinator, args.poll_interval, stop)))
+        tasks.append(asyncio.create_task(
+            _user_commands(coordinator, args.command_interval, stop, latencies, failures)
+        ))
+
+    started = time.perf_counter()
+    await asyncio.sleep(args.duration)
+    stop.set()
+    elapsed = time.perf_counter() - started
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await asyncio.gather(*(coordinator.stop() for coordinator in coordinators), return_exceptions=True)
+
+    minutes = elapsed / 60
+    return {
+        "devices": devices,
+        "duration_s": round(elapsed, 1),
+        "loop_lag_ms": summarize(lag),
+        "connect_attempts_per_min": round(adapter.connect_attempts / minutes, 1),
+        "slot_failures_per_min": round(adapter.slot_failures / minutes, 1),
+        "connects": sum(sim.connects for sim in sims),
+        "bleak_errors": sum(sim.errors for sim in sims),
+        "gatt_writes": sum(sim.writes for sim in sims),
+        "user_commands": len(latencies) + len(failures),
+        "user_command_failures": len(failures),
+        "user_command_latency_ms": summarize(latencies),
+    }
+
+
+async def async_run(args: argparse.Namespace) -> dict[str, Any]:
+    hass = await async_create_hass()
+    try:
+        scenarios = [await async_run_scale(hass, devices, args) for devices in args.devices]
+    finally:
+        await hass.async_stop(force=True)
+    return {
+        "benchmark": "scale",
+        "config": {
+            "slots": args.slots,
+            "duration": args.duration,
+            "poll_interval": args.poll_interval,
+            "command_interval": args.command_interval,
+            "latency": args.latency,
+            "connect_latency": args.connect_latency,
+            "disconnect_rate": args.disconnect_rate,
+        },
+        "scenarios": scenarios,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, nargs="+", default=[20, 50, 100])
+    parser.add_argument("--slots", type=int, default=3, help="connection slots shared by all devices")
+    parser.add_argument("--duration", type=float, default=120, help="seconds per scenario")
+    parser.add_argument("--poll-interval", type=float, default=30)
+    parser.add_argument("--command-interval", type=float, default=60, help="mean seconds between user commands per device")
+    parser.add_argument("--latency", type=float, default=0.03)
+    parser.add_argument("--connect-latency", type=float, default=1.5)
+    parser.add_argument("--disconnect-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write JSON results to this file instead of stdout")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.CRITICAL)
+    write_results(args.output, asyncio.run(async_run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Bounded concurrent jobs across devices, shared by services and the config flow.
+
+Kept free of the coordinator and the BLE client so the config flow can
+use it without importing them.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable, Iterable
+import logging
+from operator import attrgetter
+import time
+from typing import Any, TypeVar
+
+from homeassistant.components import bluetooth
+from homeassistant.core import HomeAssistant
+
+from .const import CONNECTION_SLOTS_PER_ADAPTER
+
+LOGGER = logging.getLogger(__name__)
+_T = TypeVar("_T")
+
+
+def default_concurrency(hass: HomeAssistant) -> int:
+    """Return how many devices can be talked to at once with the known adapters."""
+    scanners = bluetooth.async_scanner_count(hass, connectable=True)
+    return max(1, scanners * CONNECTION_SLOTS_PER_ADAPTER)
+
+
+async def async_run_limited(
+    targets: Iterable[_T],
+    job: Callable[[_T], Awaitable[Any]],
+    limit: int,
+    timeout: float | None = None,
+    key: Callable[[_T], str] = attrgetter("mac"),
+) -> dict[str, dict[str, Any]]:
+    """Run job on every target (a coordinator by default) with at most limit in flight.
+
+    Returns per-device results keyed by MAC: time spent waiting for a slot,
+    completion latency measured from the start of the call and the error
+    if the job failed.
+    """
+    semaphore = asyncio.Semaphore(limit)
+    started = time.monotonic()
+
+    async def _run(target: _T) -> tuple[str, dict[str, Any]]:
+        async with semaphore:
+            queued = time.monotonic() - started
+            result: dict[str, Any] = {"success": True, "queued": round(queued, 3)}
+            try:
+                async with asyncio.timeout(timeout):
+                    await job(target)
+            except Exception as err:  # pylint: disable=broad-except
+                LOGGER.warning("%s: failed: %s", key(target), err or type(err).__name__)
+                result["success"] = False
+                result["error"] = str(err) or type(err).__name__
+            result["latency"] = round(time.monotonic() - started, 3)
+            return key(target), result
+
+    return dict(await asyncio.gather(*(_run(target) for target in targets)))
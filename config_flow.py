@@ -1,20 +1,56 @@
 import asyncio
-from .coordinator import PranaCoordinator
-from .const import DOMAIN
+from .const import (
+    CONF_CAPTURE_FRAMES,
+    CONF_DCV_CO2_TARGET,
+    CONF_DCV_DEADBAND,
+    CONF_DCV_MAX_SPEED,
+    CONF_DCV_MIN_INTERVAL,
+    CONF_DCV_MIN_SPEED,
+    CONF_DCV_MODE,
+    CONF_DCV_VOC_TARGET,
+    CONF_DEADBAND_CO2,
+    CONF_DEADBAND_HUMIDITY,
+    CONF_DEADBAND_PRESSURE,
+    CONF_DEADBAND_TEMPERATURE,
+    CONF_DEADBAND_VOC,
+    CONF_EXPORT_METRICS,
+    CONF_HALF_OPEN_REQUESTS,
+    CONF_MAX_PUBLISH_INTERVAL,
+    CONF_MIN_PUBLISH_INTERVAL,
+    DCV_MODE_OFF,
+    DCV_MODES,
+    DEFAULT_DCV_CO2_TARGET,
+    DEFAULT_DCV_DEADBAND,
+    DEFAULT_DCV_MAX_SPEED,
+    DEFAULT_DCV_MIN_INTERVAL,
+    DEFAULT_DCV_MIN_SPEED,
+    DEFAULT_DCV_VOC_TARGET,
+    DEFAULT_DEADBAND_CO2,
+    DEFAULT_DEADBAND_HUMIDITY,
+    DEFAULT_DEADBAND_PRESSURE,
+    DEFAULT_DEADBAND_TEMPERATURE,
+    DEFAULT_DEADBAND_VOC,
+    DEFAULT_HALF_OPEN_REQUESTS,
+    DEFAULT_MAX_PUBLISH_INTERVAL,
+    DEFAULT_MIN_PUBLISH_INTERVAL,
+    DOMAIN,
+)
+from .discovery import DiscoveredDevice, async_get_discovery_index
+from .concurrency import async_run_limited, default_concurrency
 
 from typing import Any
 
 from homeassistant import config_entries
 from homeassistant.const import CONF_MAC
+from homeassistant.core import callback
+from homeassistant.helpers import config_validation as cv
 import voluptuous as vol
 from homeassistant.helpers.device_registry import format_mac
-from homeassistant.data_entry_flow import FlowResult
+from homeassistant.data_entry_flow import FlowResult, FlowResultType
 from homeassistant.components.bluetooth import (
     BluetoothServiceInfoBleak,
-    async_discovered_service_info,
+    async_ble_device_from_address,
 )
-from bluetooth_sensor_state_data import BluetoothData
-from home_assistant_bluetooth import BluetoothServiceInfo
 
 import logging
 
@@ -22,42 +58,25 @@ LOGGER = logging.getLogger(__name__)
 DATA_SCHEMA = vol.Schema({("host"): str})
 
 MANUAL_MAC = "manual"
+BULK_ADD = "bulk"
+CONF_DEVICES = "devices"
+# Deadline for connecting and reading one state frame
+VALIDATE_TIMEOUT = 20
 
-class DeviceData(BluetoothData):
-    def __init__(self, discovery_info) -> None:
-        self._discovery = discovery_info
-
-    def supported(self):
-        return self._discovery.name.lower().startswith("prna")
-
-    def address(self):
-        return self._discovery.address
-
-    def get_device_name(self):
-        return self._discovery.name
-
-    def name(self):
-        return self._discovery.name
-
-    def rssi(self):
-        return self._discovery.rssi
-
-    def _start_update(self, service_info: BluetoothServiceInfo) -> None:
-        """Update from BLE advertisement data."""
-        LOGGER.debug("Parsing Govee BLE advertisement data: %s", service_info)
-        
 class BLEDOMFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
     VERSION = 1
     CONNECTION_CLASS = config_entries.CONN_CLASS_LOCAL_POLL
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry: config_entries.ConfigEntry) -> "PranaOptionsFlow":
+        return PranaOptionsFlow()
+
     def __init__(self) -> None:
         self.mac = None
         self._device = None
-        self._instance = None
         self.name = None
         self._discovery_info: BluetoothServiceInfoBleak | None = None
-        self._discovered_device: DeviceData | None = None
-        self._discovered_devices = []
 
     async def async_step_bluetooth(
         self, discovery_info: BluetoothServiceInfoBleak
@@ -66,9 +85,8 @@ class BLEDOMFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
         LOGGER.debug("Discovered bluetooth devices, step bluetooth, : %s , %s", discovery_info.address, discovery_info.name)
         await self.async_set_unique_id(discovery_info.address)
         self._abort_if_unique_id_configured()
-        device = DeviceData(discovery_info)
-        if device.supported():
-            self._discovered_devices.append(device)
+        if async_get_discovery_index(self.hass).update(discovery_info):
+            self._discovery_info = discovery_info
             return await self.async_step_bluetooth_confirm()
         else:
             return self.async_abort(reason="not_supported")
@@ -88,71 +106,105 @@ class BLEDOMFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
         if user_input is not None:
             if user_input[CONF_MAC] == MANUAL_MAC:
                 return await self.async_step_manual()
+            if user_input[CONF_MAC] == BULK_ADD:
+                return await self.async_step_bulk()
             self.mac = user_input[CONF_MAC]
-            self.name = user_input["name"]
             await self.async_set_unique_id(self.mac, raise_on_progress=False)
             self._abort_if_unique_id_configured()
+            device = async_get_discovery_index(self.hass).get(self.mac)
+            self.name = user_input.get("name") or (device.name if device is not None else self.mac)
             return await self.async_step_validate()
 
-        current_addresses = self._async_current_ids()
-        for discovery_info in async_discovered_service_info(self.hass):
-            self.mac = discovery_info.address
-            if self.mac in current_addresses:
-                LOGGER.debug("Device %s in current_addresses", (self.mac))
-                continue
-            if (device for device in self._discovered_devices if device.address == self.mac) == ([]):
-                LOGGER.debug("Device %s in discovered_devices", (device))
-                continue
-            device = DeviceData(discovery_info)
-            if device.supported():
-                self._discovered_devices.append(device)
-        
-        if not self._discovered_devices:
+        devices = self._discovered()
+        if not devices:
             return await self.async_step_manual()
 
-        LOGGER.debug("Discovered supported devices: %s - %s", self._discovered_devices[0].name(), self._discovered_devices[0].address())
+        LOGGER.debug("Discovered supported devices: %s", list(devices))
+        choices = {address: device.label() for address, device in devices.items()}
+        if len(devices) > 1:
+            choices[BULK_ADD] = "Add several discovered devices at once"
+        choices[MANUAL_MAC] = "Manually add a MAC address"
 
         return self.async_show_form(
             step_id="user", data_schema=vol.Schema(
                 {
-                    vol.Required(CONF_MAC): vol.In(
-                        {
-                            ##TODO: Show all supported devices
-                            self._discovered_devices[0].address(): self._discovered_devices[0].name(),
-                            MANUAL_MAC: "Manually add a MAC address",
-                        }
-                    ),
-                    vol.Required("name"): str
+                    vol.Required(CONF_MAC): vol.In(choices),
+                    vol.Optional("name"): str
                 }
             ),
             errors={})
 
-    async def async_step_validate(self, user_input: "dict[str, Any] | None" = None):
+    def _discovered(self) -> dict[str, DiscoveredDevice]:
+        """Return the discovered devices that are not configured yet, best ranked first."""
+        devices = async_get_discovery_index(self.hass).ranked(exclude=self._async_current_ids())
+        return {device.address: device for device in devices}
+
+    async def async_step_bulk(self, user_input: "dict[str, Any] | None" = None):
+        """Validate several discovered devices concurrently and add the ones that answer."""
+        devices = self._discovered()
+        errors = {}
+        placeholders = {"failed": ""}
         if user_input is not None:
-            if "flicker" in user_input:
-                if user_input["flicker"]:
-                    return self.async_create_entry(title=self.name, data={CONF_MAC: self.mac, "name": self.name})
-                return self.async_abort(reason="cannot_validate")
-            
-            if "retry" in user_input and not user_input["retry"]:
-                return self.async_abort(reason="cannot_connect")
+            selected = {address: devices[address].name for address in user_input[CONF_DEVICES] if address in devices}
+            results = await async_run_limited(
+                selected,
+                lambda address: self.validate(address, selected[address]),
+                default_concurrency(self.hass),
+                VALIDATE_TIMEOUT,
+                key=str,
+            )
+            added = []
+            for address, result in results.items():
+                if not result["success"]:
+                    continue
+                flow_result = await self.hass.config_entries.flow.async_init(
+                    DOMAIN,
+                    context={"source": config_entries.SOURCE_IMPORT},
+                    data={CONF_MAC: address, "name": selected[address]},
+                )
+                if flow_result["type"] == FlowResultType.CREATE_ENTRY:
+                    added.append(address)
+                else:
+                    LOGGER.debug("%s: Not added: %s", address, flow_result.get("reason"))
+            failed = [address for address in results if address not in added]
+            if not failed:
+                return self.async_abort(reason="bulk_added", description_placeholders={"count": str(len(added))})
+            devices = {address: devices[address] for address in failed}
+            errors["base"] = "bulk_connect"
+            placeholders["failed"] = ", ".join(device.label() for device in devices.values())
+
+        return self.async_show_form(
+            step_id="bulk", data_schema=vol.Schema(
+                {
+                    vol.Required(CONF_DEVICES, default=list(devices)): cv.multi_select(
+                        {address: device.label() for address, device in devices.items()}
+                    ),
+                }
+            ), errors=errors, description_placeholders=placeholders)
 
-        error = await self.turn_on()
+    async def async_step_import(self, import_data: dict[str, Any]) -> FlowResult:
+        """Create an entry for a device validated by the bulk step."""
+        # Creating the entry aborts a bluetooth discovery flow for the same device
+        await self.async_set_unique_id(import_data[CONF_MAC], raise_on_progress=False)
+        self._abort_if_unique_id_configured()
+        return self.async_create_entry(title=import_data["name"], data=import_data)
 
-        if error:
+    async def async_step_validate(self, user_input: "dict[str, Any] | None" = None):
+        if user_input is not None and not user_input.get("retry"):
+            return self.async_abort(reason="cannot_connect")
+
+        try:
+            await self.validate(self.mac, self.name)
+        except Exception:  # pylint: disable=broad-except
+            LOGGER.debug("Error talking to prana.", exc_info=True)
             return self.async_show_form(
                 step_id="validate", data_schema=vol.Schema(
                     {
                         vol.Required("retry"): bool
                     }
                 ), errors={"base": "connect"})
-        
-        return self.async_show_form(
-            step_id="validate", data_schema=vol.Schema(
-                {
-                    vol.Required("flicker"): bool
-                }
-            ), errors={})
+
+        return self.async_create_entry(title=self.name, data={CONF_MAC: self.mac, "name": self.name})
 
     async def async_step_manual(self, user_input: "dict[str, Any] | None" = None):
         if user_input is not None:            
@@ -169,21 +221,49 @@ class BLEDOMFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
                 }
             ), errors={})
 
-    async def turn_on(self):
-        if not self._instance:
-            self._instance = PranaCoordinator(self.mac, self.hass)
+    async def validate(self, address: str, name: str | None = None) -> None:
+        """Connect and read one state frame, without changing anything on the device."""
+        # Only needed once the user validates a device, so import on demand
+        from .prana_ble.client import PranaDevice
+
+        ble_device = async_ble_device_from_address(self.hass, address, connectable=True)
+        if ble_device is None:
+            raise ValueError(f"{address} is not in range of a connectable adapter")
+        device = PranaDevice(ble_device, name=name)
         try:
-            await self._instance._async_update_data()
-            if self._instance.is_on:
-                await self._instance.turn_off()
-                await asyncio.sleep(2)
-                await self._instance.turn_on()
-            else:
-                await self._instance.turn_on()
-                await asyncio.sleep(2)
-                await self._instance.turn_off()
-        except (Exception) as error:
-            LOGGER.debug("Error talking to prana.", exc_info=True)
-            return error
+            async with asyncio.timeout(VALIDATE_TIMEOUT):
+                await device.async_read_state(VALIDATE_TIMEOUT)
         finally:
-            await self._instance.stop()
+            await device.stop()
+
+
+class PranaOptionsFlow(config_entries.OptionsFlow):
+    """Handle Prana options; the base class provides self.config_entry."""
+
+    async def async_step_init(self, user_input: "dict[str, Any] | None" = None):
+        if user_input is not None:
+            return self.async_create_entry(title="", data=user_input)
+
+        options = self.config_entry.options
+        return self.async_show_form(
+            step_id="init", data_schema=vol.Schema(
+                {
+                    vol.Required(CONF_DCV_MODE, default=options.get(CONF_DCV_MODE, DCV_MODE_OFF)): vol.In(DCV_MODES),
+                    vol.Required(CONF_DCV_CO2_TARGET, default=options.get(CONF_DCV_CO2_TARGET, DEFAULT_DCV_CO2_TARGET)): vol.All(vol.Coerce(int), vol.Range(min=400, max=5000)),
+                    vol.Required(CONF_DCV_VOC_TARGET, default=options.get(CONF_DCV_VOC_TARGET, DEFAULT_DCV_VOC_TARGET)): vol.All(vol.Coerce(int), vol.Range(min=1, max=10000)),
+                    vol.Required(CONF_DCV_DEADBAND, default=options.get(CONF_DCV_DEADBAND, DEFAULT_DCV_DEADBAND)): vol.All(vol.Coerce(float), vol.Range(min=0, max=100)),
+                    vol.Required(CONF_DCV_MIN_SPEED, default=options.get(CONF_DCV_MIN_SPEED, DEFAULT_DCV_MIN_SPEED)): vol.All(vol.Coerce(int), vol.Range(min=1, max=10)),
+                    vol.Required(CONF_DCV_MAX_SPEED, default=options.get(CONF_DCV_MAX_SPEED, DEFAULT_DCV_MAX_SPEED)): vol.All(vol.Coerce(int), vol.Range(min=1, max=10)),
+                    vol.Required(CONF_DCV_MIN_INTERVAL, default=options.get(CONF_DCV_MIN_INTERVAL, DEFAULT_DCV_MIN_INTERVAL)): vol.All(vol.Coerce(int), vol.Range(min=0, max=3600)),
+                    vol.Required(CONF_DEADBAND_CO2, default=options.get(CONF_DEADBAND_CO2, DEFAULT_DEADBAND_CO2)): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                    vol.Required(CONF_DEADBAND_VOC, default=options.get(CONF_DEADBAND_VOC, DEFAULT_DEADBAND_VOC)): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                    vol.Required(CONF_DEADBAND_TEMPERATURE, default=options.get(CONF_DEADBAND_TEMPERATURE, DEFAULT_DEADBAND_TEMPERATURE)): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                    vol.Required(CONF_DEADBAND_HUMIDITY, default=options.get(CONF_DEADBAND_HUMIDITY, DEFAULT_DEADBAND_HUMIDITY)): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                    vol.Required(CONF_DEADBAND_PRESSURE, default=options.get(CONF_DEADBAND_PRESSURE, DEFAULT_DEADBAND_PRESSURE)): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                    vol.Required(CONF_MIN_PUBLISH_INTERVAL, default=options.get(CONF_MIN_PUBLISH_INTERVAL, DEFAULT_MIN_PUBLISH_INTERVAL)): vol.All(vol.Coerce(int), vol.Range(min=0, max=3600)),
+                    vol.Required(CONF_MAX_PUBLISH_INTERVAL, default=options.get(CONF_MAX_PUBLISH_INTERVAL, DEFAULT_MAX_PUBLISH_INTERVAL)): vol.All(vol.Coerce(int), vol.Range(min=1, max=86400)),
+                    vol.Required(CONF_CAPTURE_FRAMES, default=options.get(CONF_CAPTURE_FRAMES, False)): bool,
+                    vol.Required(CONF_HALF_OPEN_REQUESTS, default=options.get(CONF_HALF_OPEN_REQUESTS, DEFAULT_HALF_OPEN_REQUESTS)): vol.All(vol.Coerce(int), vol.Range(min=0, max=20)),
+                    vol.Required(CONF_EXPORT_METRICS, default=options.get(CONF_EXPORT_METRICS, False)): bool,
+                }
+            ), errors={})
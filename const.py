@@ -1,46 +1,68 @@
-import datetime
 from enum import Enum
 
-from typing import NamedTuple, List, Optional
+from .prana_ble.state import PranaSensorsState, PranaState, Speed  # noqa: F401
 
 DOMAIN = "prana"
 
-class Speed(Enum):
-    OFF = 0
-    LOW = 1
-    HIGH = 10
-    SPEED_2 = 2
-    SPEED_3 = 3
-    SPEED_4 = 4
-    SPEED_5 = 5
-    SPEED_6 = 6
-    SPEED_7 = 7
-    SPEED_8 = 8
-    SPEED_9 = 9
-
-    @classmethod
-    def all_options(cls) -> List[str]:
-        return ["low", "l", "high", "h", "off", "stop", "2", "3", "4", "5", "6", "7", "8", "9"]
-
-    @classmethod
-    def from_str(cls, speed: str) -> "Speed":
-        speed = str(speed).lower().strip()
-        if speed in ["low", "l"]:
-            return cls.LOW
-        if speed in ["high", "h"]:
-            return cls.HIGH
-        if speed in ["off", "stop"]:
-            return cls.OFF
-        try:
-            speed_int = int(speed)
-            if 0 <= speed_int <= 10:
-                return cls(speed_int)
-        except ValueError:
-            pass
-        raise ValueError("String {} is not valid speed identifier".format(speed))
-
-    def to_int(self) -> int:
-        return int(self.value)
+# Concurrent connections a single bluetooth adapter or proxy can hold.
+CONNECTION_SLOTS_PER_ADAPTER = 3
+
+SERVICE_APPLY_TO_GROUP = "apply_to_group"
+SERVICE_GET_STATES = "get_states"
+SERVICE_PROFILE = "profile"
+SERVICE_SCHEDULE = "schedule"
+
+# Estimated air flow of one fan in m³/h per speed level (Prana 150, 0 = off)
+AIRFLOW_PER_SPEED = [0, 11, 23, 34, 46, 57, 69, 80, 92, 103, 115]
+
+# Demand controlled ventilation options
+CONF_DCV_MODE = "dcv_mode"
+CONF_DCV_CO2_TARGET = "dcv_co2_target"
+CONF_DCV_VOC_TARGET = "dcv_voc_target"
+CONF_DCV_DEADBAND = "dcv_deadband"
+CONF_DCV_MIN_SPEED = "dcv_min_speed"
+CONF_DCV_MAX_SPEED = "dcv_max_speed"
+CONF_DCV_MIN_INTERVAL = "dcv_min_interval"
+
+DCV_MODE_OFF = "off"
+DCV_MODE_HYSTERESIS = "hysteresis"
+DCV_MODE_PI = "pi"
+DCV_MODES = [DCV_MODE_OFF, DCV_MODE_HYSTERESIS, DCV_MODE_PI]
+
+DEFAULT_DCV_CO2_TARGET = 800
+DEFAULT_DCV_VOC_TARGET = 300
+DEFAULT_DCV_DEADBAND = 10  # percent of target
+DEFAULT_DCV_MIN_SPEED = 1
+DEFAULT_DCV_MAX_SPEED = 10
+DEFAULT_DCV_MIN_INTERVAL = 60  # seconds between speed changes
+
+# Raw frame capture, written below the config directory
+CONF_CAPTURE_FRAMES = "capture_frames"
+CAPTURE_DIR = "prana_captures"
+
+# Unanswered state requests before a connected link is reconnected, 0 disables
+CONF_HALF_OPEN_REQUESTS = "half_open_requests"
+DEFAULT_HALF_OPEN_REQUESTS = 3
+
+# Prometheus metrics at /api/prana/metrics
+CONF_EXPORT_METRICS = "export_metrics"
+
+# Sensor publish filtering options
+CONF_DEADBAND_CO2 = "deadband_co2"
+CONF_DEADBAND_VOC = "deadband_voc"
+CONF_DEADBAND_TEMPERATURE = "deadband_temperature"
+CONF_DEADBAND_HUMIDITY = "deadband_humidity"
+CONF_DEADBAND_PRESSURE = "deadband_pressure"
+CONF_MIN_PUBLISH_INTERVAL = "min_publish_interval"
+CONF_MAX_PUBLISH_INTERVAL = "max_publish_interval"
+
+DEFAULT_DEADBAND_CO2 = 20  # ppm
+DEFAULT_DEADBAND_VOC = 10  # ppb
+DEFAULT_DEADBAND_TEMPERATURE = 0.3  # °C
+DEFAULT_DEADBAND_HUMIDITY = 1  # %
+DEFAULT_DEADBAND_PRESSURE = 1  # mmHg
+DEFAULT_MIN_PUBLISH_INTERVAL = 10  # seconds
+DEFAULT_MAX_PUBLISH_INTERVAL = 600  # seconds
 
 class Mode(Enum):
     NORMAL = "normal"
@@ -48,91 +70,6 @@ class Mode(Enum):
     HIGH = "high"
 
 
-class PranaSensorsState(object):
-    def __init__(self) -> None:
-        self.temperature_in: Optional[float] = None
-        self.temperature_out: Optional[float] = None
-        self.humidity: Optional[int] = None
-        self.pressure: Optional[int] = None
-        self.voc: Optional[int] = None
-        self.co2: Optional[int] = None
-
-    def __repr__(self):
-        return (
-            "Temperature: (in: {}, out: {}), Humidity: {}, Pressure: {}".format(
-                self.temperature_in, self.temperature_out, self.humidity, self.pressure
-            )
-            + ", VOC: {}, CO2: {}".format(self.voc, self.co2)
-            if self.co2 is not None or self.voc is not None
-            else ""
-        )
-
-    def to_dict(self) -> dict:
-        return dict(
-            temperature_in=self.temperature_in,
-            temperature_out=self.temperature_out,
-            humidity=self.humidity,
-            pressure=self.pressure,
-            voc=self.voc,
-            co2=self.co2,
-        )
-
-
-class PranaState(object):
-    def __init__(self) -> None:
-        self.speed_locked: Optional[int] = None
-        self.speed_in: Optional[int] = None
-        self.speed_out: Optional[int] = None
-        self.night_mode: Optional[bool] = None
-        self.auto_mode: Optional[bool] = None
-        self.flows_locked: Optional[bool] = None
-        self.is_on: Optional[bool] = None
-        self.mini_heating_enabled: Optional[bool] = None
-        self.winter_mode_enabled: Optional[bool] = None
-        self.is_input_fan_on: Optional[bool] = None
-        self.is_output_fan_on: Optional[bool] = None
-        self.brightness: Optional[int] = None
-        self.sensors: Optional[PranaSensorsState] = None
-        self.timestamp: Optional[datetime.datetime] = None
-
-    @property
-    def speed(self):
-        if not self.is_on:
-            return 0
-        return self.speed_locked if self.flows_locked else int((self.speed_in + self.speed_out) / 2)
-
-    def __repr__(self):
-        res = "Prana state: {}, Speed: {}, Winter Mode: {}, Heating: {}, Flows locked: {}, Brightness: {}".format(
-            "RUNNING" if self.is_on else "IDLE",
-            self.speed,
-            self.winter_mode_enabled,
-            self.mini_heating_enabled,
-            self.flows_locked,
-            self.brightness,
-        )
-        if self.sensors is not None:
-            res += " Sensors: {" + repr(self.sensors) + "}"
-        return res
-
-    def to_dict(self) -> dict:
-        return dict(
-            speed_locked=self.speed_locked,
-            speed_in=self.speed_in,
-            speed_out=self.speed_out,
-            night_mode=self.night_mode,
-            auto_mode=self.auto_mode,
-            flows_locked=self.flows_locked,
-            is_on=self.is_on,
-            mini_heating_enabled=self.mini_heating_enabled,
-            winter_mode_enabled=self.winter_mode_enabled,
-            is_input_fan_on=self.is_input_fan_on,
-            is_output_fan_on=self.is_output_fan_on,
-            timestamp=self.timestamp if self.timestamp is not None else None,
-            speed=self.speed,
-            brightness=self.brightness,
-            sensors=self.sensors.to_dict() if self.sensors is not None else None,
-        )
-
 class EFFECTS (Enum):
     jump_red_green_blue = 0x87
     jump_red_green_blue_yellow_cyan_magenta_white = 0x88
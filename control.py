@@ -0,0 +1,117 @@
+"""Demand controlled ventilation: map CO2/VOC readings to a fan speed."""
+from __future__ import annotations
+
+from collections.abc import Mapping
+from typing import Any, Optional
+
+from .const import (
+    CONF_DCV_CO2_TARGET,
+    CONF_DCV_DEADBAND,
+    CONF_DCV_MAX_SPEED,
+    CONF_DCV_MIN_INTERVAL,
+    CONF_DCV_MIN_SPEED,
+    CONF_DCV_MODE,
+    CONF_DCV_VOC_TARGET,
+    DCV_MODE_HYSTERESIS,
+    DCV_MODE_OFF,
+    DCV_MODE_PI,
+    DEFAULT_DCV_CO2_TARGET,
+    DEFAULT_DCV_DEADBAND,
+    DEFAULT_DCV_MAX_SPEED,
+    DEFAULT_DCV_MIN_INTERVAL,
+    DEFAULT_DCV_MIN_SPEED,
+    DEFAULT_DCV_VOC_TARGET,
+)
+
+# Proportional gain: a reading 100% above target asks for the full speed range.
+PI_KP = 1.0
+# Integral gain per second: a sustained 100% excess ramps the full range in 10 minutes.
+PI_KI = 1 / 600
+
+
+class DemandController:
+    """Hysteresis or PI controller turning air quality readings into a target speed.
+
+    The error is the relative excess of the worst sensor over its target,
+    e.g. 1200 ppm CO2 with an 800 ppm target is an error of 0.5. Errors
+    inside the deadband are treated as zero, and no new speed is returned
+    until min_interval seconds have passed since the last one.
+    """
+
+    def __init__(
+        self,
+        mode: str = DCV_MODE_HYSTERESIS,
+        co2_target: int = DEFAULT_DCV_CO2_TARGET,
+        voc_target: int = DEFAULT_DCV_VOC_TARGET,
+        deadband: float = DEFAULT_DCV_DEADBAND,
+        min_speed: int = DEFAULT_DCV_MIN_SPEED,
+        max_speed: int = DEFAULT_DCV_MAX_SPEED,
+        min_interval: float = DEFAULT_DCV_MIN_INTERVAL,
+    ) -> None:
+        self.mode = mode
+        self.co2_target = co2_target
+        self.voc_target = voc_target
+        self.deadband = deadband / 100
+        self.min_speed = min_speed
+        self.max_speed = max(min_speed, max_speed)
+        self.min_interval = min_interval
+        self._integral = 0.0
+        self._last_update: Optional[float] = None
+        self._last_command: Optional[float] = None
+
+    @classmethod
+    def from_options(cls, options: Mapping[str, Any]) -> Optional["DemandController"]:
+        """Build a controller from config entry options, None when disabled."""
+        mode = options.get(CONF_DCV_MODE, DCV_MODE_OFF)
+        if mode == DCV_MODE_OFF:
+            return None
+        return cls(
+            mode=mode,
+            co2_target=options.get(CONF_DCV_CO2_TARGET, DEFAULT_DCV_CO2_TARGET),
+            voc_target=options.get(CONF_DCV_VOC_TARGET, DEFAULT_DCV_VOC_TARGET),
+            deadband=options.get(CONF_DCV_DEADBAND, DEFAULT_DCV_DEADBAND),
+            min_speed=options.get(CONF_DCV_MIN_SPEED, DEFAULT_DCV_MIN_SPEED),
+            max_speed=options.get(CONF_DCV_MAX_SPEED, DEFAULT_DCV_MAX_SPEED),
+            min_interval=options.get(CONF_DCV_MIN_INTERVAL, DEFAULT_DCV_MIN_INTERVAL),
+        )
+
+    def error(self, co2: Optional[int], voc: Optional[int]) -> Optional[float]:
+        """Return the relative excess of the worst sensor, None without readings."""
+        errors = []
+        if co2 and self.co2_target:
+            errors.append(co2 / self.co2_target - 1)
+        if voc and self.voc_target:
+            errors.append(voc / self.voc_target - 1)
+        if not errors:
+            return None
+        error = max(errors)
+        return 0.0 if abs(error) <= self.deadband else error
+
+    def update(self, co2: Optional[int], voc: Optional[int], speed: int, now: float) -> Optional[int]:
+        """Feed one reading; return a new speed to apply or None to keep the current one."""
+        error = self.error(co2, voc)
+        elapsed = now - self._last_update if self._last_update is not None else 0.0
+        self._last_update = now
+        if error is None:
+            return None
+
+        span = self.max_speed - self.min_speed
+        if self.mode == DCV_MODE_PI:
+            # Integrate only outside the deadband and clamp to avoid wind-up.
+            self._integral = min(max(self._integral + PI_KI * error * elapsed, 0.0), 1.0)
+            output = min(max(PI_KP * error + self._integral, 0.0), 1.0)
+            target = self.min_speed + round(output * span)
+        elif error > 0:
+            target = speed + 1
+        elif error < 0:
+            target = speed - 1
+        else:
+            target = speed
+        target = min(max(target, self.min_speed), self.max_speed)
+
+        if target == speed:
+            return None
+        if self._last_command is not None and now - self._last_command < self.min_interval:
+            return None
+        self._last_command = now
+        return target
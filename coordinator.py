@@ -1,164 +1,141 @@
+from __future__ import annotations
+
 import asyncio
 from datetime import datetime, timedelta
-import binascii 
-import async_timeout
+import logging
+import time
+import traceback
+from collections.abc import Awaitable, Callable, Mapping
+from typing import TYPE_CHECKING, Any, Optional
 
 from homeassistant.components import bluetooth
-from homeassistant.helpers.dispatcher import dispatcher_send
-from homeassistant.helpers.update_coordinator import (
-    CoordinatorEntity,
-    DataUpdateCoordinator,
-    UpdateFailed,
+from homeassistant.core import callback
+from homeassistant.helpers.event import async_call_later, async_track_point_in_utc_time
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    CAPTURE_DIR,
+    CONF_CAPTURE_FRAMES,
+    CONF_EXPORT_METRICS,
+    CONF_HALF_OPEN_REQUESTS,
+    DEFAULT_HALF_OPEN_REQUESTS,
 )
+from .control import DemandController
+from .history import SensorHistory
+from .prana_ble.capture import FrameCapture
+from .prana_ble.client import DISCONNECT_DELAY, STALE_AFTER, STATE_ATTRIBUTES, PranaDevice
+from .publish import SensorPublisher
+from .runtime import RuntimeAccumulators
 
-from .const import PranaState, Speed, PranaSensorsState
-
-from typing import Dict, List, Union, Optional
-from bleak.backends.device import BLEDevice
-from bleak.backends.service import BleakGATTCharacteristic, BleakGATTServiceCollection
-from bleak.exc import BleakDBusError
-from bleak_retry_connector import BLEAK_RETRY_EXCEPTIONS as BLEAK_EXCEPTIONS
-from bleak_retry_connector import (
-    BleakClientWithServiceCache,
-    BleakError,
-    BleakNotFoundError,
-    ble_device_has_changed,
-    establish_connection,
-)
-from typing import Any, TypeVar, cast, Tuple
-from collections.abc import Callable
-from math import log2
-import traceback
-import asyncio
-import logging
-import struct
+if TYPE_CHECKING:
+    from bleak.backends.device import BLEDevice
 
 
 LOGGER = logging.getLogger(__name__)
-WRITE_CHARACTERISTIC_UUIDS = ["0000cccc-0000-1000-8000-00805f9b34fb"]
-READ_CHARACTERISTIC_UUIDS  = ["0000cccc-0000-1000-8000-00805f9b34fb"]
 
-DEFAULT_ATTEMPTS = 3
-DISCONNECT_DELAY = 120
-BLEAK_BACKOFF_TIME = 0.25
-RETRY_BACKOFF_EXCEPTIONS = (BleakDBusError,)
-WrapFuncType = TypeVar("WrapFuncType", bound=Callable[..., Any])
+RUNTIME_STORAGE_VERSION = 1
+RUNTIME_SAVE_DELAY = 300
+LINK_STORAGE_VERSION = 1
+LINK_SAVE_DELAY = 600
+# Added to the learned connect lead of scheduled commands
+SCHEDULE_MARGIN = 2.0
 
-def retry_bluetooth_connection_error(func: WrapFuncType) -> WrapFuncType:
-    """Define a wrapper to retry on bleak error.
 
-    The accessory is allowed to disconnect us any time so
-    we need to retry the operation.
-    """
+def _device_attribute(name: str) -> property:
+    """Expose a PranaDevice state attribute on the coordinator."""
+    return property(
+        lambda self: getattr(self.device, name),
+        lambda self, value: setattr(self.device, name, value),
+    )
 
-    async def _async_wrap_retry_bluetooth_connection_error(
-        self: "Prana", *args: Any, **kwargs: Any
-    ) -> Any:
-        attempts = DEFAULT_ATTEMPTS
-        max_attempts = attempts - 1
-
-        for attempt in range(attempts):
-            try:
-                return await func(self, *args, **kwargs)
-            except BleakNotFoundError:
-                # The lock cannot be found so there is no
-                # point in retrying.
-                raise
-            except RETRY_BACKOFF_EXCEPTIONS as err:
-                if attempt >= max_attempts:
-                    LOGGER.debug("%s: %s error calling %s, reach max attempts (%s/%s)",self.name,type(err),func,attempt,max_attempts,exc_info=True,)
-                    raise
-                LOGGER.debug("%s: %s error calling %s, backing off %ss, retrying (%s/%s)...",self.name,type(err),func,BLEAK_BACKOFF_TIME,attempt,max_attempts,exc_info=True,)
-                await asyncio.sleep(BLEAK_BACKOFF_TIME)
-            except BLEAK_EXCEPTIONS as err:
-                if attempt >= max_attempts:
-                    LOGGER.debug("%s: %s error calling %s, reach max attempts (%s/%s): %s",self.name,type(err),func,attempt,max_attempts,err,exc_info=True,)
-                    raise
-                LOGGER.debug("%s: %s error calling %s, retrying  (%s/%s)...: %s",self.name,type(err),func,attempt,max_attempts,err,exc_info=True,)
-
-    return cast(WrapFuncType, _async_wrap_retry_bluetooth_connection_error)
 
 class PranaCoordinator(DataUpdateCoordinator):
-    CONTROL_SERVICE_UUID = "0000baba-0000-1000-8000-00805f9b34fb"
-    CONTROL_RW_CHARACTERISTIC_UUID = "0000cccc-0000-1000-8000-00805f9b34fb"
-    STATE_MSG_PREFIX = b"\xbe\xef"
-    MAX_BRIGHTNESS = 6
-
-    class Cmd:
-        ENABLE_HIGH_SPEED = bytearray([0xBE, 0xEF, 0x04, 0x07])
-        ENABLE_NIGHT_MODE = bytearray([0xBE, 0xEF, 0x04, 0x06])
-        TOGGLE_FLOW_LOCK = bytearray([0xBE, 0xEF, 0x04, 0x09])
-        TOGGLE_HEATING = bytearray([0xBE, 0xEF, 0x04, 0x05])
-        TOGGLE_WINTER_MODE = bytearray([0xBE, 0xEF, 0x04, 0x16])
-
-        SPEED_UP = bytearray([0xBE, 0xEF, 0x04, 0x0C])
-        SPEED_DOWN = bytearray([0xBE, 0xEF, 0x04, 0x0B])
-        SPEED_IN_UP = bytearray([0xBE, 0xEF, 0x04, 0x0E])
-        SPEED_IN_DOWN = bytearray([0xBE, 0xEF, 0x04, 0x0F])
-        SPEED_OUT_UP = bytearray([0xBE, 0xEF, 0x04, 0x11])
-        SPEED_OUT_DOWN = bytearray([0xBE, 0xEF, 0x04, 0x12])
-
-        FLOW_IN_OFF = bytearray([0xBE, 0xEF, 0x04, 0x0D])
-        FLOW_OUT_OFF = bytearray([0xBE, 0xEF, 0x04, 0x10])
-
-        START = bytearray([0xBE, 0xEF, 0x04, 0x0A])
-        STOP = bytearray([0xBE, 0xEF, 0x04, 0x01])
-        READ_STATE = bytearray([0xBE, 0xEF, 0x05, 0x01, 0x00, 0x00, 0x00, 0x00, 0x5A])
-        READ_DEVICE_DETAILS = bytearray([0xBE, 0xEF, 0x05, 0x02, 0x00, 0x00, 0x00, 0x00, 0x5A])
-        CHANGE_BRIGHTNESS = bytearray([0xBE, 0xEF, 0x04, 0x02])
-        AUTO_MODE = bytearray([0xBE, 0xEF, 0x04, 0x18])
-
-    def __init__(self, address, hass) -> None:
+    """Home Assistant side of one ventilator.
+
+    The protocol, connection and commands live in PranaDevice (self.device);
+    the coordinator adds history, runtime counters, publish filtering, demand
+    control and frame capture and tells the entities when to update.
+    """
+
+    speed = _device_attribute("speed")
+    speed_locked = _device_attribute("speed_locked")
+    speed_in = _device_attribute("speed_in")
+    speed_out = _device_attribute("speed_out")
+    night_mode = _device_attribute("night_mode")
+    auto_mode = _device_attribute("auto_mode")
+    flows_locked = _device_attribute("flows_locked")
+    is_on = _device_attribute("is_on")
+    mini_heating_enabled = _device_attribute("mini_heating_enabled")
+    winter_mode_enabled = _device_attribute("winter_mode_enabled")
+    is_input_fan_on = _device_attribute("is_input_fan_on")
+    is_output_fan_on = _device_attribute("is_output_fan_on")
+    brightness = _device_attribute("brightness")
+    sensors = _device_attribute("sensors")
+    timestamp = _device_attribute("timestamp")
+    lastRead = _device_attribute("lastRead")
+
+    def __init__(
+        self,
+        address,
+        hass,
+        options: Optional[Mapping[str, Any]] = None,
+        ble_device: BLEDevice | None = None,
+    ) -> None:
         """Initialize prana coordinator."""
         super().__init__(
             hass,
             LOGGER,
             name="Prana ventilation",
             update_interval=timedelta(seconds=30),
+            # Frames arrive through notifications, polls alone never change data
+            always_update=False,
         )
 
-        self.loop = asyncio.get_running_loop()
         self.mac = address
         self._hass = hass
-        self._device: BLEDevice | None = None
-        self._device = bluetooth.async_ble_device_from_address(self._hass, address, connectable=True)
-        self._connect_lock: asyncio.Lock = asyncio.Lock()
-        self._client: BleakClientWithServiceCache | None = None
-        self._disconnect_timer: asyncio.TimerHandle | None = None
-        self._cached_services: BleakGATTServiceCollection | None = None
-        self._expected_disconnect = False
-        self._write_uuid = None
-        self._read_uuid = None
-
-        # Device data
-        self.speed = 0 #calculated
-        self.speed_locked: Optional[int] = None
-        self.speed_in: Optional[int] = None
-        self.speed_out: Optional[int] = None
-        self.night_mode: Optional[bool] = None
-        self.auto_mode: Optional[bool] = None
-        self.flows_locked: Optional[bool] = None
-        self.is_on: Optional[bool] = None
-        self.mini_heating_enabled: Optional[bool] = None
-        self.winter_mode_enabled: Optional[bool] = None
-        self.is_input_fan_on: Optional[bool] = None
-        self.is_output_fan_on: Optional[bool] = None
-        self.brightness: Optional[int] = None
-        self.sensors: Optional[PranaSensorsState] = None
-        self.timestamp: Optional[datetime.datetime] = None
-        self.lastRead = None
-        self.co2 = None
-        self.voc = None
-        self.air_in = None
-        self.isAirInOn = None
-        self.isAirOutOn = None
+        self.device = PranaDevice(
+            ble_device or bluetooth.async_ble_device_from_address(hass, address, connectable=True),
+            name=address,
+            frame_callback=self._handle_frame,
+            state_callback=self._handle_state,
+            half_open_after=(options or {}).get(CONF_HALF_OPEN_REQUESTS, DEFAULT_HALF_OPEN_REQUESTS),
+        )
+        self.stats = self.device.stats
+        # Flipped by state frames and by one stale timer, read by every entity
+        self.available = False
+        self._cancel_stale_timer: Callable[[], None] | None = None
+        # Cancel callbacks of the timers of pending scheduled commands
+        self._schedules: dict[int, list[Callable[[], None]]] = {}
+        self._next_schedule = 0
+        self.controller = DemandController.from_options(options or {})
+        self._control_task: asyncio.Task | None = None
+        self.capture: FrameCapture | None = None
+        if (options or {}).get(CONF_CAPTURE_FRAMES):
+            self.capture = FrameCapture(hass.config.path(CAPTURE_DIR, f"{address.replace(':', '').lower()}.bin"))
+        self._capture_flush: asyncio.Future | None = None
+        self.export_metrics = bool((options or {}).get(CONF_EXPORT_METRICS))
+        self.publisher = SensorPublisher.from_options(options or {})
+        self.history = SensorHistory()
+        self.runtime = RuntimeAccumulators()
+        self._runtime_loaded = False
+        self._runtime_save_pending = False
+        self._runtime_store = Store(hass, RUNTIME_STORAGE_VERSION, f"prana.runtime_{address.replace(':', '').lower()}")
+        self._link_loaded = False
+        self._link_save_pending = False
+        self._link_store = Store(hass, LINK_STORAGE_VERSION, f"prana.link_{address.replace(':', '').lower()}")
+
+    @property
+    def rssi(self):
+        return self.device.rssi
 
     async def _async_update_data(self):
         """Fetch data from device."""
         try:
             # Note: asyncio.TimeoutError and aiohttp.ClientError are already
             # handled by the data update coordinator.
-            await self.get_status_details()
+            await self.device.get_status_details()
 
         except (Exception) as error:
             self.is_on = False
@@ -166,305 +143,192 @@ class PranaCoordinator(DataUpdateCoordinator):
             track = traceback.format_exc()
             LOGGER.debug(track)
 
-    async def _write(self, data: bytearray, await_response: bool = False):
-        """Send command to device and read response."""
-        await self._ensure_connected()
-        return await self._write_while_connected(data, await_response)
-
-    async def _write_while_connected(self, data: bytearray, await_response: bool = False):
-        LOGGER.debug("Before command")
-        await self._client.write_gatt_char(self._write_uuid, data, await_response)
-
-        # Update the info after each command
-        if(self.Cmd.READ_STATE != data):
-            LOGGER.debug("Before read state")
-            return await self._client.write_gatt_char(self._write_uuid, self.Cmd.READ_STATE, True)
-
-    @property
-    def rssi(self):
-        return self._device.rssi
-
-# NEW DATA
-    # @retry_bluetooth_connection_error
-    # async def set_high_speed(self):
-    #     await self._write(self.Cmd.ENABLE_HIGH_SPEED)
-
-    @retry_bluetooth_connection_error
-    async def speed_up(self):
-        await self._write(self.Cmd.SPEED_UP)
-
-    @retry_bluetooth_connection_error
-    async def speed_down(self):
-        await self._write(self.Cmd.SPEED_DOWN)
-
-    @retry_bluetooth_connection_error
-    async def set_low_speed(self):
-        await self._write(self.Cmd.ENABLE_NIGHT_MODE)
-
-    @retry_bluetooth_connection_error
-    async def set_night_mode(self):
-        await self._write(self.Cmd.ENABLE_NIGHT_MODE)
-
-    @retry_bluetooth_connection_error
-    async def set_normal_speed(self):
-        await self.set_speed(Speed.SPEED_3)
-
-    @retry_bluetooth_connection_error
-    async def get_status_details(self):
-        return await self._write(self.Cmd.READ_STATE)
+    async def async_read_state(self, timeout: float = 10) -> None:
+        """Request a state frame and wait until it has been applied."""
+        await self.device.async_read_state(timeout)
+
+    def _handle_frame(self, data: bytes, now: float) -> None:
+        """Record every raw frame when capture is enabled."""
+        if self.capture is not None and self.capture.record(self.mac, data, now):
+            self._flush_capture()
+
+    def _handle_state(self, changed: bool, now: float) -> None:
+        """Feed a decoded frame to history, counters and demand control."""
+        if not self.available:
+            self.available = True
+            changed = True
+        if self._cancel_stale_timer is None:
+            self._schedule_stale_check(now)
+        self.history.add({**(self.sensors or {}), "speed": self.speed}, now)
+        self.runtime.update(
+            now, self.is_on, self.speed, self.mini_heating_enabled,
+            self.winter_mode_enabled, self.speed_in, self.speed_out,
+        )
+        if self._runtime_loaded and not self._runtime_save_pending:
+            # async_delay_save restarts its timer on every call, frames would keep pushing it out
+            self._runtime_save_pending = True
+            self._runtime_store.async_delay_save(self._runtime_data, RUNTIME_SAVE_DELAY)
+        if self._link_loaded and not self._link_save_pending:
+            self._link_save_pending = True
+            self._link_store.async_delay_save(self._link_data, LINK_SAVE_DELAY)
+        if self.publisher.update(self.sensors, now):
+            changed = True
+        self._run_demand_control()
+        if changed:
+            LOGGER.debug("%s: Send update event", self.name)
+            self.async_update_listeners()
+            self.stats.notify_to_entity.observe(time.monotonic() - now)
+
+    def _schedule_stale_check(self, now: float) -> None:
+        """Check availability when the last frame becomes STALE_AFTER old.
+
+        Frames do not move the timer; when it fires early because newer
+        frames arrived, it is armed again for the latest one.
+        """
+        delay = self.device.last_frame_at + STALE_AFTER - now
+        self._cancel_stale_timer = async_call_later(self.hass, max(delay, 0), self._async_check_stale)
+
+    @callback
+    def _async_check_stale(self, _now: Any) -> None:
+        self._cancel_stale_timer = None
+        now = time.monotonic()
+        if self.device.is_available(now):
+            self._schedule_stale_check(now)
+            return
+        LOGGER.debug("%s: No state for %s s, unavailable", self.name, STALE_AFTER)
+        self.available = False
+        self.async_update_listeners()
 
-    @retry_bluetooth_connection_error
-    async def set_speed(self, speed: int):
-        if (speed == self.speed):
+    def _flush_capture(self) -> None:
+        """Write buffered capture records in the executor, one flush at a time."""
+        if self._capture_flush is not None and not self._capture_flush.done():
             return
+        self._capture_flush = self.hass.async_add_executor_job(self.capture.write, self.capture.take())
 
-        if not self.is_on:
-            await self.turn_on()
-
-        direction_up = speed > self.speed
-        counter = self.speed
-        if direction_up:
-            while counter < speed:
-                await self.speed_up()
-                counter += 1
-        else:
-            while counter > speed:
-                await self.speed_down()
-                counter -= 1
-        self.speed = speed
-
-    @retry_bluetooth_connection_error
-    async def set_brightness(self, brightness: int):
-        if brightness < 0 or brightness > 6:
-            raise ValueError("brightness value must be in range 0-6")
-        original_state = await self.get_status_details()
-        original_brightness = none_throws(original_state.brightness)
-        if brightness == original_brightness:
+    def _run_demand_control(self) -> None:
+        """Let the demand controller react to the frame that just arrived."""
+        if self.controller is None or not self.is_on or self.auto_mode or not self.sensors:
             return
-        if brightness > original_brightness:
-            counter = brightness - original_brightness
-        else:
-            counter = brightness + (self.MAX_BRIGHTNESS - original_brightness)
-        while counter > 0:
-            await self.brightness_up()
-            counter -= 1
-
-    @retry_bluetooth_connection_error
-    async def set_brightness_pct(self, brightness_pct: int):
-        """
-        Set brightness in percents (0-100)
-        :param brightness_pct: integer in 0-100 range
-        :return:
-        """
-        if brightness_pct < 0 or brightness_pct > 100:
-            raise ValueError("brightness_pct is percent value (range 0-100)")
-        return await self.set_brightness(round(self.MAX_BRIGHTNESS * brightness_pct / 100))
-
-    @retry_bluetooth_connection_error
-    async def brightness_up(self):
-        await self._write(self.Cmd.CHANGE_BRIGHTNESS)
-
-    @retry_bluetooth_connection_error
-    async def set_heating(self, enable: bool):
-        if self.mini_heating_enabled != enable:
-            LOGGER.debug("Set heating mode")
-            await self._write(self.Cmd.TOGGLE_HEATING, True)
-            self.mini_heating_enabled = enable
-
-    @retry_bluetooth_connection_error
-    async def set_winter_mode(self, enable: bool):
-        if self.winter_mode_enabled != enable:
-            return await self._write(self.Cmd.TOGGLE_WINTER_MODE)
-
-    @retry_bluetooth_connection_error
-    async def turn_off(self):
-        LOGGER.debug("turn off")
-        self.is_on = False
-        return await self._write(self.Cmd.STOP)
-
-    @retry_bluetooth_connection_error
-    async def turn_on(self):
-        LOGGER.debug("turn on")
-        self.is_on = True
-        return await self._write(self.Cmd.START)
-
-    @retry_bluetooth_connection_error
-    async def toggle_air_in_off(self):
-        self.is_input_fan_on = not self.is_input_fan_on
-        return await self._write(self.Cmd.FLOW_IN_OFF)
-
-    @retry_bluetooth_connection_error
-    async def toggle_air_out_off(self):
-        self.is_output_fan_on = not self.self.is_output_fan_on
-        return await self._write(self.Cmd.FLOW_OUT_OFF)
-
-    @retry_bluetooth_connection_error
-    async def toggle_auto_mode(self):
-        self.auto_mode = not self.auto_mode
-        return await self._write(self.Cmd.AUTO_MODE)
-    
-    @retry_bluetooth_connection_error
-    async def set_auto_mode(self):
-        if not self.auto_mode:
-            self.auto_mode = True
-            await self._write(self.Cmd.AUTO_MODE)
-
-
-    def __parse_state(self, data: bytearray) -> Optional[PranaState]:
-        if not data[:2] == self.STATE_MSG_PREFIX:
-            return None
-        s = PranaState()
-        s.timestamp = datetime.now()
-        s.brightness = int(log2(data[12]) + 1)
-        s.speed_locked = int(data[26] / 10)
-        s.speed_in = int(data[30] / 10)
-        s.speed_out = int(data[34] / 10)
-        s.auto_mode = bool(data[20])
-        s.night_mode = bool(data[16])
-        s.flows_locked = bool(data[22])
-        s.is_on = bool(data[10])
-        s.mini_heating_enabled = bool(data[14])
-        s.winter_mode_enabled = bool(data[42])
-        s.is_input_fan_on = bool(data[28])
-        s.is_output_fan_on = bool(data[32])
-
-        if not self.is_on:
-            self.speed = 0
-        elif self.auto_mode:
-            self.speed = self.speed_in #same as self.speedOut
-        elif self.speed_locked:
-            self.speed = self.speed_locked
-        elif self.air_in and self.air_in:
-            self.speed = int((self.speed_in + self.speed_out) / 2)
-        elif self.isAirInOn:
-            self.speed = self.speed_in
-        elif self.isAirOutOn:
-            self.speed = self.speed_out
-
-        # Reading sensors
-        sensors = PranaSensorsState()
-        sensors.humidity = int(data[60] - 128)
-        sensors.pressure = 512 + int(data[78])
-        # co2 and voc
-        sensors.co2 = int(struct.unpack_from(">h", data, 61)[0] & 0b0011111111111111)
-        sensors.voc = int(struct.unpack_from(">h", data, 63)[0] & 0b0011111111111111)
-        if 0 < sensors.co2 < 10000:
-            # Different version of firmware ???
-            sensors.temperature_in = float(struct.unpack_from(">h", data, 51)[0] & 0b0011111111111111) / 10.0
-            sensors.temperature_out = float(struct.unpack_from(">h", data, 54)[0] & 0b0011111111111111) / 10.0
-        else:
-            sensors.temperature_in = float(data[49]) / 10
-            sensors.temperature_out = float(data[55]) / 10
-        # Add sensors to the state only in case device has corresponding hardware
-        if sensors.humidity > 0:
-            s.sensors = sensors
-        return s
-
-    async def _notification_handler(self, _sender: int, data: bytearray) -> None:
-        """Handle notification responses."""
-        state = self.__parse_state(data)
-        self.lastRead = datetime.now()
-        LOGGER.debug("State data from notifiation: %s", state)
-        if state is not None:
-            dict_state = state.to_dict()
-            for key in dict_state:
-                setattr(self, key, dict_state[key])
-            LOGGER.debug("Send update event %s", dict_state)
-            await self.async_request_refresh()
-            
-
-# NEW DATA END
-
-
-
-
-
-
-
-
-# OLD
-    @retry_bluetooth_connection_error
-    async def _ensure_connected(self) -> None:
-        """Ensure connection to device is established."""
-        if self._connect_lock.locked():
-            LOGGER.debug(
-                "%s: Connection already in progress, waiting for it to complete; RSSI: %s",
-                self.name,
-                self.rssi,
-            )
-        if self._client and self._client.is_connected:
-            self._reset_disconnect_timer()
+        if self._control_task is not None and not self._control_task.done():
             return
-        async with self._connect_lock:
-            # Check again while holding the lock
-            if self._client and self._client.is_connected:
-                self._reset_disconnect_timer()
-                return
-            LOGGER.debug("%s: Connecting; RSSI: %s", self.name, self.rssi)
-            client = await establish_connection(
-                BleakClientWithServiceCache,
-                self._device,
-                self.name,
-                self._disconnected,
-                cached_services=self._cached_services,
-                ble_device_callback=lambda: self._device,
-            )
-            LOGGER.debug("%s: Connected; RSSI: %s", self.name, self.rssi)
-
-            self._read_uuid = READ_CHARACTERISTIC_UUIDS[0]
-            self._write_uuid = WRITE_CHARACTERISTIC_UUIDS[0]
-            self._cached_services = client.services
-            self._client = client
-            self._reset_disconnect_timer()
-
-            LOGGER.debug("%s: Subscribe to notifications; RSSI: %s", self.name, self.rssi)
-            await client.start_notify(self._read_uuid, self._notification_handler)
-    
-
-    def _reset_disconnect_timer(self) -> None:
-        """Reset disconnect timer."""
-        if self._disconnect_timer:
-            self._disconnect_timer.cancel()
-        self._expected_disconnect = False
-        self._disconnect_timer = self.loop.call_later(
-            DISCONNECT_DELAY, self._disconnect
+        target = self.controller.update(
+            self.sensors.get("co2"), self.sensors.get("voc"), self.speed, time.monotonic()
         )
-
-    def _disconnected(self, client: BleakClientWithServiceCache) -> None:
-        """Disconnected callback."""
-        if self._expected_disconnect:
-            LOGGER.debug("%s: Disconnected from device; RSSI: %s", self.name, self.rssi)
+        if target is None:
             return
-        LOGGER.warning("%s: Device unexpectedly disconnected; RSSI: %s",self.name,self.rssi,)
+        LOGGER.debug("%s: Demand control sets speed %s -> %s", self.name, self.speed, target)
+        self._control_task = self.hass.async_create_background_task(
+            self.device.set_speed(target), f"{self.mac} demand control"
+        )
+
+    def frame_age(self, now: float) -> float | None:
+        """Seconds since the last state frame (now is time.monotonic())."""
+        if self.device.last_frame_at is None:
+            return None
+        return now - self.device.last_frame_at
+
+    def snapshot(self, now: float) -> dict[str, Any]:
+        """Latest decoded state and link status, straight from memory."""
+        frame_age = self.frame_age(now)
+        return {
+            **{key: getattr(self.device, key) for key in STATE_ATTRIBUTES if key != "timestamp"},
+            "available": self.available,
+            "connected": self.device.is_connected,
+            "rssi": self.rssi,
+            "frame_age": round(frame_age, 3) if frame_age is not None else None,
+        }
+
+    @callback
+    def connect_lead(self) -> float:
+        """Seconds to connect ahead of a scheduled command, margin included."""
+        # Connected early enough, but not so early that the idle timer drops it again
+        return self.device.link.connect_lead(self.rssi, DISCONNECT_DELAY / 2 - SCHEDULE_MARGIN) + SCHEDULE_MARGIN
+
+    def async_schedule(
+        self, when: datetime, target: dict[str, Any], lead: float | None = None, release: bool = False
+    ) -> datetime:
+        """Apply target (PranaDevice.apply_state arguments) at when.
+
+        The connection is opened and the state read ahead of time by lead
+        seconds, the learned connect_lead by default, so the command itself
+        does not wait for them and steps the speed from a fresh value. With
+        release the device disconnects right after the command to free its
+        adapter slot. Returns when the connection will be opened; schedules
+        are not kept over restarts.
+        """
+        lead = self.connect_lead() if lead is None else lead
+        warm_up = max(when - timedelta(seconds=lead), dt_util.utcnow())
+        schedule_id = self._next_schedule
+        self._next_schedule += 1
+
+        @callback
+        def _warm_up(_now: datetime) -> None:
+            LOGGER.debug("%s: Connecting %.1f s ahead of the scheduled command", self.mac, lead)
+            self.hass.async_create_background_task(self._async_run_scheduled(self.device.async_read_state()), f"{self.mac} warm up")
+
+        @callback
+        def _apply(_now: datetime) -> None:
+            self._schedules.pop(schedule_id, None)
+            self.hass.async_create_background_task(self._async_run_scheduled(self._async_apply(target, release)), f"{self.mac} scheduled command")
+
+        self._schedules[schedule_id] = [
+            async_track_point_in_utc_time(self.hass, _warm_up, warm_up),
+            async_track_point_in_utc_time(self.hass, _apply, when),
+        ]
+        return warm_up
+
+    async def _async_apply(self, target: dict[str, Any], release: bool = False) -> None:
+        try:
+            await self.device.apply_state(**target)
+            self.async_update_listeners()
+        finally:
+            if release:
+                await self.device.async_disconnect()
 
-    def _disconnect(self) -> None:
-        """Disconnect from device."""
-        self._disconnect_timer = None
-        asyncio.create_task(self._execute_timed_disconnect())
+    async def _async_run_scheduled(self, job: Awaitable[None]) -> None:
+        try:
+            await job
+        except Exception as error:  # pylint: disable=broad-except
+            LOGGER.warning("%s: Scheduled command failed: %s", self.mac, error or type(error).__name__)
+
+    def _runtime_data(self) -> dict[str, Any]:
+        """Data for the delayed runtime save, which lets the next frame schedule another."""
+        self._runtime_save_pending = False
+        return self.runtime.as_dict()
+
+    async def async_load_runtime(self) -> None:
+        """Restore the runtime accumulators saved by a previous run."""
+        self.runtime.restore(await self._runtime_store.async_load())
+        self._runtime_loaded = True
+
+    def _link_data(self) -> dict[str, Any]:
+        """Data for the delayed link model save, see _runtime_data."""
+        self._link_save_pending = False
+        return self.device.link.as_dict()
+
+    async def async_load_link_model(self) -> None:
+        """Restore the link model learned by a previous run."""
+        self.device.link.restore(await self._link_store.async_load())
+        self._link_loaded = True
 
     async def stop(self) -> None:
-        """Stop the LEDBLE."""
-        # LOGGER.debug("%s: Stop", self.name)
-        await self._execute_disconnect()
-        
-    async def _execute_timed_disconnect(self) -> None:
-        """Execute timed disconnection."""
-        LOGGER.debug(
-            "%s: Disconnecting after timeout of %s",
-            self.name,
-            DISCONNECT_DELAY,
-        )
-        await self._execute_disconnect()
-
-    async def _execute_disconnect(self) -> None:
-        """Execute disconnection."""
-        async with self._connect_lock:
-            read_char = self._read_uuid
-            client = self._client
-            self._expected_disconnect = True
-            self._client = None
-            self._write_uuid = None
-            self._read_uuid = None
-            if client and client.is_connected:
-                await client.stop_notify(read_char)
-                await client.disconnect()
\ No newline at end of file
+        """Cancel pending work, save state, flush the capture and disconnect."""
+        await self.async_shutdown()
+        if self._cancel_stale_timer is not None:
+            self._cancel_stale_timer()
+            self._cancel_stale_timer = None
+        if self._control_task is not None:
+            self._control_task.cancel()
+        for cancels in self._schedules.values():
+            for cancel in cancels:
+                cancel()
+        self._schedules.clear()
+        if self._runtime_loaded:
+            await self._runtime_store.async_save(self.runtime.as_dict())
+        if self._link_loaded:
+            await self._link_store.async_save(self.device.link.as_dict())
+        if self.capture is not None:
+            if self._capture_flush is not None:
+                await self._capture_flush
+            await self.hass.async_add_executor_job(self.capture.write, self.capture.take())
+        await self.device.stop()
@@ -0,0 +1,40 @@
+"""Diagnostics support for Prana."""
+from __future__ import annotations
+
+import dataclasses
+import time
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_MAC
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .coordinator import PranaCoordinator
+
+TO_REDACT = {CONF_MAC, "unique_id"}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator: PranaCoordinator = hass.data[DOMAIN][entry.entry_id]
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "device": {
+            "rssi": coordinator.rssi,
+            "connected": coordinator.device.is_connected,
+            "mtu": coordinator.device.mtu,
+            "last_read": coordinator.lastRead,
+            "is_on": coordinator.is_on,
+            "speed": coordinator.speed,
+            "sensors": coordinator.sensors,
+        },
+        "runtime": coordinator.runtime.as_dict(),
+        "history": {key: coordinator.history.stats(key, time.monotonic()) for key in ("co2", "voc", "speed")},
+        "stats": coordinator.stats.as_dict(),
+        "link": {
+            **coordinator.device.link.as_dict(),
+            "tuning": dataclasses.asdict(coordinator.device.link.tuning(coordinator.rssi)),
+        },
+    }
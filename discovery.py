@@ -0,0 +1,111 @@
+"""Integration-wide index of advertising Prana devices.
+
+Filled once from the bluetooth manager's cache and then kept current from
+advertisement callbacks, so config flows read it without rescanning every
+device in range.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+import time
+from typing import Any
+
+from homeassistant.components import bluetooth
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import Event, HomeAssistant, callback
+
+from .const import DOMAIN
+
+DATA_DISCOVERY = f"{DOMAIN}_discovery"
+PRANA_SERVICE_UUID = "000000ee-0000-1000-8000-00805f9b34fb"
+NAME_PREFIX = "prna"
+# Devices not heard from for this long rank after every fresh one
+STALE_AFTER = 300
+
+
+def is_prana(name: str | None) -> bool:
+    return bool(name) and name.lower().startswith(NAME_PREFIX)
+
+
+@dataclass
+class DiscoveredDevice:
+    address: str
+    name: str
+    rssi: int | None
+    last_seen: float
+
+    def label(self) -> str:
+        rssi = f", {self.rssi} dBm" if self.rssi is not None else ""
+        return f"{self.name} ({self.address}{rssi})"
+
+
+class DiscoveryIndex:
+    """Prana devices by address with their latest RSSI and when they were last seen."""
+
+    def __init__(self) -> None:
+        self._devices: dict[str, DiscoveredDevice] = {}
+
+    def __len__(self) -> int:
+        return len(self._devices)
+
+    def get(self, address: str) -> DiscoveredDevice | None:
+        return self._devices.get(address)
+
+    def update(self, service_info: Any, now: float | None = None) -> DiscoveredDevice | None:
+        """Record one advertisement; return the entry, None if it is not a Prana."""
+        if not is_prana(service_info.name):
+            return None
+        now = time.monotonic() if now is None else now
+        device = self._devices.get(service_info.address)
+        if device is None:
+            device = self._devices[service_info.address] = DiscoveredDevice(
+                service_info.address, service_info.name, service_info.rssi, now
+            )
+        else:
+            device.name = service_info.name
+            device.rssi = service_info.rssi
+            device.last_seen = now
+        return device
+
+    def ranked(self, exclude: Any = (), now: float | None = None) -> list[DiscoveredDevice]:
+        """Devices not in exclude, recently seen first, then strongest signal first."""
+        now = time.monotonic() if now is None else now
+        return sorted(
+            (device for address, device in self._devices.items() if address not in exclude),
+            key=lambda device: (
+                now - device.last_seen > STALE_AFTER,
+                -(device.rssi if device.rssi is not None else -1000),
+                -device.last_seen,
+            ),
+        )
+
+
+@callback
+def async_get_discovery_index(hass: HomeAssistant) -> DiscoveryIndex:
+    """Return the shared index, creating and subscribing it on first use."""
+    if (index := hass.data.get(DATA_DISCOVERY)) is not None:
+        return index
+
+    index = hass.data[DATA_DISCOVERY] = DiscoveryIndex()
+    for service_info in bluetooth.async_discovered_service_info(hass, connectable=True):
+        index.update(service_info)
+
+    @callback
+    def _async_advertisement(
+        service_info: bluetooth.BluetoothServiceInfoBleak, change: bluetooth.BluetoothChange
+    ) -> None:
+        index.update(service_info)
+
+    unsubscribe = bluetooth.async_register_callback(
+        hass,
+        _async_advertisement,
+        bluetooth.BluetoothCallbackMatcher(service_uuid=PRANA_SERVICE_UUID, connectable=True),
+        bluetooth.BluetoothScanningMode.ACTIVE,
+    )
+
+    @callback
+    def _async_stop(event: Event) -> None:
+        unsubscribe()
+
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _async_stop)
+    return index
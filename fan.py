@@ -1,33 +1,21 @@
 """Support for Prana fan."""
-from . import DOMAIN
-
-from datetime import datetime, timedelta
 import logging
 import math
-from homeassistant.components.fan import (
-    SUPPORT_SET_SPEED,
-    SUPPORT_DIRECTION,
-    SUPPORT_PRESET_MODE,
-    FanEntity,
-)
-
-from homeassistant.helpers.update_coordinator import (
-    CoordinatorEntity,
-    DataUpdateCoordinator,
-    UpdateFailed,
-)
+import time
 
-from homeassistant.helpers import device_registry
-from homeassistant.helpers.entity import DeviceInfo
-from homeassistant.const import STATE_OFF
+from homeassistant.components.fan import FanEntity, FanEntityFeature
 from homeassistant.core import callback
-from homeassistant.helpers.dispatcher import dispatcher_send, async_dispatcher_connect
+from homeassistant.helpers.device_registry import CONNECTION_NETWORK_MAC
+from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.util.percentage import (
     int_states_in_range,
     percentage_to_ranged_value,
     ranged_value_to_percentage,
 )
 
+from .const import DOMAIN
+
 LOGGER = logging.getLogger(__name__)
 
 SPEED_AUTO = "auto"
@@ -41,6 +29,8 @@ async def async_setup_entry(hass, config_entry, async_add_devices):
 
 class PranaFan(CoordinatorEntity, FanEntity):
     """Representation of a Prana fan."""
+    _unrecorded_attributes = frozenset({"speed_mean_1h", "speed_mean_24h"})
+
     def __init__(self, coordinator, config_entry):
         """Initialize the sensor."""
         super().__init__(coordinator, config_entry)
@@ -74,15 +64,13 @@ class PranaFan(CoordinatorEntity, FanEntity):
     @property
     def available(self):
         """Return state of the fan."""
-        return self.coordinator.lastRead != None and (self.coordinator.lastRead > datetime.now() - timedelta(minutes=5))
+        return self.coordinator.available
 
     @property
     def extra_state_attributes(self):
         """Provide attributes for display on device card."""
         LOGGER.debug("Setting device attributes")
-        attributes = { 
-            "co2": self.coordinator.co2,
-            "voc": self.coordinator.voc,
+        attributes = {
             "auto_mode": self.coordinator.auto_mode,
             "night_mode": self.coordinator.night_mode,
             "thaw_on": self.coordinator.winter_mode_enabled,
@@ -92,8 +80,11 @@ class PranaFan(CoordinatorEntity, FanEntity):
             "speed_out": self.coordinator.speed_out,
             "air_in": self.coordinator.is_input_fan_on,
             "air_out": self.coordinator.is_output_fan_on,
-            "last_updated": self.coordinator.lastRead,
         }
+        speed_stats = self.coordinator.history.stats("speed", time.monotonic())
+        for window in ("1h", "24h"):
+            if speed_stats[window]:
+                attributes[f"speed_mean_{window}"] = round(speed_stats[window]["mean"], 1)
         return attributes
 
     @property
@@ -105,49 +96,39 @@ class PranaFan(CoordinatorEntity, FanEntity):
                 (DOMAIN, self.coordinator.mac)
             },
             name=self.name,
-            connections={(device_registry.CONNECTION_NETWORK_MAC, self.coordinator.mac)}
+            connections={(CONNECTION_NETWORK_MAC, self.coordinator.mac)}
         )
 
     @property
     def supported_features(self) -> int:
         """Flag supported features."""
-        return SUPPORT_SET_SPEED | SUPPORT_DIRECTION | SUPPORT_PRESET_MODE
+        return FanEntityFeature.SET_SPEED | FanEntityFeature.DIRECTION | FanEntityFeature.PRESET_MODE
 
     async def async_turn_on(self, speed: str = None, percentage=None, preset_mode=None, **kwargs) -> None:
         """Turn on the entity."""
         LOGGER.debug("BEFORE FAN TURN ON")
-        await self.coordinator.turn_on()
+        await self.coordinator.device.turn_on()
         self.async_write_ha_state()
         await self.coordinator.async_request_refresh()
 
     async def async_turn_off(self, **kwargs) -> None:
         """Turn off the entity."""
-        await self.coordinator.turn_off()
+        await self.coordinator.device.turn_off()
         self.async_write_ha_state()
         await self.coordinator.async_request_refresh()
 
     async def async_set_direction(self, direction: str):
         """Set the direction of the fan."""
-        if direction == 'reverse':
-            if not self.coordinator.is_input_fan_on:
-                await self.coordinator.toggle_air_in_off()
-
-            await self.coordinator.toggle_air_out_off()
-        elif direction == 'forward':
-            if not self.coordinator.is_output_fan_on:
-                await self.coordinator.toggle_air_out_off()
-
-            await self.coordinator.toggle_air_in_off()
-
+        await self.coordinator.device.set_direction(direction)
         self.async_write_ha_state()
         await self.coordinator.async_request_refresh()
 
     async def async_set_preset_mode(self, preset_mode: str) -> None:
         """Set the preset mode of the fan."""
         if preset_mode == SPEED_AUTO:
-            await self.coordinator.set_auto_mode()
+            await self.coordinator.device.set_auto_mode()
         else:
-            await self.coordinator.toggle_auto_mode()
+            await self.coordinator.device.toggle_auto_mode()
         self.async_write_ha_state()
         await self.coordinator.async_request_refresh()
 
@@ -175,9 +156,9 @@ class PranaFan(CoordinatorEntity, FanEntity):
 
         speed = math.ceil(percentage_to_ranged_value(SPEED_RANGE, percentage))
         if speed == 0 or percentage == None:
-            await self.coordinator.turn_off()
+            await self.coordinator.device.turn_off()
         else:
-            await self.coordinator.set_speed(speed)
+            await self.coordinator.device.set_speed(speed)
         self.async_write_ha_state()
         await self.coordinator.async_request_refresh()
 
@@ -0,0 +1,129 @@
+"""In-memory sensor history with rolling aggregates."""
+from __future__ import annotations
+
+from array import array
+from collections.abc import Iterable, Mapping
+import time
+from typing import Any, Optional
+
+# Window name -> span in seconds
+WINDOWS = {"5m": 300, "1h": 3600, "24h": 86400}
+BUCKETS_PER_WINDOW = 60
+HISTORY_KEYS = ("co2", "voc", "temperature_in", "temperature_out", "humidity", "speed")
+
+
+class RollingWindow:
+    """Fixed-size ring of time buckets covering the last span seconds.
+
+    Every bucket keeps count, sum, min, max and its first and last sample,
+    so adding a sample touches one bucket only. Aggregates are folded over
+    the buckets still inside the window when they are read.
+    """
+
+    def __init__(self, span: float, buckets: int = BUCKETS_PER_WINDOW) -> None:
+        self.span = span
+        self.width = span / buckets
+        self._size = buckets
+        self._epoch = array("q", [-1]) * buckets
+        self._count = array("L", [0]) * buckets
+        self._sum = array("d", [0.0]) * buckets
+        self._min = array("d", [0.0]) * buckets
+        self._max = array("d", [0.0]) * buckets
+        self._first = array("d", [0.0]) * buckets
+        self._first_ts = array("d", [0.0]) * buckets
+        self._last = array("d", [0.0]) * buckets
+        self._last_ts = array("d", [0.0]) * buckets
+
+    def add(self, now: float, value: float) -> None:
+        """Add one sample taken at monotonic time now."""
+        epoch = int(now // self.width)
+        slot = epoch % self._size
+        if self._epoch[slot] != epoch:
+            self._epoch[slot] = epoch
+            self._count[slot] = 1
+            self._sum[slot] = self._min[slot] = self._max[slot] = value
+            self._first[slot] = self._last[slot] = value
+            self._first_ts[slot] = self._last_ts[slot] = now
+            return
+        self._count[slot] += 1
+        self._sum[slot] += value
+        if value < self._min[slot]:
+            self._min[slot] = value
+        if value > self._max[slot]:
+            self._max[slot] = value
+        self._last[slot] = value
+        self._last_ts[slot] = now
+
+    def _live_slots(self, now: float) -> list[int]:
+        """Return the slots inside the window, oldest first."""
+        oldest = int(now // self.width) - self._size + 1
+        return sorted(
+            (slot for slot in range(self._size) if self._count[slot] and self._epoch[slot] >= oldest),
+            key=self._epoch.__getitem__,
+        )
+
+    def stats(self, now: float) -> Optional[dict[str, float]]:
+        """Return min, max, mean and rate of change per hour, None when empty."""
+        slots = self._live_slots(now)
+        if not slots:
+            return None
+        count = sum(self._count[slot] for slot in slots)
+        first, last = slots[0], slots[-1]
+        elapsed = self._last_ts[last] - self._first_ts[first]
+        return {
+            "min": min(self._min[slot] for slot in slots),
+            "max": max(self._max[slot] for slot in slots),
+            "mean": sum(self._sum[slot] for slot in slots) / count,
+            "rate": (self._last[last] - self._first[first]) * 3600 / elapsed if elapsed > 0 else 0.0,
+        }
+
+    def series(self, now: float) -> list[tuple[float, float]]:
+        """Return (wall clock timestamp, mean) per bucket, oldest first."""
+        offset = time.time() - time.monotonic()
+        return [
+            (self._first_ts[slot] + offset, self._sum[slot] / self._count[slot])
+            for slot in self._live_slots(now)
+        ]
+
+
+class SensorHistory:
+    """Rolling windows for every tracked sensor of one device."""
+
+    def __init__(self, keys: Iterable[str] = HISTORY_KEYS) -> None:
+        self._windows: dict[str, dict[str, RollingWindow]] = {
+            key: {name: RollingWindow(span) for name, span in WINDOWS.items()} for key in keys
+        }
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._windows
+
+    def add(self, values: Mapping[str, Any], now: float) -> None:
+        """Record the tracked values of one frame, skipping missing readings."""
+        for key, windows in self._windows.items():
+            value = values.get(key)
+            if value is None:
+                continue
+            for window in windows.values():
+                window.add(now, value)
+
+    def stats(self, key: str, now: float) -> dict[str, Optional[dict[str, float]]]:
+        """Return the aggregates of one sensor for every window."""
+        return {name: window.stats(now) for name, window in self._windows[key].items()}
+
+    def attributes(self, key: str, now: float) -> dict[str, float]:
+        """Return the aggregates of one sensor flattened to state attributes."""
+        attributes = {}
+        for name, stats in self.stats(key, now).items():
+            for stat, value in (stats or {}).items():
+                attributes[f"{stat}_{name}"] = round(value, 2)
+        return attributes
+
+    def series(self, key: str, window: str, now: float) -> list[tuple[float, float]]:
+        """Return the bucketed time series of one sensor."""
+        return self._windows[key][window].series(now)
+
+
+# Attribute names produced by SensorHistory.attributes, kept out of the recorder
+HISTORY_ATTRIBUTES = frozenset(
+    f"{stat}_{name}" for name in WINDOWS for stat in ("min", "max", "mean", "rate")
+)
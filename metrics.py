@@ -0,0 +1,150 @@
+"""Prometheus text exposition of the link and sensor state of every device.
+
+Rendered from the coordinators' in-memory counters on each scrape, so it
+costs neither entity state writes nor recorder queries. Scrapes need a
+long-lived access token like the rest of the REST API:
+
+    scrape_configs:
+      - job_name: prana
+        metrics_path: /api/prana/metrics
+        bearer_token: <long-lived access token>
+"""
+from __future__ import annotations
+
+from collections.abc import Iterable
+import time
+from typing import Any
+
+from aiohttp import web
+
+from homeassistant.components.http import HomeAssistantView
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DOMAIN
+from .coordinator import PranaCoordinator
+from .prana_ble.stats import Histogram
+
+DATA_METRICS_VIEW = f"{DOMAIN}_metrics_view"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# (metric, help, DeviceStats attribute)
+COUNTERS = (
+    ("prana_connects_total", "Connections established.", "connects"),
+    ("prana_connect_failures_total", "Connection attempts that failed.", "connect_failures"),
+    ("prana_retries_total", "Command attempts that were retried.", "retries"),
+    ("prana_operation_failures_total", "Commands that failed after all attempts.", "operation_failures"),
+    ("prana_half_open_links_total", "Connected links torn down for not answering state requests.", "half_open_links"),
+    ("prana_frames_received_total", "State frames received.", "frames_received"),
+    ("prana_frames_deduplicated_total", "State frames identical to the previous one.", "frames_deduplicated"),
+    ("prana_frames_reassembled_total", "State frames joined from several notifications.", "frames_reassembled"),
+    ("prana_fragments_discarded_total", "Partial state frames that could not be completed.", "fragments_discarded"),
+)
+HISTOGRAMS = (
+    ("prana_connect_seconds", "Time to connect and resolve services.", "connect_time"),
+    ("prana_write_seconds", "Time of one GATT write.", "write_time"),
+    ("prana_notify_to_entity_seconds", "Time from notification to entity update.", "notify_to_entity"),
+    ("prana_command_seconds", "Time of one command including reconnects and retries.", "command_time"),
+    ("prana_retries_per_operation", "Retries a command needed.", "retries_per_operation"),
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    # Counters stay exact, :g would round them to six digits
+    return str(int(value)) if isinstance(value, int) else repr(float(value))
+
+
+def _labels(labels: dict[str, Any]) -> str:
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items()) + "}"
+
+
+class _Family:
+    """Samples of one metric across all devices."""
+
+    def __init__(self, name: str, kind: str, help_text: str) -> None:
+        self.lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        self.name = name
+
+    def add(self, labels: dict[str, Any], value: float, suffix: str = "") -> None:
+        self.lines.append(f"{self.name}{suffix}{_labels(labels)} {_number(value)}")
+
+    def add_histogram(self, labels: dict[str, Any], histogram: Histogram) -> None:
+        cumulative = 0
+        for bound, count in zip(histogram.bounds, histogram.counts):
+            cumulative += count
+            self.add({**labels, "le": f"{bound:g}"}, cumulative, "_bucket")
+        self.add({**labels, "le": "+Inf"}, histogram.count, "_bucket")
+        self.add(labels, histogram.sum, "_sum")
+        self.add(labels, histogram.count, "_count")
+
+
+def render_metrics(coordinators: Iterable[PranaCoordinator], now: float | None = None) -> str:
+    """Return the exposition text for coordinators; now is time.monotonic()."""
+    now = time.monotonic() if now is None else now
+    connected = _Family("prana_connected", "gauge", "1 while a BLE connection is open.")
+    available = _Family("prana_available", "gauge", "1 while the device reports state.")
+    rssi = _Family("prana_rssi_dbm", "gauge", "Last advertised signal strength.")
+    frame_age = _Family("prana_last_frame_age_seconds", "gauge", "Seconds since the last state frame.")
+    is_on = _Family("prana_on", "gauge", "1 while the fans run.")
+    speed = _Family("prana_speed", "gauge", "Fan speed, 0 to 10.")
+    sensor = _Family("prana_sensor", "gauge", "Latest sensor reading in the device's units.")
+    disconnects = _Family("prana_disconnects_total", "counter", "Disconnections by whether they were expected.")
+    counters = [(_Family(name, "counter", help_text), attribute) for name, help_text, attribute in COUNTERS]
+    histograms = [(_Family(name, "histogram", help_text), attribute) for name, help_text, attribute in HISTOGRAMS]
+
+    for coordinator in coordinators:
+        device = coordinator.device
+        stats = coordinator.stats
+        entry = coordinator.config_entry
+        labels = {"mac": coordinator.mac, "name": entry.title if entry is not None else coordinator.mac}
+        connected.add(labels, device.is_connected)
+        available.add(labels, coordinator.available)
+        if (value := device.rssi) is not None:
+            rssi.add(labels, value)
+        if (age := coordinator.frame_age(now)) is not None:
+            frame_age.add(labels, round(age, 3))
+        if coordinator.is_on is not None:
+            is_on.add(labels, coordinator.is_on)
+        speed.add(labels, coordinator.speed)
+        for key, value in (coordinator.sensors or {}).items():
+            if value is not None:
+                sensor.add({**labels, "sensor": key}, value)
+        disconnects.add({**labels, "kind": "expected"}, stats.disconnects_expected)
+        disconnects.add({**labels, "kind": "unexpected"}, stats.disconnects_unexpected)
+        for family, attribute in counters:
+            family.add(labels, getattr(stats, attribute))
+        for family, attribute in histograms:
+            family.add_histogram(labels, getattr(stats, attribute))
+
+    families = [connected, available, rssi, frame_age, is_on, speed, sensor, disconnects]
+    families += [family for family, _ in counters] + [family for family, _ in histograms]
+    return "\n".join(line for family in families for line in family.lines) + "\n"
+
+
+class PranaMetricsView(HomeAssistantView):
+    """Serve the metrics of the devices that have export enabled."""
+
+    url = "/api/prana/metrics"
+    name = "api:prana:metrics"
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.hass = hass
+
+    async def get(self, request: web.Request) -> web.Response:
+        coordinators = [
+            coordinator for coordinator in self.hass.data.get(DOMAIN, {}).values()
+            if coordinator.export_metrics
+        ]
+        return web.Response(body=render_metrics(coordinators).encode(), headers={"Content-Type": CONTENT_TYPE})
+
+
+@callback
+def async_register_metrics_view(hass: HomeAssistant) -> None:
+    """Register the view once; views stay registered until Home Assistant stops."""
+    if hass.data.get(DATA_METRICS_VIEW):
+        return
+    hass.http.register_view(PranaMetricsView(hass))
+    hass.data[DATA_METRICS_VIEW] = True
@@ -0,0 +1,20 @@
+"""Prana ventilator protocol and BLE client, independent of Home Assistant.
+
+codec decodes state frames and holds the command opcodes, client.PranaDevice
+talks to one ventilator over bleak and simulator stands in for the hardware.
+The package only uses relative imports, so tools can put this directory's
+parent on sys.path and `import prana_ble` without Home Assistant installed.
+PranaDevice is imported lazily because it pulls in bleak.
+"""
+from .codec import Cmd, parse_state
+from .state import PranaSensorsState, PranaState, Speed
+
+__all__ = ["Cmd", "PranaDevice", "PranaSensorsState", "PranaState", "Speed", "parse_state"]
+
+
+def __getattr__(name: str):
+    if name == "PranaDevice":
+        from .client import PranaDevice
+
+        return PranaDevice
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
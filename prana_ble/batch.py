@@ -0,0 +1,178 @@
+"""Vectorized decoding of state frame archives into NumPy columns.
+
+Uses the offsets and masks of codec.parse_state to decode a contiguous
+buffer of fixed-size frames in one pass. NumPy is only needed for this
+module and is not a requirement of the integration:
+
+    columns = decode_frames(buffer, frame_length=86)
+    columns["co2"][columns["has_sensors"]].mean()
+
+Run as a script to decode capture files and check the result against
+the scalar decoder:
+
+    python -m custom_components.prana.prana_ble.batch prana_captures/001122334455.bin --verify
+"""
+from __future__ import annotations
+
+import argparse
+from collections.abc import Iterable
+import math
+import time
+from typing import Any
+
+from . import codec
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+# Column name -> PranaState attribute (or sensors key) it must match
+STATE_COLUMNS = (
+    "is_on", "brightness", "mini_heating_enabled", "night_mode", "auto_mode",
+    "flows_locked", "speed_locked", "is_input_fan_on", "speed_in",
+    "is_output_fan_on", "speed_out", "winter_mode_enabled", "speed",
+)
+SENSOR_COLUMNS = ("humidity", "pressure", "co2", "voc", "temperature_in", "temperature_out")
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise RuntimeError("numpy is required for batch decoding: pip install numpy")
+
+
+def frames_array(buffer: Any, frame_length: int) -> "np.ndarray":
+    """View a contiguous buffer as an (n, frame_length) uint8 array without copying."""
+    _require_numpy()
+    data = np.frombuffer(buffer, dtype=np.uint8)
+    if data.size % frame_length:
+        raise ValueError(f"buffer of {data.size} bytes is not a multiple of {frame_length}")
+    if frame_length <= codec.OFFSET_PRESSURE:
+        raise ValueError(f"frames must be longer than {codec.OFFSET_PRESSURE} bytes")
+    return data.reshape(-1, frame_length)
+
+
+def decode_frames(buffer: Any, frame_length: int) -> dict[str, "np.ndarray"]:
+    """Decode every frame of buffer into columns.
+
+    Boolean flags become bool arrays, speeds and sensor readings integer or
+    float arrays. "valid" marks frames with the BE EF prefix and
+    "has_sensors" frames the scalar decoder would attach sensors to.
+    Brightness of a frame with no brightness bit set is 0, where the scalar
+    decoder would fail.
+    """
+    frames = frames_array(buffer, frame_length)
+
+    def byte(offset: int) -> "np.ndarray":
+        return frames[:, offset]
+
+    def word(offset: int) -> "np.ndarray":
+        return ((byte(offset).astype(np.uint16) << 8) | byte(offset + 1)) & codec.SENSOR_MASK
+
+    prefix = np.frombuffer(codec.STATE_MSG_PREFIX, dtype=np.uint8)
+    columns: dict[str, np.ndarray] = {
+        "valid": (byte(0) == prefix[0]) & (byte(1) == prefix[1]),
+        "is_on": byte(codec.OFFSET_IS_ON) != 0,
+        "mini_heating_enabled": byte(codec.OFFSET_HEATING) != 0,
+        "night_mode": byte(codec.OFFSET_NIGHT_MODE) != 0,
+        "auto_mode": byte(codec.OFFSET_AUTO_MODE) != 0,
+        "flows_locked": byte(codec.OFFSET_FLOWS_LOCKED) != 0,
+        "is_input_fan_on": byte(codec.OFFSET_INPUT_FAN_ON) != 0,
+        "is_output_fan_on": byte(codec.OFFSET_OUTPUT_FAN_ON) != 0,
+        "winter_mode_enabled": byte(codec.OFFSET_WINTER_MODE) != 0,
+        "speed_locked": byte(codec.OFFSET_SPEED_LOCKED) // codec.SPEED_DIVISOR,
+        "speed_in": byte(codec.OFFSET_SPEED_IN) // codec.SPEED_DIVISOR,
+        "speed_out": byte(codec.OFFSET_SPEED_OUT) // codec.SPEED_DIVISOR,
+    }
+
+    brightness = byte(codec.OFFSET_BRIGHTNESS)
+    with np.errstate(divide="ignore"):
+        columns["brightness"] = np.where(
+            brightness > 0, np.floor(np.log2(brightness)) + 1, 0
+        ).astype(np.int8)
+
+    average = (columns["speed_in"].astype(np.int16) + columns["speed_out"]) // 2
+    columns["speed"] = np.where(
+        columns["is_on"], np.where(columns["flows_locked"], columns["speed_locked"], average), 0
+    ).astype(np.uint8)
+
+    humidity = byte(codec.OFFSET_HUMIDITY).astype(np.int16) - codec.HUMIDITY_OFFSET
+    columns["humidity"] = humidity
+    columns["has_sensors"] = humidity > 0
+    columns["pressure"] = byte(codec.OFFSET_PRESSURE).astype(np.int16) + codec.PRESSURE_OFFSET
+    columns["co2"] = word(codec.OFFSET_CO2)
+    columns["voc"] = word(codec.OFFSET_VOC)
+    low, high = codec.CO2_FIRMWARE_RANGE
+    co2_firmware = (columns["co2"] > low) & (columns["co2"] < high)
+    columns["temperature_in"] = np.where(
+        co2_firmware, word(codec.OFFSET_TEMPERATURE_IN), byte(codec.OFFSET_TEMPERATURE_IN_LEGACY)
+    ) / 10.0
+    columns["temperature_out"] = np.where(
+        co2_firmware, word(codec.OFFSET_TEMPERATURE_OUT), byte(codec.OFFSET_TEMPERATURE_OUT_LEGACY)
+    ) / 10.0
+    return columns
+
+
+def verify_against_scalar(buffer: Any, frame_length: int) -> list[str]:
+    """Decode buffer both ways and return a description of every mismatch."""
+    columns = decode_frames(buffer, frame_length)
+    frames = frames_array(buffer, frame_length)
+    mismatches = []
+    for index, frame in enumerate(frames):
+        raw = frame.tobytes()
+        if not columns["valid"][index]:
+            if codec.parse_state(raw) is not None:
+                mismatches.append(f"frame {index}: scalar decoder accepted an invalid frame")
+            continue
+        if frame[codec.OFFSET_BRIGHTNESS] == 0:
+            continue  # The scalar decoder cannot decode these
+        state = codec.parse_state(raw)
+        expected: dict[str, Any] = {key: getattr(state, key) for key in STATE_COLUMNS}
+        if state.sensors is not None:
+            expected.update({key: getattr(state.sensors, key) for key in SENSOR_COLUMNS})
+        if bool(columns["has_sensors"][index]) != (state.sensors is not None):
+            mismatches.append(f"frame {index}: has_sensors differs")
+        for key, value in expected.items():
+            column = columns[key][index].item()
+            if isinstance(value, float) and math.isclose(value, column, abs_tol=1e-9):
+                continue
+            if column != value:
+                mismatches.append(f"frame {index}: {key} is {column}, scalar decoder says {value}")
+    return mismatches
+
+
+def pack_frames(frames: Iterable[bytes], frame_length: int) -> bytes:
+    """Pack frames into a contiguous buffer, padding or truncating to frame_length."""
+    return b"".join(bytes(frame[:frame_length]).ljust(frame_length, b"\0") for frame in frames)
+
+
+def main() -> None:
+    from .capture import capture_files, read_capture
+
+    parser = argparse.ArgumentParser(description="Batch decode Prana capture files")
+    parser.add_argument("captures", nargs="+")
+    parser.add_argument("--frame-length", type=int, default=86)
+    parser.add_argument("--verify", action="store_true", help="compare with the scalar decoder")
+    args = parser.parse_args()
+
+    frames = (
+        captured.frame
+        for capture in args.captures
+        for path in capture_files(capture)
+        for captured in read_capture(path)
+    )
+    buffer = pack_frames(frames, args.frame_length)
+    start = time.perf_counter()
+    columns = decode_frames(buffer, args.frame_length)
+    elapsed = time.perf_counter() - start
+    count = len(columns["valid"])
+    print(f"decoded {count} frames in {elapsed * 1000:.1f} ms ({count / elapsed if elapsed else 0:.0f} frames/s)")
+    if args.verify:
+        mismatches = verify_against_scalar(buffer, args.frame_length)
+        print("\n".join(mismatches[:50]) or "batch decoder matches the scalar decoder")
+        if mismatches:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
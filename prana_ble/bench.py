@@ -0,0 +1,70 @@
+"""Benchmark the protocol layer without Home Assistant.
+
+Measures state frame decode throughput and command round trips of a
+PranaDevice against the simulator. Run it from the integration directory
+so only this package is imported:
+
+    cd custom_components/prana && python -m prana_ble.bench --commands 50
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+
+from .client import PranaDevice
+from .codec import parse_state
+from .simulator import SimulatedPrana
+
+
+def bench_decode(frames: int) -> dict[str, float]:
+    frame = SimulatedPrana().state_frame()
+    start = time.perf_counter()
+    for _ in range(frames):
+        parse_state(frame)
+    elapsed = time.perf_counter() - start
+    return {"frames": frames, "frames_per_s": round(frames / elapsed), "us_per_frame": round(elapsed / frames * 1e6, 2)}
+
+
+async def bench_commands(commands: int, latency: float) -> dict[str, float]:
+    sim = SimulatedPrana(latency=latency, seed=1)
+    device = PranaDevice(sim.ble_device)
+    sim.attach(device)
+    await device.async_read_state()
+    samples = []
+    try:
+        for index in range(commands):
+            start = time.perf_counter()
+            await device.set_heating(index % 2 == 0)
+            await device.async_read_state()
+            samples.append(time.perf_counter() - start)
+    finally:
+        await device.stop()
+    samples.sort()
+    return {
+        "commands": commands,
+        "mean_ms": round(statistics.fmean(samples) * 1000, 3),
+        "p95_ms": round(samples[int(0.95 * (len(samples) - 1))] * 1000, 3),
+        "gatt_writes": sim.writes,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=100000)
+    parser.add_argument("--commands", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.01)
+    args = parser.parse_args()
+    results = {
+        "decode": bench_decode(args.frames),
+        "commands": asyncio.run(bench_commands(args.commands, args.latency)),
+        "homeassistant_imported": "homeassistant" in sys.modules,
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Raw frame capture to disk and deterministic replay.
+
+A capture file starts with CAPTURE_MAGIC followed by records of a 16 byte
+header (little endian monotonic timestamp as double, 6 byte MAC, frame
+length as uint16) and the raw frame bytes. Files rotate like log files:
+once a file would grow past max_bytes it is renamed to .1, .1 to .2 and
+so on, keeping backups old files.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable, Iterable, Iterator
+import os
+import struct
+import time
+from typing import NamedTuple, Optional
+
+CAPTURE_MAGIC = b"PRNACAP1"
+RECORD_HEADER = struct.Struct("<d6sH")
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+DEFAULT_BACKUPS = 3
+FLUSH_BYTES = 4096
+FLUSH_INTERVAL = 60
+
+
+class CapturedFrame(NamedTuple):
+    timestamp: float
+    mac: str
+    frame: bytes
+
+
+def _mac_to_bytes(mac: str) -> bytes:
+    return bytes.fromhex(mac.replace(":", "").replace("-", ""))
+
+
+def _bytes_to_mac(raw: bytes) -> str:
+    return ":".join(f"{byte:02X}" for byte in raw)
+
+
+class FrameCapture:
+    """Buffer frames in memory and append them to a rotating capture file.
+
+    record() only touches memory so it is safe in the notification handler;
+    take() hands the buffered bytes over and write() does the blocking file
+    work, meant to run in an executor.
+    """
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES, backups: int = DEFAULT_BACKUPS) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._buffer = bytearray()
+        self._last_flush = time.monotonic()
+
+    def record(self, mac: str, frame: bytes, timestamp: Optional[float] = None) -> bool:
+        """Buffer one frame; return True when the buffer is due to be written."""
+        now = time.monotonic() if timestamp is None else timestamp
+        self._buffer += RECORD_HEADER.pack(now, _mac_to_bytes(mac), len(frame))
+        self._buffer += frame
+        return len(self._buffer) >= FLUSH_BYTES or now - self._last_flush >= FLUSH_INTERVAL
+
+    def take(self) -> bytes:
+        """Return and clear the buffered records."""
+        chunk = bytes(self._buffer)
+        self._buffer.clear()
+        self._last_flush = time.monotonic()
+        return chunk
+
+    def write(self, chunk: bytes) -> None:
+        """Append records to the capture file, rotating it first if needed."""
+        if not chunk:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            size = 0
+        if size and size + len(chunk) > self.max_bytes:
+            self._rotate()
+            size = 0
+        with open(self.path, "ab") as file:
+            if not size:
+                file.write(CAPTURE_MAGIC)
+            file.write(chunk)
+
+    def _rotate(self) -> None:
+        for index in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+
+def read_capture(path: str) -> Iterator[CapturedFrame]:
+    """Yield the frames of one capture file in recorded order."""
+    with open(path, "rb") as file:
+        if file.read(len(CAPTURE_MAGIC)) != CAPTURE_MAGIC:
+            raise ValueError(f"{path} is not a Prana capture file")
+        while header := file.read(RECORD_HEADER.size):
+            if len(header) < RECORD_HEADER.size:
+                return  # Truncated by a crash while writing
+            timestamp, mac, length = RECORD_HEADER.unpack(header)
+            frame = file.read(length)
+            if len(frame) < length:
+                return
+            yield CapturedFrame(timestamp, _bytes_to_mac(mac), frame)
+
+
+def capture_files(path: str) -> list[str]:
+    """Return a capture file and its rotated backups, oldest first."""
+    files = []
+    index = 1
+    while os.path.exists(f"{path}.{index}"):
+        files.append(f"{path}.{index}")
+        index += 1
+    files.reverse()
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+
+async def async_replay(
+    frames: Iterable[CapturedFrame],
+    handler: Callable[[int, bytearray], Awaitable[None]],
+    speed: Optional[float] = 1.0,
+) -> int:
+    """Feed captured frames to a notification handler.
+
+    With speed set the original spacing is kept (2.0 replays twice as fast);
+    with speed None frames are fed back to back. Returns the frame count.
+    """
+    count = 0
+    first: Optional[float] = None
+    started = time.monotonic()
+    for captured in frames:
+        if speed:
+            if first is None:
+                first = captured.timestamp
+            delay = (captured.timestamp - first) / speed - (time.monotonic() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        await handler(0, bytearray(captured.frame))
+        count += 1
+    return count
@@ -0,0 +1,622 @@
+"""Async BLE client for one Prana ventilator."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+from datetime import datetime
+import logging
+import time
+from typing import Any, Optional, TypeVar, cast
+
+from bleak.backends.device import BLEDevice
+from bleak.backends.service import BleakGATTServiceCollection
+from bleak.exc import BleakDBusError
+from bleak_retry_connector import BLEAK_RETRY_EXCEPTIONS as BLEAK_EXCEPTIONS
+from bleak_retry_connector import (
+    BleakClientWithServiceCache,
+    BleakNotFoundError,
+    establish_connection,
+)
+
+from .codec import (
+    CONTROL_RW_CHARACTERISTIC_UUID,
+    MAX_BRIGHTNESS,
+    STATE_FRAME_MIN_LENGTH,
+    Cmd,
+    FrameAssembler,
+    parse_state,
+)
+from .state import Speed
+from .link import LinkModel
+from .stats import DeviceStats
+
+LOGGER = logging.getLogger(__name__)
+WRITE_CHARACTERISTIC_UUIDS = [CONTROL_RW_CHARACTERISTIC_UUID]
+READ_CHARACTERISTIC_UUIDS = [CONTROL_RW_CHARACTERISTIC_UUID]
+
+DISCONNECT_DELAY = 120
+# ATT MTU at which a whole state frame fits one notification (3 byte ATT header)
+STATE_FRAME_MTU = STATE_FRAME_MIN_LENGTH + 3
+# Unanswered state requests after which a connected link counts as half-open
+HALF_OPEN_AFTER = 3
+# Seconds the oldest of them must have waited, so command bursts do not trip it
+HALF_OPEN_GRACE = 5.0
+RETRY_BACKOFF_EXCEPTIONS = (BleakDBusError,)
+# Seconds without a state frame after which the device counts as unavailable
+STALE_AFTER = 300.0
+WrapFuncType = TypeVar("WrapFuncType", bound=Callable[..., Any])
+
+# State attributes copied from every decoded frame
+STATE_ATTRIBUTES = (
+    "speed", "speed_locked", "speed_in", "speed_out", "night_mode", "auto_mode",
+    "flows_locked", "is_on", "mini_heating_enabled", "winter_mode_enabled",
+    "is_input_fan_on", "is_output_fan_on", "brightness", "sensors", "timestamp",
+)
+
+
+def retry_bluetooth_connection_error(func: WrapFuncType) -> WrapFuncType:
+    """Define a wrapper to retry on bleak error.
+
+    The accessory is allowed to disconnect us any time so
+    we need to retry the operation. Attempts and backoff come from
+    the device's learned link model. Only the outermost decorated call
+    of a task retries and counts attempts; the decorated calls it makes
+    pass errors straight up to it.
+    """
+
+    async def _async_wrap_retry_bluetooth_connection_error(
+        self: "PranaDevice", *args: Any, **kwargs: Any
+    ) -> Any:
+        task = asyncio.current_task()
+        if task in self._operations:
+            return await func(self, *args, **kwargs)
+        self._operations.add(task)
+        start = time.monotonic()
+        try:
+            return await _retry(self, *args, **kwargs)
+        finally:
+            self._operations.discard(task)
+            self.stats.command_time.observe(time.monotonic() - start)
+
+    async def _retry(self: "PranaDevice", *args: Any, **kwargs: Any) -> Any:
+        tuning = self.link.tuning(self.rssi)
+        attempts = tuning.attempts
+        max_attempts = attempts - 1
+
+        for attempt in range(attempts):
+            try:
+                result = await func(self, *args, **kwargs)
+            except BleakNotFoundError:
+                # The lock cannot be found so there is no
+                # point in retrying.
+                self.stats.operation_failures += 1
+                raise
+            except RETRY_BACKOFF_EXCEPTIONS as err:
+                self.link.observe_attempt(self.rssi, True)
+                if attempt >= max_attempts:
+                    LOGGER.debug("%s: %s error calling %s, reach max attempts (%s/%s)",self.name,type(err),func,attempt,max_attempts,exc_info=True,)
+                    self.stats.retries_per_operation.observe(attempt)
+                    self.stats.operation_failures += 1
+                    raise
+                LOGGER.debug("%s: %s error calling %s, backing off %ss, retrying (%s/%s)...",self.name,type(err),func,tuning.backoff,attempt,max_attempts,exc_info=True,)
+                self.stats.retries += 1
+                await asyncio.sleep(tuning.backoff)
+            except BLEAK_EXCEPTIONS as err:
+                self.link.observe_attempt(self.rssi, True)
+                if attempt >= max_attempts:
+                    LOGGER.debug("%s: %s error calling %s, reach max attempts (%s/%s): %s",self.name,type(err),func,attempt,max_attempts,err,exc_info=True,)
+                    self.stats.retries_per_operation.observe(attempt)
+                    self.stats.operation_failures += 1
+                    raise
+                LOGGER.debug("%s: %s error calling %s, retrying  (%s/%s)...: %s",self.name,type(err),func,attempt,max_attempts,err,exc_info=True,)
+                self.stats.retries += 1
+            else:
+                self.link.observe_attempt(self.rssi, False)
+                self.stats.retries_per_operation.observe(attempt)
+                return result
+
+    return cast(WrapFuncType, _async_wrap_retry_bluetooth_connection_error)
+
+
+class PranaDevice:
+    """Connection, commands and last known state of one ventilator.
+
+    Connects on demand, subscribes to state notifications and disconnects
+    after DISCONNECT_DELAY seconds without commands. Every decoded frame
+    updates the state attributes; frame_callback sees each raw frame and
+    state_callback runs after a frame has been applied, with a flag telling
+    whether anything changed.
+
+    A link that stays connected but stops notifying is detected by counting
+    state requests without a frame in between; after half_open_after of
+    them (0 disables the check) it is torn down and reconnected in the
+    background.
+    """
+
+    def __init__(
+        self,
+        ble_device: Optional[BLEDevice],
+        name: Optional[str] = None,
+        frame_callback: Optional[Callable[[bytes, float], None]] = None,
+        state_callback: Optional[Callable[[bool, float], None]] = None,
+        half_open_after: int = HALF_OPEN_AFTER,
+    ) -> None:
+        self._device = ble_device
+        self.address = ble_device.address if ble_device is not None else None
+        self.name = name or self.address
+        self._frame_callback = frame_callback
+        self._state_callback = state_callback
+        # Swapped for the simulator's establish_connection when running without hardware
+        self._establish_connection = establish_connection
+        self._connect_lock: asyncio.Lock = asyncio.Lock()
+        self._client: BleakClientWithServiceCache | None = None
+        self._disconnect_timer: asyncio.TimerHandle | None = None
+        self._cached_services: BleakGATTServiceCollection | None = None
+        self._expected_disconnect = False
+        self._write_uuid = None
+        self._read_uuid = None
+        self._state_waiters: list[asyncio.Future] = []
+        self._last_frame: bytes | None = None
+        self._assembler = FrameAssembler()
+        # Tasks inside a decorated call, nested calls in them do not retry
+        self._operations: set[asyncio.Task] = set()
+        self.mtu: int | None = None
+        self.half_open_after = half_open_after
+        self._unanswered = 0
+        self._unanswered_since: float | None = None
+        self._reconnect_task: asyncio.Task | None = None
+        self.stats = DeviceStats()
+        self.link = LinkModel()
+
+        # Device data
+        self.speed = 0 #calculated
+        self.speed_locked: Optional[int] = None
+        self.speed_in: Optional[int] = None
+        self.speed_out: Optional[int] = None
+        self.night_mode: Optional[bool] = None
+        self.auto_mode: Optional[bool] = None
+        self.flows_locked: Optional[bool] = None
+        self.is_on: Optional[bool] = None
+        self.mini_heating_enabled: Optional[bool] = None
+        self.winter_mode_enabled: Optional[bool] = None
+        self.is_input_fan_on: Optional[bool] = None
+        self.is_output_fan_on: Optional[bool] = None
+        self.brightness: Optional[int] = None
+        self.sensors: Optional[dict[str, Any]] = None
+        self.timestamp: Optional[datetime] = None
+        self.lastRead: Optional[datetime] = None
+        # time.monotonic() of the last state frame, drives availability
+        self.last_frame_at: Optional[float] = None
+
+    @property
+    def rssi(self):
+        return self._device.rssi
+
+    def is_available(self, now: float) -> bool:
+        """Return if a state frame arrived within STALE_AFTER of now (monotonic)."""
+        return self.last_frame_at is not None and now - self.last_frame_at < STALE_AFTER
+
+    @property
+    def is_connected(self) -> bool:
+        return self._client is not None and self._client.is_connected
+
+    def set_ble_device(self, ble_device: BLEDevice) -> None:
+        """Use a fresher BLEDevice, e.g. one seen through another adapter."""
+        self._device = ble_device
+
+    async def _write(self, data: bytearray, await_response: bool = False):
+        """Send command to device and read response."""
+        await self._ensure_connected()
+        return await self._write_while_connected(data, await_response)
+
+    async def _write_while_connected(self, data: bytearray, await_response: bool = False):
+        LOGGER.debug("Before command")
+        await self._timed_write(data, await_response)
+
+        # Update the info after each command
+        if(Cmd.READ_STATE != data):
+            LOGGER.debug("Before read state")
+            try:
+                return await self._timed_write(Cmd.READ_STATE, True)
+            except BLEAK_EXCEPTIONS as error:
+                # The command went out, a retry would send relative commands twice
+                LOGGER.debug("%s: State request after %s failed: %s", self.name, data.hex(), error)
+
+    async def _timed_write(self, data: bytearray, await_response: bool):
+        rssi = self.rssi
+        start = time.monotonic()
+        async with asyncio.timeout(self.link.tuning(rssi).write_timeout):
+            result = await self._client.write_gatt_char(self._write_uuid, data, await_response)
+        elapsed = time.monotonic() - start
+        self.stats.write_time.observe(elapsed)
+        if await_response:
+            # Writes without response return at once and would drag the timeout down
+            self.link.observe_write(rssi, elapsed)
+        if data == Cmd.READ_STATE:
+            self._state_requested(start)
+        return result
+
+    def _state_requested(self, now: float) -> None:
+        """Count a state request and reconnect when too many went unanswered."""
+        self._unanswered += 1
+        if self._unanswered_since is None:
+            self._unanswered_since = now
+        if (
+            not self.half_open_after
+            or self._unanswered < self.half_open_after
+            or now - self._unanswered_since < HALF_OPEN_GRACE
+        ):
+            return
+        self.stats.half_open_links += 1
+        LOGGER.warning(
+            "%s: %s state requests unanswered for %.0f s, link is half-open, reconnecting",
+            self.name, self._unanswered, now - self._unanswered_since,
+        )
+        self._unanswered = 0
+        self._unanswered_since = None
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = asyncio.get_running_loop().create_task(self._async_reconnect())
+
+    async def _async_reconnect(self) -> None:
+        """Drop the connection and connect again by requesting the state."""
+        await self._execute_disconnect()
+        try:
+            await self.get_status_details()
+        except BLEAK_EXCEPTIONS as error:
+            LOGGER.debug("%s: Reconnect after half-open link failed: %s", self.name, error)
+
+    # @retry_bluetooth_connection_error
+    # async def set_high_speed(self):
+    #     await self._write(Cmd.ENABLE_HIGH_SPEED)
+
+    @retry_bluetooth_connection_error
+    async def speed_up(self):
+        await self._write(Cmd.SPEED_UP)
+
+    @retry_bluetooth_connection_error
+    async def speed_down(self):
+        await self._write(Cmd.SPEED_DOWN)
+
+    @retry_bluetooth_connection_error
+    async def set_low_speed(self):
+        await self._write(Cmd.ENABLE_NIGHT_MODE)
+
+    @retry_bluetooth_connection_error
+    async def set_night_mode(self):
+        await self._write(Cmd.ENABLE_NIGHT_MODE)
+
+    @retry_bluetooth_connection_error
+    async def set_normal_speed(self):
+        await self.set_speed(Speed.SPEED_3.to_int())
+
+    @retry_bluetooth_connection_error
+    async def get_status_details(self):
+        return await self._write(Cmd.READ_STATE)
+
+    async def async_read_state(self, timeout: float = 10) -> None:
+        """Request a state frame and wait until it has been applied."""
+        waiter = asyncio.get_running_loop().create_future()
+        self._state_waiters.append(waiter)
+        try:
+            await self.get_status_details()
+            async with asyncio.timeout(timeout):
+                await waiter
+        finally:
+            if waiter in self._state_waiters:
+                self._state_waiters.remove(waiter)
+
+    @retry_bluetooth_connection_error
+    async def set_speed(self, speed: int):
+        if (speed == self.speed):
+            return
+
+        if not self.is_on:
+            await self.turn_on()
+            # Off reports speed 0; step from the speed the fans resumed at
+            await self.async_read_state()
+            if speed == self.speed:
+                return
+
+        direction_up = speed > self.speed
+        counter = self.speed
+        if direction_up:
+            while counter < speed:
+                await self.speed_up()
+                counter += 1
+        else:
+            while counter > speed:
+                await self.speed_down()
+                counter -= 1
+        self.speed = speed
+
+    @retry_bluetooth_connection_error
+    async def set_brightness(self, brightness: int):
+        if brightness < 0 or brightness > 6:
+            raise ValueError("brightness value must be in range 0-6")
+        if self.brightness is None:
+            await self.async_read_state()
+        original_brightness = self.brightness
+        if brightness == original_brightness:
+            return
+        if brightness > original_brightness:
+            counter = brightness - original_brightness
+        else:
+            counter = brightness + (MAX_BRIGHTNESS - original_brightness)
+        while counter > 0:
+            await self.brightness_up()
+            counter -= 1
+
+    @retry_bluetooth_connection_error
+    async def set_brightness_pct(self, brightness_pct: int):
+        """
+        Set brightness in percents (0-100)
+        :param brightness_pct: integer in 0-100 range
+        :return:
+        """
+        if brightness_pct < 0 or brightness_pct > 100:
+            raise ValueError("brightness_pct is percent value (range 0-100)")
+        return await self.set_brightness(round(MAX_BRIGHTNESS * brightness_pct / 100))
+
+    @retry_bluetooth_connection_error
+    async def brightness_up(self):
+        await self._write(Cmd.CHANGE_BRIGHTNESS)
+
+    @retry_bluetooth_connection_error
+    async def set_heating(self, enable: bool):
+        if self.mini_heating_enabled != enable:
+            LOGGER.debug("Set heating mode")
+            await self._write(Cmd.TOGGLE_HEATING, True)
+            self.mini_heating_enabled = enable
+
+    @retry_bluetooth_connection_error
+    async def set_winter_mode(self, enable: bool):
+        if self.winter_mode_enabled != enable:
+            return await self._write(Cmd.TOGGLE_WINTER_MODE)
+
+    @retry_bluetooth_connection_error
+    async def turn_off(self):
+        LOGGER.debug("turn off")
+        self.is_on = False
+        return await self._write(Cmd.STOP)
+
+    @retry_bluetooth_connection_error
+    async def turn_on(self):
+        LOGGER.debug("turn on")
+        self.is_on = True
+        return await self._write(Cmd.START)
+
+    @retry_bluetooth_connection_error
+    async def toggle_air_in_off(self):
+        self.is_input_fan_on = not self.is_input_fan_on
+        return await self._write(Cmd.FLOW_IN_OFF)
+
+    @retry_bluetooth_connection_error
+    async def toggle_air_out_off(self):
+        self.is_output_fan_on = not self.is_output_fan_on
+        return await self._write(Cmd.FLOW_OUT_OFF)
+
+    @retry_bluetooth_connection_error
+    async def toggle_auto_mode(self):
+        self.auto_mode = not self.auto_mode
+        return await self._write(Cmd.AUTO_MODE)
+
+    @retry_bluetooth_connection_error
+    async def set_auto_mode(self):
+        if not self.auto_mode:
+            self.auto_mode = True
+            await self._write(Cmd.AUTO_MODE)
+
+    async def set_direction(self, direction: str) -> None:
+        """Run only the supply (forward) or extract (reverse) fan."""
+        if direction == 'reverse':
+            if not self.is_input_fan_on:
+                await self.toggle_air_in_off()
+
+            await self.toggle_air_out_off()
+        elif direction == 'forward':
+            if not self.is_output_fan_on:
+                await self.toggle_air_out_off()
+
+            await self.toggle_air_in_off()
+
+    async def apply_state(
+        self,
+        is_on: Optional[bool] = None,
+        speed: Optional[int] = None,
+        auto_mode: Optional[bool] = None,
+        heating: Optional[bool] = None,
+        winter_mode: Optional[bool] = None,
+    ) -> None:
+        """Bring the device to a target state, skipping fields already in place."""
+        if heating is not None:
+            await self.set_heating(heating)
+        if winter_mode is not None:
+            await self.set_winter_mode(winter_mode)
+        if auto_mode is not None and auto_mode != bool(self.auto_mode):
+            await self.toggle_auto_mode()
+
+        if is_on is False or speed == 0:
+            if self.is_on:
+                await self.turn_off()
+        elif speed is not None:
+            await self.set_speed(speed)
+        elif is_on and not self.is_on:
+            await self.turn_on()
+
+    async def _notification_handler(self, _sender: int, data: bytearray) -> None:
+        """Handle notification responses."""
+        now = time.monotonic()
+        self._unanswered = 0
+        self._unanswered_since = None
+        frame = self._assembler.feed(data)
+        self.stats.frames_reassembled = self._assembler.reassembled
+        self.stats.fragments_discarded = self._assembler.discarded
+        if frame is None:
+            return
+        data = frame
+        self.stats.frames_received += 1
+        if self._frame_callback is not None:
+            self._frame_callback(data, now)
+        was_available = self.is_available(now)
+        self.last_frame_at = now
+        self.lastRead = datetime.now()
+        if data == self._last_frame:
+            # Same bytes as the previous frame, nothing new to decode
+            self.stats.frames_deduplicated += 1
+            changed = not was_available
+        else:
+            state = parse_state(data)
+            LOGGER.debug("State data from notifiation: %s", state)
+            if state is None:
+                return
+            self._last_frame = bytes(data)
+            dict_state = state.to_dict()
+            changed = not was_available
+            for key in STATE_ATTRIBUTES:
+                if key not in ("timestamp", "sensors") and getattr(self, key) != dict_state[key]:
+                    changed = True
+                setattr(self, key, dict_state[key])
+
+        if self._state_callback is not None:
+            self._state_callback(changed, now)
+        for waiter in self._state_waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    @retry_bluetooth_connection_error
+    async def _ensure_connected(self) -> None:
+        """Ensure connection to device is established."""
+        if self._connect_lock.locked():
+            LOGGER.debug(
+                "%s: Connection already in progress, waiting for it to complete; RSSI: %s",
+                self.name,
+                self.rssi,
+            )
+        if self._client and self._client.is_connected:
+            self._reset_disconnect_timer()
+            return
+        async with self._connect_lock:
+            # Check again while holding the lock
+            if self._client and self._client.is_connected:
+                self._reset_disconnect_timer()
+                return
+            rssi = self.rssi
+            tuning = self.link.tuning(rssi)
+            LOGGER.debug("%s: Connecting; RSSI: %s; %s", self.name, rssi, tuning)
+            start = time.monotonic()
+            try:
+                async with asyncio.timeout(tuning.connect_timeout):
+                    client = await self._establish_connection(
+                        BleakClientWithServiceCache,
+                        self._device,
+                        self.name,
+                        self._disconnected,
+                        max_attempts=tuning.connect_attempts,
+                        cached_services=self._cached_services,
+                        ble_device_callback=lambda: self._device,
+                    )
+            except BaseException as error:
+                # Cancelled by the caller (unload, a service or flow timeout), not a link failure
+                if not isinstance(error, asyncio.CancelledError):
+                    self.stats.connect_failures += 1
+                    self.link.observe_connect(rssi, None)
+                raise
+            elapsed = time.monotonic() - start
+            self.stats.connects += 1
+            self.stats.connect_time.observe(elapsed)
+            self.link.observe_connect(rssi, elapsed)
+            LOGGER.debug("%s: Connected; RSSI: %s", self.name, self.rssi)
+
+            self._read_uuid = READ_CHARACTERISTIC_UUIDS[0]
+            self._write_uuid = WRITE_CHARACTERISTIC_UUIDS[0]
+            self._cached_services = client.services
+            self._client = client
+            self._unanswered = 0
+            self._unanswered_since = None
+            self._assembler.reset()
+            await self._acquire_mtu(client)
+            self._reset_disconnect_timer()
+
+            LOGGER.debug("%s: Subscribe to notifications; RSSI: %s", self.name, self.rssi)
+            await client.start_notify(self._read_uuid, self._notification_handler)
+
+    async def _acquire_mtu(self, client: BleakClientWithServiceCache) -> None:
+        """Learn the negotiated ATT MTU, asking BlueZ for it where needed.
+
+        bleak cannot request a particular MTU. BlueZ exchanges the largest
+        one on connect but only reports it once acquired; proxies and other
+        backends negotiate on their own. Frames that still do not fit one
+        notification are reassembled.
+        """
+        acquire = getattr(getattr(client, "_backend", None), "_acquire_mtu", None)
+        try:
+            if acquire is not None:
+                await acquire()
+            self.mtu = client.mtu_size
+        except BLEAK_EXCEPTIONS as error:
+            LOGGER.debug("%s: Could not acquire the MTU: %s", self.name, error)
+            return
+        if self.mtu is not None and self.mtu < STATE_FRAME_MTU:
+            LOGGER.debug("%s: MTU %s is below %s, state frames will be reassembled", self.name, self.mtu, STATE_FRAME_MTU)
+
+    def _reset_disconnect_timer(self) -> None:
+        """Reset disconnect timer."""
+        if self._disconnect_timer:
+            self._disconnect_timer.cancel()
+        self._expected_disconnect = False
+        self._disconnect_timer = asyncio.get_running_loop().call_later(
+            DISCONNECT_DELAY, self._disconnect
+        )
+
+    def _disconnected(self, client: BleakClientWithServiceCache) -> None:
+        """Disconnected callback."""
+        if self._expected_disconnect:
+            self.stats.disconnects_expected += 1
+            LOGGER.debug("%s: Disconnected from device; RSSI: %s", self.name, self.rssi)
+            return
+        self.stats.disconnects_unexpected += 1
+        LOGGER.warning("%s: Device unexpectedly disconnected; RSSI: %s",self.name,self.rssi,)
+
+    def _disconnect(self) -> None:
+        """Disconnect from device."""
+        self._disconnect_timer = None
+        asyncio.create_task(self._execute_timed_disconnect())
+
+    async def async_disconnect(self) -> None:
+        """Disconnect now instead of after DISCONNECT_DELAY, freeing the adapter slot."""
+        if self._disconnect_timer:
+            self._disconnect_timer.cancel()
+            self._disconnect_timer = None
+        await self._execute_disconnect()
+
+    async def stop(self) -> None:
+        """Cancel the idle disconnect timer and disconnect from the device."""
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+        await self.async_disconnect()
+
+    async def _execute_timed_disconnect(self) -> None:
+        """Execute timed disconnection."""
+        LOGGER.debug(
+            "%s: Disconnecting after timeout of %s",
+            self.name,
+            DISCONNECT_DELAY,
+        )
+        await self._execute_disconnect()
+
+    async def _execute_disconnect(self) -> None:
+        """Execute disconnection."""
+        async with self._connect_lock:
+            read_char = self._read_uuid
+            client = self._client
+            self._expected_disconnect = True
+            self._client = None
+            self._write_uuid = None
+            self._read_uuid = None
+            if client and client.is_connected:
+                try:
+                    await client.stop_notify(read_char)
+                except BLEAK_EXCEPTIONS as error:
+                    # A dead link must not keep the connection open
+                    LOGGER.debug("%s: Failed to stop notifications: %s", self.name, error)
+                await client.disconnect()
@@ -0,0 +1,163 @@
+"""Prana 0xBEEF protocol: GATT layout, command opcodes and the state frame decoder."""
+from __future__ import annotations
+
+from datetime import datetime
+from math import log2
+import struct
+from typing import Optional
+
+from .state import PranaSensorsState, PranaState
+
+CONTROL_SERVICE_UUID = "0000baba-0000-1000-8000-00805f9b34fb"
+CONTROL_RW_CHARACTERISTIC_UUID = "0000cccc-0000-1000-8000-00805f9b34fb"
+STATE_MSG_PREFIX = b"\xbe\xef"
+MAX_BRIGHTNESS = 6
+
+
+class Cmd:
+    ENABLE_HIGH_SPEED = bytearray([0xBE, 0xEF, 0x04, 0x07])
+    ENABLE_NIGHT_MODE = bytearray([0xBE, 0xEF, 0x04, 0x06])
+    TOGGLE_FLOW_LOCK = bytearray([0xBE, 0xEF, 0x04, 0x09])
+    TOGGLE_HEATING = bytearray([0xBE, 0xEF, 0x04, 0x05])
+    TOGGLE_WINTER_MODE = bytearray([0xBE, 0xEF, 0x04, 0x16])
+
+    SPEED_UP = bytearray([0xBE, 0xEF, 0x04, 0x0C])
+    SPEED_DOWN = bytearray([0xBE, 0xEF, 0x04, 0x0B])
+    SPEED_IN_UP = bytearray([0xBE, 0xEF, 0x04, 0x0E])
+    SPEED_IN_DOWN = bytearray([0xBE, 0xEF, 0x04, 0x0F])
+    SPEED_OUT_UP = bytearray([0xBE, 0xEF, 0x04, 0x11])
+    SPEED_OUT_DOWN = bytearray([0xBE, 0xEF, 0x04, 0x12])
+
+    FLOW_IN_OFF = bytearray([0xBE, 0xEF, 0x04, 0x0D])
+    FLOW_OUT_OFF = bytearray([0xBE, 0xEF, 0x04, 0x10])
+
+    START = bytearray([0xBE, 0xEF, 0x04, 0x0A])
+    STOP = bytearray([0xBE, 0xEF, 0x04, 0x01])
+    READ_STATE = bytearray([0xBE, 0xEF, 0x05, 0x01, 0x00, 0x00, 0x00, 0x00, 0x5A])
+    READ_DEVICE_DETAILS = bytearray([0xBE, 0xEF, 0x05, 0x02, 0x00, 0x00, 0x00, 0x00, 0x5A])
+    CHANGE_BRIGHTNESS = bytearray([0xBE, 0xEF, 0x04, 0x02])
+    AUTO_MODE = bytearray([0xBE, 0xEF, 0x04, 0x18])
+
+
+# Byte offsets inside a state frame
+OFFSET_IS_ON = 10
+OFFSET_BRIGHTNESS = 12  # one-hot, brightness = log2(value) + 1
+OFFSET_HEATING = 14
+OFFSET_NIGHT_MODE = 16
+OFFSET_AUTO_MODE = 20
+OFFSET_FLOWS_LOCKED = 22
+OFFSET_SPEED_LOCKED = 26  # speed * 10
+OFFSET_INPUT_FAN_ON = 28
+OFFSET_SPEED_IN = 30  # speed * 10
+OFFSET_OUTPUT_FAN_ON = 32
+OFFSET_SPEED_OUT = 34  # speed * 10
+OFFSET_WINTER_MODE = 42
+OFFSET_TEMPERATURE_IN_LEGACY = 49  # uint8, °C * 10
+OFFSET_TEMPERATURE_IN = 51  # 14 bit big endian, °C * 10
+OFFSET_TEMPERATURE_OUT = 54  # 14 bit big endian, °C * 10
+OFFSET_TEMPERATURE_OUT_LEGACY = 55  # uint8, °C * 10
+OFFSET_HUMIDITY = 60  # humidity + 128
+OFFSET_CO2 = 61  # 14 bit big endian
+OFFSET_VOC = 63  # 14 bit big endian
+OFFSET_PRESSURE = 78  # pressure - 512
+# Shortest frame parse_state can decode, the last offset it reads plus one
+STATE_FRAME_MIN_LENGTH = OFFSET_PRESSURE + 1
+
+SENSOR_MASK = 0b0011111111111111
+# Firmware reporting CO2 in this range uses the 14 bit temperature layout
+CO2_FIRMWARE_RANGE = (0, 10000)
+SPEED_DIVISOR = 10
+PRESSURE_OFFSET = 512
+HUMIDITY_OFFSET = 128
+
+
+def _sensor_word(data: bytes, offset: int) -> int:
+    return struct.unpack_from(">h", data, offset)[0] & SENSOR_MASK
+
+
+def parse_state(data: bytes) -> Optional[PranaState]:
+    """Decode a state frame, None if data is not one."""
+    if not data[:2] == STATE_MSG_PREFIX or len(data) < STATE_FRAME_MIN_LENGTH:
+        return None
+    s = PranaState()
+    s.timestamp = datetime.now()
+    s.brightness = int(log2(data[OFFSET_BRIGHTNESS]) + 1)
+    s.speed_locked = int(data[OFFSET_SPEED_LOCKED] / SPEED_DIVISOR)
+    s.speed_in = int(data[OFFSET_SPEED_IN] / SPEED_DIVISOR)
+    s.speed_out = int(data[OFFSET_SPEED_OUT] / SPEED_DIVISOR)
+    s.auto_mode = bool(data[OFFSET_AUTO_MODE])
+    s.night_mode = bool(data[OFFSET_NIGHT_MODE])
+    s.flows_locked = bool(data[OFFSET_FLOWS_LOCKED])
+    s.is_on = bool(data[OFFSET_IS_ON])
+    s.mini_heating_enabled = bool(data[OFFSET_HEATING])
+    s.winter_mode_enabled = bool(data[OFFSET_WINTER_MODE])
+    s.is_input_fan_on = bool(data[OFFSET_INPUT_FAN_ON])
+    s.is_output_fan_on = bool(data[OFFSET_OUTPUT_FAN_ON])
+
+    # Reading sensors
+    sensors = PranaSensorsState()
+    sensors.humidity = int(data[OFFSET_HUMIDITY] - HUMIDITY_OFFSET)
+    sensors.pressure = PRESSURE_OFFSET + int(data[OFFSET_PRESSURE])
+    # co2 and voc
+    sensors.co2 = int(_sensor_word(data, OFFSET_CO2))
+    sensors.voc = int(_sensor_word(data, OFFSET_VOC))
+    if CO2_FIRMWARE_RANGE[0] < sensors.co2 < CO2_FIRMWARE_RANGE[1]:
+        # Different version of firmware ???
+        sensors.temperature_in = float(_sensor_word(data, OFFSET_TEMPERATURE_IN)) / 10.0
+        sensors.temperature_out = float(_sensor_word(data, OFFSET_TEMPERATURE_OUT)) / 10.0
+    else:
+        sensors.temperature_in = float(data[OFFSET_TEMPERATURE_IN_LEGACY]) / 10
+        sensors.temperature_out = float(data[OFFSET_TEMPERATURE_OUT_LEGACY]) / 10
+    # Add sensors to the state only in case device has corresponding hardware
+    if sensors.humidity > 0:
+        s.sensors = sensors
+    return s
+
+
+class FrameAssembler:
+    """Rebuild state frames that arrive split over several notifications.
+
+    Below an ATT MTU of STATE_FRAME_MIN_LENGTH + 3 a frame comes as a
+    notification starting with STATE_MSG_PREFIX followed by continuation
+    notifications. They are joined until the frame is long enough to
+    decode; the rest of that frame is skipped. A partial frame cut short
+    by a new prefix, or a continuation without a start, is counted in
+    discarded instead of being decoded.
+    """
+
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+        self._collecting = False
+        self._in_tail = False
+        self.reassembled = 0
+        self.discarded = 0
+
+    def reset(self) -> None:
+        """Forget a partial frame, e.g. after reconnecting."""
+        self._buffer.clear()
+        self._collecting = False
+        self._in_tail = False
+
+    def feed(self, data: bytes) -> Optional[bytes]:
+        """Add one notification; return a complete frame once there is one."""
+        if data[:2] == STATE_MSG_PREFIX:
+            if self._collecting:
+                self.discarded += 1
+            self._in_tail = False
+            if len(data) >= STATE_FRAME_MIN_LENGTH:
+                self._collecting = False
+                return bytes(data)
+            self._buffer[:] = data
+            self._collecting = True
+            return None
+        if self._collecting:
+            self._buffer += data
+            if len(self._buffer) < STATE_FRAME_MIN_LENGTH:
+                return None
+            self._collecting = False
+            self._in_tail = True
+            self.reassembled += 1
+            return bytes(self._buffer)
+        if not self._in_tail:
+            self.discarded += 1
+        return None
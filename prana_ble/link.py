@@ -0,0 +1,195 @@
+"""Learned link quality per device, used to tune retries and timeouts.
+
+Connect and write latencies are tracked like TCP round trip times (a
+smoothed mean and mean deviation) and failures as a moving failure rate,
+separately per RSSI band. A unit next to its proxy gets short timeouts
+and few attempts, a distant one the patience its history says it needs.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+import math
+from typing import Any, Optional
+
+# Lower RSSI bound of each band in dBm, anything weaker falls in the last band
+RSSI_BANDS = (-60, -70, -80, -90)
+# Gains of the smoothed mean and of the mean deviation
+MEAN_GAIN = 0.125
+DEVIATION_GAIN = 0.25
+# Weight of the newest outcome in the failure rates
+FAILURE_GAIN = 0.05
+# Outcomes a band needs before its numbers are trusted
+MIN_SAMPLES = 5
+# Probability of giving up on an operation the attempts are sized for
+TARGET_GIVE_UP = 0.01
+# Seconds to start connecting ahead of a scheduled command without data
+DEFAULT_CONNECT_LEAD = 10.0
+# Bumped when the meaning of the saved numbers changes, older models are dropped
+MODEL_VERSION = 2
+
+
+@dataclass(frozen=True)
+class LinkTuning:
+    attempts: int
+    backoff: float
+    write_timeout: float
+    connect_attempts: int
+    # None leaves the deadline to bleak_retry_connector
+    connect_timeout: Optional[float]
+
+
+DEFAULT_TUNING = LinkTuning(attempts=3, backoff=0.25, write_timeout=10.0, connect_attempts=4, connect_timeout=None)
+
+
+def _clamp(value: float, low: float, high: float) -> float:
+    return min(max(value, low), high)
+
+
+def _attempts(failure_rate: float, low: int, high: int) -> int:
+    """Attempts needed so that all of them fail with at most TARGET_GIVE_UP probability."""
+    failure_rate = _clamp(failure_rate, 0.001, 0.95)
+    return int(_clamp(math.ceil(math.log(TARGET_GIVE_UP) / math.log(failure_rate)), low, high))
+
+
+class LatencyEstimate:
+    """Smoothed latency and its mean deviation."""
+
+    __slots__ = ("mean", "deviation", "samples")
+
+    def __init__(self, mean: float = 0.0, deviation: float = 0.0, samples: int = 0) -> None:
+        self.mean = mean
+        self.deviation = deviation
+        self.samples = samples
+
+    def observe(self, value: float) -> None:
+        if not self.samples:
+            self.mean = value
+            self.deviation = value / 2
+        else:
+            self.deviation += DEVIATION_GAIN * (abs(value - self.mean) - self.deviation)
+            self.mean += MEAN_GAIN * (value - self.mean)
+        self.samples += 1
+
+    def bound(self, low: float, high: float) -> float:
+        """Latency that is rarely exceeded, clamped to [low, high]."""
+        return _clamp(self.mean + 4 * self.deviation, low, high)
+
+    def as_list(self) -> list[float]:
+        return [round(self.mean, 6), round(self.deviation, 6), self.samples]
+
+
+class LinkBand:
+    """Outcomes observed while the device was heard within one RSSI band."""
+
+    __slots__ = ("connect", "write", "connect_failure_rate", "failure_rate", "operations")
+
+    def __init__(self) -> None:
+        self.connect = LatencyEstimate()
+        self.write = LatencyEstimate()
+        self.connect_failure_rate = 0.0
+        self.failure_rate = 0.0
+        self.operations = 0
+
+    def tuning(self) -> LinkTuning:
+        attempts = DEFAULT_TUNING.attempts
+        if self.operations >= MIN_SAMPLES:
+            attempts = _attempts(self.failure_rate, 2, 6)
+        backoff, write_timeout = DEFAULT_TUNING.backoff, DEFAULT_TUNING.write_timeout
+        if self.write.samples >= MIN_SAMPLES:
+            backoff = self.write.bound(0.05, 2.0)
+            write_timeout = self.write.bound(1.0, 10.0)
+        connect_attempts, connect_timeout = DEFAULT_TUNING.connect_attempts, DEFAULT_TUNING.connect_timeout
+        if self.connect.samples >= MIN_SAMPLES:
+            connect_attempts = _attempts(self.connect_failure_rate, 2, 6)
+            connect_timeout = connect_attempts * self.connect.bound(5.0, 30.0)
+        return LinkTuning(attempts, round(backoff, 3), round(write_timeout, 3), connect_attempts, connect_timeout)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "connect": self.connect.as_list(),
+            "write": self.write.as_list(),
+            "connect_failure_rate": round(self.connect_failure_rate, 6),
+            "failure_rate": round(self.failure_rate, 6),
+            "operations": self.operations,
+        }
+
+    def restore(self, data: dict[str, Any]) -> None:
+        self.connect = LatencyEstimate(*data["connect"])
+        self.write = LatencyEstimate(*data["write"])
+        self.connect_failure_rate = data["connect_failure_rate"]
+        self.failure_rate = data["failure_rate"]
+        self.operations = data["operations"]
+
+
+class LinkModel:
+    """Rolling model of one device's link, by RSSI band."""
+
+    def __init__(self) -> None:
+        # One band per bound plus one for weaker signals and one for an unknown RSSI
+        self.bands = [LinkBand() for _ in range(len(RSSI_BANDS) + 2)]
+
+    @staticmethod
+    def band_index(rssi: Optional[int]) -> int:
+        if rssi is None:
+            return len(RSSI_BANDS) + 1
+        for index, bound in enumerate(RSSI_BANDS):
+            if rssi >= bound:
+                return index
+        return len(RSSI_BANDS)
+
+    def observe_connect(self, rssi: Optional[int], seconds: Optional[float]) -> None:
+        """Record a connection attempt; seconds is None when it failed."""
+        band = self.bands[self.band_index(rssi)]
+        band.connect_failure_rate += FAILURE_GAIN * ((seconds is None) - band.connect_failure_rate)
+        if seconds is not None:
+            band.connect.observe(seconds)
+
+    def observe_write(self, rssi: Optional[int], seconds: float) -> None:
+        """Record a write that waited for the device's response."""
+        self.bands[self.band_index(rssi)].write.observe(seconds)
+
+    def observe_attempt(self, rssi: Optional[int], failed: bool) -> None:
+        """Record the outcome of one attempt of a retried operation."""
+        band = self.bands[self.band_index(rssi)]
+        band.failure_rate += FAILURE_GAIN * (failed - band.failure_rate)
+        band.operations += 1
+
+    def tuning(self, rssi: Optional[int]) -> LinkTuning:
+        """Tuning from the band of rssi, or the nearest band that has seen enough."""
+        index = self.band_index(rssi)
+        measured = [
+            position for position, band in enumerate(self.bands[: len(RSSI_BANDS) + 1])
+            if band.operations >= MIN_SAMPLES or band.write.samples >= MIN_SAMPLES
+        ]
+        if self.bands[index].operations < MIN_SAMPLES and self.bands[index].write.samples < MIN_SAMPLES:
+            if not measured:
+                return DEFAULT_TUNING
+            # For an unknown RSSI the weakest measured band is the safe guess
+            index = measured[-1] if index > len(RSSI_BANDS) else min(measured, key=lambda position: abs(position - index))
+        return self.bands[index].tuning()
+
+    def connect_lead(self, rssi: Optional[int], high: float) -> float:
+        """Seconds a connection attempt at rssi should be started before it is needed.
+
+        Uses the band's rarely exceeded connect time, stretched by its
+        failure rate for the attempts that will be retried. Without enough
+        data for the band, the slowest measured band is the safe guess.
+        """
+        band = self.bands[self.band_index(rssi)]
+        if band.connect.samples < MIN_SAMPLES:
+            measured = [other for other in self.bands if other.connect.samples >= MIN_SAMPLES]
+            if not measured:
+                return min(DEFAULT_CONNECT_LEAD, high)
+            band = max(measured, key=lambda other: other.connect.mean)
+        failure_rate = _clamp(band.connect_failure_rate, 0.0, 0.9)
+        return _clamp(band.connect.bound(1.0, high) / (1 - failure_rate), 1.0, high)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"version": MODEL_VERSION, "rssi_bands": list(RSSI_BANDS), "bands": [band.as_dict() for band in self.bands]}
+
+    def restore(self, data: Optional[dict[str, Any]]) -> None:
+        """Load a model saved by as_dict; ignore it when the version or bands have changed."""
+        if not data or data.get("version") != MODEL_VERSION or data.get("rssi_bands") != list(RSSI_BANDS):
+            return
+        for band, saved in zip(self.bands, data["bands"]):
+            band.restore(saved)
@@ -0,0 +1,51 @@
+"""Plan scheduled commands for more devices than there are adapter slots.
+
+A device is connected ahead of a scheduled command by its connect lead and
+keeps its adapter slot until the command. With more devices than slots,
+the devices go in waves of at most limit. The last wave applies at the
+requested time, and each earlier wave applies earlier by the lead of the
+wave after it plus a gap. In the gap a wave finishes its command and
+disconnects, so the next wave finds free slots.
+"""
+from __future__ import annotations
+
+from collections.abc import Mapping
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+
+@dataclass(frozen=True)
+class Wave:
+    keys: list[str]
+    apply_at: datetime
+    # Seconds to connect ahead of apply_at, the slowest device's lead
+    lead: float
+    # Disconnect after the command to free the slots for the next wave
+    release: bool
+
+    @property
+    def connect_at(self) -> datetime:
+        return self.apply_at - timedelta(seconds=self.lead)
+
+
+def plan_waves(leads: Mapping[str, float], limit: int, end: datetime, now: datetime, gap: float) -> list[Wave]:
+    """Split devices (key -> connect lead in seconds) into waves ending at end.
+
+    Slow devices go first, so the waves moved forward the most are the
+    quick ones. When there is not enough time before end, all waves move
+    later rather than overlap.
+    """
+    keys = sorted(leads, key=leads.__getitem__, reverse=True)
+    groups = [keys[start : start + limit] for start in range(0, len(keys), limit)]
+    times = []
+    apply_at = end
+    for group in reversed(groups):
+        lead = max(leads[key] for key in group)
+        times.append((apply_at, lead))
+        apply_at -= timedelta(seconds=lead + gap)
+    times.reverse()
+    late = max(now - times[0][0], timedelta(0)) if times else timedelta(0)
+    return [
+        Wave(group, apply_at + late, lead, index < len(groups) - 1)
+        for index, (group, (apply_at, lead)) in enumerate(zip(groups, times))
+    ]
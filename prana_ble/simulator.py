@@ -0,0 +1,386 @@
+"""In-process Prana device simulator speaking the 0xBEEF protocol.
+
+The simulator stands in for the bleak client so PranaDevice can be driven
+without hardware:
+
+    sim = SimulatedPrana("00:11:22:33:44:55", latency=0.05, loss=0.01)
+    device = PranaDevice(sim.ble_device)
+    sim.attach(device)
+
+It handles every opcode of codec.Cmd, answers READ_STATE with a
+state frame in either firmware layout the decoder understands and can add
+latency, dropped packets, random disconnects and a small ATT MTU that
+splits state frames over several notifications.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+import inspect
+import random
+import struct
+from typing import Any, Optional
+
+from bleak.exc import BleakError
+
+STATE_FRAME_LENGTH = 86
+# ATT MTU of a typical BLE 4.2+ link, notifications carry up to mtu - 3 bytes
+DEFAULT_MTU = 247
+
+FIRMWARE_CO2 = "co2"
+FIRMWARE_LEGACY = "legacy"
+
+# Opcodes are the fourth byte of a BE EF 04 xx command
+OP_STOP = 0x01
+OP_CHANGE_BRIGHTNESS = 0x02
+OP_TOGGLE_HEATING = 0x05
+OP_ENABLE_NIGHT_MODE = 0x06
+OP_ENABLE_HIGH_SPEED = 0x07
+OP_TOGGLE_FLOW_LOCK = 0x09
+OP_START = 0x0A
+OP_SPEED_DOWN = 0x0B
+OP_SPEED_UP = 0x0C
+OP_FLOW_IN_OFF = 0x0D
+OP_SPEED_IN_UP = 0x0E
+OP_SPEED_IN_DOWN = 0x0F
+OP_FLOW_OUT_OFF = 0x10
+OP_SPEED_OUT_UP = 0x11
+OP_SPEED_OUT_DOWN = 0x12
+OP_TOGGLE_WINTER_MODE = 0x16
+OP_AUTO_MODE = 0x18
+# BE EF 05 xx are requests
+OP_READ_STATE = 0x01
+OP_READ_DEVICE_DETAILS = 0x02
+
+
+class SimulatedAdapter:
+    """A bluetooth adapter or proxy with a limited number of connection slots."""
+
+    def __init__(self, slots: int = 3) -> None:
+        self.slots = slots
+        self.in_use = 0
+        self.connect_attempts = 0
+        self.slot_failures = 0
+
+    def acquire(self, name: str) -> None:
+        self.connect_attempts += 1
+        if self.in_use >= self.slots:
+            self.slot_failures += 1
+            raise BleakError(f"{name}: no backend with an available connection slot")
+        self.in_use += 1
+
+    def release(self) -> None:
+        self.in_use = max(0, self.in_use - 1)
+
+
+class SimulatedBLEDevice:
+    """Just enough of bleak's BLEDevice for PranaDevice."""
+
+    def __init__(self, address: str, name: str, rssi: int) -> None:
+        self.address = address
+        self.name = name
+        self.rssi = rssi
+        self.details: dict[str, Any] = {}
+        self.metadata: dict[str, Any] = {}
+
+    def __repr__(self) -> str:
+        return f"SimulatedBLEDevice({self.address}, {self.name})"
+
+
+class SimulatedPrana:
+    """State model of one ventilator plus the link quality used to reach it."""
+
+    def __init__(
+        self,
+        address: str = "00:11:22:33:44:55",
+        name: str = "PRNA-SIM",
+        firmware: str = FIRMWARE_CO2,
+        has_sensors: bool = True,
+        rssi: int = -70,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        connect_latency: float = 0.0,
+        loss: float = 0.0,
+        disconnect_rate: float = 0.0,
+        connect_failure_rate: float = 0.0,
+        seed: Optional[int] = None,
+        adapter: Optional[SimulatedAdapter] = None,
+        mtu: int = DEFAULT_MTU,
+    ) -> None:
+        self.address = address
+        self.firmware = firmware
+        self.has_sensors = has_sensors
+        self.latency = latency
+        self.jitter = jitter
+        self.connect_latency = connect_latency
+        self.loss = loss
+        self.disconnect_rate = disconnect_rate
+        self.connect_failure_rate = connect_failure_rate
+        self.random = random.Random(seed)
+        self.adapter = adapter
+        self.mtu = mtu
+        self.ble_device = SimulatedBLEDevice(address, name, rssi)
+
+        # Device state
+        self.is_on = False
+        self.speed_locked = 3
+        self.speed_in = 3
+        self.speed_out = 3
+        self.flows_locked = True
+        self.night_mode = False
+        self.auto_mode = False
+        self.mini_heating_enabled = False
+        self.winter_mode_enabled = False
+        self.is_input_fan_on = True
+        self.is_output_fan_on = True
+        self.brightness = 6
+        self.co2 = 650
+        self.voc = 120
+        self.temperature_in = 21.5
+        self.temperature_out = 4.2
+        self.humidity = 45
+        self.pressure = 748
+
+        # Counters
+        self.connects = 0
+        self.connect_attempts = 0
+        self.writes = 0
+        self.notifications = 0
+        self.dropped = 0
+        self.disconnects = 0
+        self.errors = 0
+        self.client: Optional[SimulatedBleakClient] = None
+
+    def attach(self, device: Any) -> None:
+        """Route a PranaDevice's connections to this simulated device."""
+        device._device = self.ble_device
+        device._establish_connection = self.establish_connection
+
+    async def establish_connection(
+        self,
+        client_class: Any,
+        device: Any,
+        name: str,
+        disconnected_callback: Optional[Callable[[Any], None]] = None,
+        **kwargs: Any,
+    ) -> "SimulatedBleakClient":
+        """Drop-in replacement for bleak_retry_connector.establish_connection."""
+        self.connect_attempts += 1
+        if self.adapter is not None:
+            try:
+                self.adapter.acquire(name)
+            except BleakError:
+                self.errors += 1
+                raise
+        try:
+            await self.delay(self.connect_latency)
+            if self.random.random() < self.connect_failure_rate:
+                raise BleakError(f"{name}: simulated connection failure")
+        except BaseException:
+            self.errors += 1
+            if self.adapter is not None:
+                self.adapter.release()
+            raise
+        self.connects += 1
+        self.client = SimulatedBleakClient(self, disconnected_callback)
+        return self.client
+
+    async def delay(self, base: float) -> None:
+        """Sleep for base seconds plus random jitter."""
+        if base or self.jitter:
+            await asyncio.sleep(max(0.0, base + self.random.uniform(-self.jitter, self.jitter)))
+
+    @property
+    def speed(self) -> int:
+        return self.speed_locked if self.flows_locked else (self.speed_in + self.speed_out) // 2
+
+    def _set_speed(self, speed: int) -> None:
+        self.speed_locked = self.speed_in = self.speed_out = min(max(speed, 1), 10)
+        self.night_mode = False
+
+    def handle(self, command: bytes) -> bool:
+        """Apply one command; return True if it asks for a state frame."""
+        if len(command) < 4 or command[:2] != b"\xbe\xef":
+            return False
+        kind, op = command[2], command[3]
+        if kind == 0x05:
+            return op == OP_READ_STATE
+        if kind != 0x04:
+            return False
+
+        if op == OP_STOP:
+            self.is_on = False
+        elif op == OP_START:
+            self.is_on = True
+        elif op == OP_SPEED_UP:
+            if self.flows_locked:
+                self._set_speed(self.speed_locked + 1)
+            else:
+                self.speed_in = min(self.speed_in + 1, 10)
+                self.speed_out = min(self.speed_out + 1, 10)
+        elif op == OP_SPEED_DOWN:
+            if self.flows_locked:
+                self._set_speed(self.speed_locked - 1)
+            else:
+                self.speed_in = max(self.speed_in - 1, 1)
+                self.speed_out = max(self.speed_out - 1, 1)
+        elif op == OP_SPEED_IN_UP:
+            self.speed_in = min(self.speed_in + 1, 10)
+        elif op == OP_SPEED_IN_DOWN:
+            self.speed_in = max(self.speed_in - 1, 1)
+        elif op == OP_SPEED_OUT_UP:
+            self.speed_out = min(self.speed_out + 1, 10)
+        elif op == OP_SPEED_OUT_DOWN:
+            self.speed_out = max(self.speed_out - 1, 1)
+        elif op == OP_ENABLE_HIGH_SPEED:
+            self._set_speed(10)
+        elif op == OP_ENABLE_NIGHT_MODE:
+            self._set_speed(1)
+            self.night_mode = True
+        elif op == OP_TOGGLE_FLOW_LOCK:
+            self.flows_locked = not self.flows_locked
+        elif op == OP_TOGGLE_HEATING:
+            self.mini_heating_enabled = not self.mini_heating_enabled
+        elif op == OP_TOGGLE_WINTER_MODE:
+            self.winter_mode_enabled = not self.winter_mode_enabled
+        elif op == OP_AUTO_MODE:
+            self.auto_mode = not self.auto_mode
+        elif op == OP_FLOW_IN_OFF:
+            self.is_input_fan_on = not self.is_input_fan_on
+        elif op == OP_FLOW_OUT_OFF:
+            self.is_output_fan_on = not self.is_output_fan_on
+        elif op == OP_CHANGE_BRIGHTNESS:
+            self.brightness = self.brightness % 6 + 1
+        return False
+
+    def _drift_sensors(self) -> None:
+        """Move the sensor readings a little, ventilation pulls CO2 down."""
+        rnd = self.random
+        target = 450 + (0 if self.is_on else 600) + (10 - self.speed) * 40 * self.is_on
+        self.co2 = int(min(max(self.co2 + (target - self.co2) * 0.05 + rnd.gauss(0, 8), 400), 5000))
+        self.voc = int(min(max(self.voc + rnd.gauss(0, 4), 0), 2000))
+        self.temperature_in = round(self.temperature_in + rnd.choice((-0.1, 0, 0, 0.1)), 1)
+        self.temperature_out = round(self.temperature_out + rnd.choice((-0.1, 0, 0, 0.1)), 1)
+        self.humidity = int(min(max(self.humidity + rnd.choice((-1, 0, 0, 0, 1)), 10), 95))
+
+    def state_frame(self) -> bytes:
+        """Encode the current state the way the device answers READ_STATE."""
+        self._drift_sensors()
+        data = bytearray(STATE_FRAME_LENGTH)
+        data[0:4] = b"\xbe\xef\x05\x01"
+        data[10] = self.is_on
+        data[12] = 1 << (self.brightness - 1)
+        data[14] = self.mini_heating_enabled
+        data[16] = self.night_mode
+        data[20] = self.auto_mode
+        data[22] = self.flows_locked
+        data[26] = self.speed_locked * 10
+        data[28] = self.is_input_fan_on
+        data[30] = self.speed_in * 10
+        data[32] = self.is_output_fan_on
+        data[34] = self.speed_out * 10
+        data[42] = self.winter_mode_enabled
+        if not self.has_sensors:
+            data[60] = 128
+            return bytes(data)
+
+        data[60] = self.humidity + 128
+        data[78] = self.pressure - 512
+        if self.firmware == FIRMWARE_CO2:
+            # The two top bits are flags the decoder masks away
+            struct.pack_into(">H", data, 61, 0x4000 | self.co2)
+            struct.pack_into(">H", data, 63, 0x4000 | self.voc)
+            struct.pack_into(">H", data, 51, round(self.temperature_in * 10) & 0x3FFF)
+            struct.pack_into(">H", data, 54, round(self.temperature_out * 10) & 0x3FFF)
+        else:
+            data[49] = min(max(round(self.temperature_in * 10), 0), 255)
+            data[55] = min(max(round(self.temperature_out * 10), 0), 255)
+        return bytes(data)
+
+
+class SimulatedBleakClient:
+    """Fake BleakClientWithServiceCache bound to one SimulatedPrana."""
+
+    def __init__(
+        self, device: SimulatedPrana, disconnected_callback: Optional[Callable[[Any], None]]
+    ) -> None:
+        self._sim = device
+        self._disconnected_callback = disconnected_callback
+        self._notify_callback: Optional[Callable[[int, bytearray], Any]] = None
+        self._connected = True
+        self._tasks: set[asyncio.Task] = set()
+        self.address = device.address
+        self.services = None
+
+    @property
+    def is_connected(self) -> bool:
+        return self._connected
+
+    @property
+    def mtu_size(self) -> int:
+        return self._sim.mtu
+
+    def _check_link(self) -> None:
+        if not self._connected:
+            self._sim.errors += 1
+            raise BleakError("Not connected")
+        if self._sim.random.random() < self._sim.disconnect_rate:
+            self._sim.disconnects += 1
+            self._close()
+            self._sim.errors += 1
+            raise BleakError("Simulated disconnect")
+
+    def _close(self) -> None:
+        """Mark the link down, free the adapter slot and tell the owner."""
+        self._connected = False
+        if self._sim.adapter is not None:
+            self._sim.adapter.release()
+        if self._disconnected_callback is not None:
+            self._disconnected_callback(self)
+
+    async def start_notify(self, uuid: str, callback: Callable[[int, bytearray], Any]) -> None:
+        self._check_link()
+        self._notify_callback = callback
+
+    async def stop_notify(self, uuid: str) -> None:
+        self._notify_callback = None
+
+    async def disconnect(self) -> bool:
+        if self._connected:
+            self._close()
+        return True
+
+    async def write_gatt_char(self, uuid: str, data: bytes, response: bool = False) -> None:
+        sim = self._sim
+        self._check_link()
+        sim.writes += 1
+        if not response and sim.random.random() < sim.loss:
+            sim.dropped += 1
+            return
+        if sim.handle(bytes(data)):
+            self._schedule_notification(sim.state_frame())
+        if response:
+            await sim.delay(sim.latency)
+            self._check_link()
+
+    def _schedule_notification(self, frame: bytes) -> None:
+        task = asyncio.get_running_loop().create_task(self._notify(frame))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _notify(self, frame: bytes) -> None:
+        sim = self._sim
+        await sim.delay(sim.latency)
+        if not self._connected or self._notify_callback is None:
+            return
+        if sim.random.random() < sim.loss:
+            sim.dropped += 1
+            return
+        sim.notifications += 1
+        payload = sim.mtu - 3
+        for start in range(0, len(frame), payload):
+            if self._notify_callback is None:
+                return
+            result = self._notify_callback(0, bytearray(frame[start : start + payload]))
+            if inspect.isawaitable(result):
+                await result
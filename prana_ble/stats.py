@@ -0,0 +1,88 @@
+"""Per-device performance counters and latency histograms."""
+from __future__ import annotations
+
+from bisect import bisect_left
+from typing import Any, Sequence
+
+# Upper bounds in seconds, the last bucket counts everything above
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+RETRY_BUCKETS = (0, 1, 2, 3, 5, 10)
+
+
+class Histogram:
+    """Fixed-bucket histogram with count, sum and max."""
+
+    __slots__ = ("bounds", "counts", "count", "sum", "max")
+
+    def __init__(self, bounds: Sequence[float] = LATENCY_BUCKETS) -> None:
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def mean(self) -> float | None:
+        return self.sum / self.count if self.count else None
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.mean, 6) if self.count else None,
+            "max": round(self.max, 6),
+            "buckets": {
+                **{str(bound): count for bound, count in zip(self.bounds, self.counts)},
+                "+Inf": self.counts[-1],
+            },
+        }
+
+
+class DeviceStats:
+    """Everything measured about the link to one device."""
+
+    def __init__(self) -> None:
+        self.connect_time = Histogram()
+        self.write_time = Histogram()
+        self.notify_to_entity = Histogram()
+        # One observation per command, with its reconnects and retries
+        self.command_time = Histogram()
+        self.retries_per_operation = Histogram(RETRY_BUCKETS)
+        self.connects = 0
+        self.connect_failures = 0
+        self.retries = 0
+        self.operation_failures = 0
+        self.disconnects_expected = 0
+        self.disconnects_unexpected = 0
+        self.half_open_links = 0
+        self.frames_received = 0
+        self.frames_deduplicated = 0
+        self.frames_reassembled = 0
+        self.fragments_discarded = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "connects": self.connects,
+            "connect_failures": self.connect_failures,
+            "retries": self.retries,
+            "operation_failures": self.operation_failures,
+            "disconnects_expected": self.disconnects_expected,
+            "disconnects_unexpected": self.disconnects_unexpected,
+            "half_open_links": self.half_open_links,
+            "frames_received": self.frames_received,
+            "frames_deduplicated": self.frames_deduplicated,
+            "frames_reassembled": self.frames_reassembled,
+            "fragments_discarded": self.fragments_discarded,
+            "connect_time": self.connect_time.as_dict(),
+            "write_time": self.write_time.as_dict(),
+            "notify_to_entity": self.notify_to_entity.as_dict(),
+            "command_time": self.command_time.as_dict(),
+            "retries_per_operation": self.retries_per_operation.as_dict(),
+        }
@@ -0,0 +1,122 @@
+"""On-demand cProfile runs of the event loop for the prana.profile service.
+
+The profiler is only created for the duration of a run, so nothing is
+measured or slowed down otherwise. It sees everything the event loop
+thread executes; the summary picks out the integration's hot paths while
+the .prof file keeps the full picture for snakeviz or pstats. Coroutines
+are only timed while they run, so time spent waiting on BLE is reported
+separately from the link statistics.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Iterable
+import os
+import time
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN
+
+if TYPE_CHECKING:
+    import cProfile
+
+    from .coordinator import PranaCoordinator
+
+PROFILE_DIR = "prana_profiles"
+DATA_PROFILING = f"{DOMAIN}_profiling"
+INTEGRATION_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Summary name -> (file below the integration directory or None for any, function)
+HOT_PATHS = {
+    "parse_state": ("prana_ble/codec.py", "parse_state"),
+    "notification": ("prana_ble/client.py", "_notification_handler"),
+    "coordinator_state": ("coordinator.py", "_handle_state"),
+    "entity_writes": (None, "_handle_coordinator_update"),
+    "retry_decorator": ("prana_ble/client.py", "_async_wrap_retry_bluetooth_connection_error"),
+    "gatt_write": ("prana_ble/client.py", "_timed_write"),
+    "connect": ("prana_ble/client.py", "_ensure_connected"),
+}
+
+
+def _link_totals(coordinators: Iterable[PranaCoordinator]) -> dict[str, float]:
+    totals = {"writes": 0, "write_seconds": 0.0, "connects": 0, "connect_seconds": 0.0}
+    for coordinator in coordinators:
+        totals["writes"] += coordinator.stats.write_time.count
+        totals["write_seconds"] += coordinator.stats.write_time.sum
+        totals["connects"] += coordinator.stats.connect_time.count
+        totals["connect_seconds"] += coordinator.stats.connect_time.sum
+    return totals
+
+
+def _summarize(profiler: cProfile.Profile, path: str, top: int) -> dict[str, Any]:
+    """Write the stats file and sum up the integration's functions (executor)."""
+    import pstats
+
+    profiler.dump_stats(path)
+    stats = pstats.Stats(profiler).stats  # type: ignore[attr-defined]
+    own = []
+    hot_paths = {name: {"calls": 0, "cumtime_ms": 0.0} for name in HOT_PATHS}
+    for (filename, line, function), (_, calls, tottime, cumtime, _) in stats.items():
+        if not filename.startswith(INTEGRATION_DIR):
+            continue
+        relative = os.path.relpath(filename, INTEGRATION_DIR).replace(os.sep, "/")
+        own.append((cumtime, tottime, calls, f"{relative}:{line}({function})"))
+        for name, (hot_file, hot_function) in HOT_PATHS.items():
+            if function == hot_function and hot_file in (None, relative):
+                hot_paths[name]["calls"] += calls
+                hot_paths[name]["cumtime_ms"] += cumtime * 1000
+    own.sort(reverse=True)
+    return {
+        "hot_paths": {
+            name: {"calls": value["calls"], "cumtime_ms": round(value["cumtime_ms"], 3)}
+            for name, value in hot_paths.items()
+        },
+        "top": [
+            {"function": function, "calls": calls, "tottime_ms": round(tottime * 1000, 3), "cumtime_ms": round(cumtime * 1000, 3)}
+            for cumtime, tottime, calls, function in own[:top]
+        ],
+    }
+
+
+async def async_profile(hass: HomeAssistant, duration: float, top: int) -> dict[str, Any]:
+    """Profile the event loop for duration seconds and return a summary."""
+    import cProfile
+
+    if hass.data.get(DATA_PROFILING):
+        raise HomeAssistantError("A Prana profile is already running")
+    hass.data[DATA_PROFILING] = True
+    coordinators = list(hass.data.get(DOMAIN, {}).values())
+    directory = hass.config.path(PROFILE_DIR)
+    path = os.path.join(directory, f"prana_{dt_util.utcnow().strftime('%Y%m%dT%H%M%S')}.prof")
+    try:
+        await hass.async_add_executor_job(os.makedirs, directory, 0o755, True)
+        link_before = _link_totals(coordinators)
+        profiler = cProfile.Profile()
+        start = time.monotonic()
+        try:
+            profiler.enable()
+        except ValueError as err:
+            # Another profiler, e.g. the profiler integration, is active
+            raise HomeAssistantError(f"Cannot start profiling: {err}") from err
+        try:
+            await asyncio.sleep(duration)
+        finally:
+            profiler.disable()
+        elapsed = time.monotonic() - start
+        link_after = _link_totals(coordinators)
+        summary = await hass.async_add_executor_job(_summarize, profiler, path, top)
+    finally:
+        hass.data.pop(DATA_PROFILING, None)
+
+    return {
+        "file": path,
+        "duration": round(elapsed, 3),
+        **summary,
+        "ble": {
+            key: round(link_after[key] - link_before[key], 3) for key in link_before
+        },
+    }
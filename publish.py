@@ -0,0 +1,85 @@
+"""Significant-change filtering of sensor values before entities see them."""
+from __future__ import annotations
+
+from collections.abc import Mapping
+from typing import Any, Optional
+
+from .const import (
+    CONF_DEADBAND_CO2,
+    CONF_DEADBAND_HUMIDITY,
+    CONF_DEADBAND_PRESSURE,
+    CONF_DEADBAND_TEMPERATURE,
+    CONF_DEADBAND_VOC,
+    CONF_MAX_PUBLISH_INTERVAL,
+    CONF_MIN_PUBLISH_INTERVAL,
+    DEFAULT_DEADBAND_CO2,
+    DEFAULT_DEADBAND_HUMIDITY,
+    DEFAULT_DEADBAND_PRESSURE,
+    DEFAULT_DEADBAND_TEMPERATURE,
+    DEFAULT_DEADBAND_VOC,
+    DEFAULT_MAX_PUBLISH_INTERVAL,
+    DEFAULT_MIN_PUBLISH_INTERVAL,
+)
+
+
+class SensorPublisher:
+    """Decide which raw sensor values are worth a state write.
+
+    A value is published when it moved at least its deadband away from the
+    last published value, but never sooner than min_interval seconds after
+    the previous publish of that sensor. Once max_interval seconds passed the
+    current value is published regardless, so a slowly drifting reading
+    still reaches the recorder.
+    """
+
+    def __init__(
+        self,
+        deadbands: Mapping[str, float],
+        min_interval: float = DEFAULT_MIN_PUBLISH_INTERVAL,
+        max_interval: float = DEFAULT_MAX_PUBLISH_INTERVAL,
+    ) -> None:
+        self.deadbands = dict(deadbands)
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.published: dict[str, Any] = {}
+        self._published_at: dict[str, float] = {}
+
+    @classmethod
+    def from_options(cls, options: Mapping[str, Any]) -> "SensorPublisher":
+        """Build a publisher from config entry options."""
+        temperature = options.get(CONF_DEADBAND_TEMPERATURE, DEFAULT_DEADBAND_TEMPERATURE)
+        return cls(
+            {
+                "co2": options.get(CONF_DEADBAND_CO2, DEFAULT_DEADBAND_CO2),
+                "voc": options.get(CONF_DEADBAND_VOC, DEFAULT_DEADBAND_VOC),
+                "temperature_in": temperature,
+                "temperature_out": temperature,
+                "humidity": options.get(CONF_DEADBAND_HUMIDITY, DEFAULT_DEADBAND_HUMIDITY),
+                "pressure": options.get(CONF_DEADBAND_PRESSURE, DEFAULT_DEADBAND_PRESSURE),
+            },
+            options.get(CONF_MIN_PUBLISH_INTERVAL, DEFAULT_MIN_PUBLISH_INTERVAL),
+            options.get(CONF_MAX_PUBLISH_INTERVAL, DEFAULT_MAX_PUBLISH_INTERVAL),
+        )
+
+    def _significant(self, key: str, value: Any, last: Any) -> bool:
+        if value is None or last is None:
+            return value is not last
+        # Tolerance keeps 0.1 °C steps from falling just short of the deadband
+        return value != last and abs(value - last) >= self.deadbands.get(key, 0) - 1e-9
+
+    def update(self, values: Optional[Mapping[str, Any]], now: float) -> bool:
+        """Offer a new set of raw values; return True if anything was published."""
+        changed = False
+        for key, value in (values or {}).items():
+            published_at = self._published_at.get(key)
+            if published_at is not None:
+                elapsed = now - published_at
+                if elapsed < self.min_interval:
+                    continue
+                if elapsed < self.max_interval and not self._significant(key, value, self.published[key]):
+                    continue
+            self._published_at[key] = now
+            if self.published.get(key, ...) != value:
+                self.published[key] = value
+                changed = True
+        return changed
@@ -0,0 +1,83 @@
+"""Runtime and airflow accumulators built from the state stream."""
+from __future__ import annotations
+
+from array import array
+from collections.abc import Mapping
+from typing import Any, Optional
+
+from .const import AIRFLOW_PER_SPEED
+
+# Gaps longer than this between frames are not counted, the device state is unknown
+MAX_FRAME_GAP = 120
+SPEED_LEVELS = 10
+
+
+class RuntimeAccumulators:
+    """Hours per speed level, heater and winter mode hours and moved air volume.
+
+    Each frame credits the time elapsed since the previous frame to the
+    state the previous frame reported, so an update is O(1) no matter how
+    long the device has been running.
+    """
+
+    def __init__(self) -> None:
+        self.speed_hours = array("d", [0.0]) * (SPEED_LEVELS + 1)
+        self.heater_hours = 0.0
+        self.winter_hours = 0.0
+        self.air_volume = 0.0
+        self._last: Optional[tuple[float, int, bool, bool, float]] = None
+
+    @property
+    def total_hours(self) -> float:
+        """Hours the ventilator was running at any speed."""
+        return sum(self.speed_hours[1:])
+
+    def update(
+        self,
+        now: float,
+        is_on: Optional[bool],
+        speed: Optional[int],
+        heater: Optional[bool],
+        winter: Optional[bool],
+        speed_in: Optional[int],
+        speed_out: Optional[int],
+    ) -> None:
+        """Credit the time since the previous frame and remember the current state."""
+        if self._last is not None:
+            last_ts, last_speed, last_heater, last_winter, last_flow = self._last
+            elapsed = now - last_ts
+            if 0 < elapsed <= MAX_FRAME_GAP:
+                hours = elapsed / 3600
+                self.speed_hours[last_speed] += hours
+                if last_heater:
+                    self.heater_hours += hours
+                if last_winter:
+                    self.winter_hours += hours
+                self.air_volume += last_flow * hours
+
+        speed = min(max(int(speed or 0), 0), SPEED_LEVELS) if is_on else 0
+        flow = 0.0
+        if is_on:
+            # Exchanged air is the mean of the supply and extract flows
+            flow = (AIRFLOW_PER_SPEED[min(speed_in or 0, SPEED_LEVELS)]
+                    + AIRFLOW_PER_SPEED[min(speed_out or 0, SPEED_LEVELS)]) / 2
+        self._last = (now, speed, bool(heater), bool(winter), flow)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the totals in a form suitable for storage."""
+        return {
+            "speed_hours": list(self.speed_hours),
+            "heater_hours": self.heater_hours,
+            "winter_hours": self.winter_hours,
+            "air_volume": self.air_volume,
+        }
+
+    def restore(self, data: Optional[Mapping[str, Any]]) -> None:
+        """Load totals saved by as_dict."""
+        if not data:
+            return
+        for level, hours in enumerate(data.get("speed_hours", [])[: SPEED_LEVELS + 1]):
+            self.speed_hours[level] = hours
+        self.heater_hours = data.get("heater_hours", 0.0)
+        self.winter_hours = data.get("winter_hours", 0.0)
+        self.air_volume = data.get("air_volume", 0.0)
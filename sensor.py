@@ -0,0 +1,264 @@
+"""Support for Prana sensors."""
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+import time
+from typing import Any
+
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.const import (
+    CONCENTRATION_PARTS_PER_BILLION,
+    CONCENTRATION_PARTS_PER_MILLION,
+    PERCENTAGE,
+    SIGNAL_STRENGTH_DECIBELS_MILLIWATT,
+    EntityCategory,
+    UnitOfPressure,
+    UnitOfTemperature,
+    UnitOfTime,
+    UnitOfVolume,
+)
+from homeassistant.core import callback
+from homeassistant.helpers import device_registry
+from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .const import DOMAIN
+from .coordinator import PranaCoordinator
+from .history import HISTORY_ATTRIBUTES
+from .runtime import SPEED_LEVELS
+from .prana_ble.stats import Histogram
+
+
+def _sensor_value(key: str) -> Callable[[PranaCoordinator], Any]:
+    """Read the last published value of one sensor."""
+    return lambda coordinator: coordinator.publisher.published.get(key)
+
+
+def _mean_ms(histogram: Histogram) -> float | None:
+    """Return the mean of a latency histogram in milliseconds."""
+    return round(histogram.mean * 1000, 1) if histogram.count else None
+
+
+@dataclass(frozen=True, kw_only=True)
+class PranaSensorEntityDescription(SensorEntityDescription):
+    """Describes a Prana sensor."""
+
+    value_fn: Callable[[PranaCoordinator], Any]
+
+
+SENSOR_TYPES: tuple[PranaSensorEntityDescription, ...] = (
+    PranaSensorEntityDescription(
+        key="co2",
+        name="CO2",
+        device_class=SensorDeviceClass.CO2,
+        native_unit_of_measurement=CONCENTRATION_PARTS_PER_MILLION,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=_sensor_value("co2"),
+    ),
+    PranaSensorEntityDescription(
+        key="voc",
+        name="VOC",
+        icon="mdi:gauge",
+        native_unit_of_measurement=CONCENTRATION_PARTS_PER_BILLION,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=_sensor_value("voc"),
+    ),
+    PranaSensorEntityDescription(
+        key="temperature_in",
+        name="Temperature in",
+        device_class=SensorDeviceClass.TEMPERATURE,
+        native_unit_of_measurement=UnitOfTemperature.CELSIUS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=_sensor_value("temperature_in"),
+    ),
+    PranaSensorEntityDescription(
+        key="temperature_out",
+        name="Temperature out",
+        device_class=SensorDeviceClass.TEMPERATURE,
+        native_unit_of_measurement=UnitOfTemperature.CELSIUS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=_sensor_value("temperature_out"),
+    ),
+    PranaSensorEntityDescription(
+        key="humidity",
+        name="Humidity",
+        device_class=SensorDeviceClass.HUMIDITY,
+        native_unit_of_measurement=PERCENTAGE,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=_sensor_value("humidity"),
+    ),
+    PranaSensorEntityDescription(
+        key="pressure",
+        name="Pressure",
+        device_class=SensorDeviceClass.PRESSURE,
+        native_unit_of_measurement=UnitOfPressure.MMHG,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=_sensor_value("pressure"),
+    ),
+    PranaSensorEntityDescription(
+        key="speed",
+        name="Speed",
+        icon="mdi:fan",
+        native_unit_of_measurement="level",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda coordinator: coordinator.speed,
+    ),
+    PranaSensorEntityDescription(
+        key="rssi",
+        name="Signal strength",
+        device_class=SensorDeviceClass.SIGNAL_STRENGTH,
+        native_unit_of_measurement=SIGNAL_STRENGTH_DECIBELS_MILLIWATT,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        value_fn=lambda coordinator: coordinator.rssi,
+    ),
+    PranaSensorEntityDescription(
+        key="runtime",
+        name="Runtime",
+        icon="mdi:timer-outline",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.HOURS,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda coordinator: round(coordinator.runtime.total_hours, 2),
+    ),
+    PranaSensorEntityDescription(
+        key="heater_runtime",
+        name="Heater runtime",
+        icon="mdi:radiator",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.HOURS,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda coordinator: round(coordinator.runtime.heater_hours, 2),
+    ),
+    PranaSensorEntityDescription(
+        key="winter_mode_runtime",
+        name="Winter mode runtime",
+        icon="mdi:snowflake",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.HOURS,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda coordinator: round(coordinator.runtime.winter_hours, 2),
+    ),
+    PranaSensorEntityDescription(
+        key="air_volume",
+        name="Air volume",
+        icon="mdi:weather-windy",
+        device_class=SensorDeviceClass.VOLUME,
+        native_unit_of_measurement=UnitOfVolume.CUBIC_METERS,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda coordinator: round(coordinator.runtime.air_volume),
+    ),
+    PranaSensorEntityDescription(
+        key="connect_time",
+        name="Connect time",
+        icon="mdi:timer-sand",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        value_fn=lambda coordinator: _mean_ms(coordinator.stats.connect_time),
+    ),
+    PranaSensorEntityDescription(
+        key="write_time",
+        name="Write time",
+        icon="mdi:timer-sand",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        value_fn=lambda coordinator: _mean_ms(coordinator.stats.write_time),
+    ),
+    PranaSensorEntityDescription(
+        key="retries",
+        name="Retries",
+        icon="mdi:reload-alert",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        value_fn=lambda coordinator: coordinator.stats.retries,
+    ),
+    PranaSensorEntityDescription(
+        key="unexpected_disconnects",
+        name="Unexpected disconnects",
+        icon="mdi:bluetooth-off",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        value_fn=lambda coordinator: coordinator.stats.disconnects_unexpected,
+    ),
+    *(
+        PranaSensorEntityDescription(
+            key=f"runtime_speed_{level}",
+            name=f"Runtime speed {level}",
+            icon="mdi:timer-outline",
+            device_class=SensorDeviceClass.DURATION,
+            native_unit_of_measurement=UnitOfTime.HOURS,
+            state_class=SensorStateClass.TOTAL_INCREASING,
+            entity_registry_enabled_default=False,
+            value_fn=lambda coordinator, level=level: round(coordinator.runtime.speed_hours[level], 2),
+        )
+        for level in range(1, SPEED_LEVELS + 1)
+    ),
+)
+
+
+async def async_setup_entry(hass, config_entry, async_add_devices):
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+
+    async_add_devices(
+        PranaSensor(coordinator, config_entry.data["name"], description)
+        for description in SENSOR_TYPES
+    )
+
+
+class PranaSensor(CoordinatorEntity, SensorEntity):
+    """Representation of a Prana sensor."""
+
+    entity_description: PranaSensorEntityDescription
+    _unrecorded_attributes = HISTORY_ATTRIBUTES
+
+    def __init__(self, coordinator: PranaCoordinator, name: str, description: PranaSensorEntityDescription):
+        """Initialize the sensor."""
+        super().__init__(coordinator)
+        self.entity_description = description
+        self._attr_name = f"{name} {description.name}"
+        self._attr_unique_id = coordinator.mac.replace(":", "") + f"_{description.key}"
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, coordinator.mac)},
+            name=name,
+            connections={(device_registry.CONNECTION_NETWORK_MAC, coordinator.mac)},
+        )
+        self._attr_native_value = description.value_fn(coordinator)
+        self._written: tuple[Any, bool] | None = None
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write state only when what this sensor shows has changed."""
+        value = self.entity_description.value_fn(self.coordinator)
+        available = self.available
+        if (value, available) == self._written:
+            return
+        self._written = (value, available)
+        self._attr_native_value = value
+        self.async_write_ha_state()
+
+    @property
+    def extra_state_attributes(self):
+        """Return rolling min/max/mean/rate from the in-memory history."""
+        if self.entity_description.key not in self.coordinator.history:
+            return None
+        return self.coordinator.history.attributes(self.entity_description.key, time.monotonic())
+
+    @property
+    def available(self):
+        """Return if the device has reported recently."""
+        return self.coordinator.available
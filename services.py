@@ -0,0 +1,263 @@
+"""Domain services for the Prana integration."""
+from __future__ import annotations
+
+import logging
+import time
+from collections.abc import Iterable, Mapping
+from typing import TYPE_CHECKING, Any
+
+import voluptuous as vol
+
+from homeassistant.const import ATTR_DEVICE_ID, ATTR_ENTITY_ID
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers import entity_registry as er
+from homeassistant.util import dt as dt_util
+
+from .concurrency import async_run_limited, default_concurrency
+from .const import (
+    DOMAIN,
+    SERVICE_APPLY_TO_GROUP,
+    SERVICE_GET_STATES,
+    SERVICE_PROFILE,
+    SERVICE_SCHEDULE,
+)
+from .prana_ble.schedule import plan_waves
+
+if TYPE_CHECKING:
+    from .coordinator import PranaCoordinator
+
+LOGGER = logging.getLogger(__name__)
+
+ATTR_STATE = "state"
+ATTR_SPEED = "speed"
+ATTR_PRESET_MODE = "preset_mode"
+ATTR_HEATING = "heating"
+ATTR_WINTER_MODE = "winter_mode"
+ATTR_MAX_CONCURRENCY = "max_concurrency"
+ATTR_TIMEOUT = "timeout"
+ATTR_DURATION = "duration"
+ATTR_AT = "at"
+ATTR_REFRESH = "refresh"
+ATTR_MAX_AGE = "max_age"
+ATTR_TOP = "top"
+
+DEFAULT_DEVICE_TIMEOUT = 60
+DEFAULT_MAX_AGE = 60
+# Seconds a wave of scheduled commands gets to apply and disconnect before the next connects
+SCHEDULE_WAVE_GAP = 5.0
+
+# Which devices and what state, shared by apply_to_group and schedule
+TARGET_FIELDS = {
+    vol.Optional(ATTR_ENTITY_ID): cv.entity_ids,
+    vol.Optional(ATTR_DEVICE_ID): vol.All(cv.ensure_list, [cv.string]),
+    vol.Optional(ATTR_STATE): vol.In(["on", "off"]),
+    vol.Optional(ATTR_SPEED): vol.All(vol.Coerce(int), vol.Range(min=0, max=10)),
+    vol.Optional(ATTR_PRESET_MODE): vol.In(["auto", "manual"]),
+    vol.Optional(ATTR_HEATING): cv.boolean,
+    vol.Optional(ATTR_WINTER_MODE): cv.boolean,
+}
+
+APPLY_TO_GROUP_SCHEMA = vol.Schema(
+    {
+        **TARGET_FIELDS,
+        vol.Optional(ATTR_MAX_CONCURRENCY): vol.All(vol.Coerce(int), vol.Range(min=1, max=50)),
+        vol.Optional(ATTR_TIMEOUT, default=DEFAULT_DEVICE_TIMEOUT): vol.All(
+            vol.Coerce(float), vol.Range(min=1)
+        ),
+    }
+)
+
+SCHEDULE_SCHEMA = vol.Schema(
+    {
+        **TARGET_FIELDS,
+        vol.Required(ATTR_AT): cv.datetime,
+        vol.Optional(ATTR_MAX_CONCURRENCY): vol.All(vol.Coerce(int), vol.Range(min=1, max=50)),
+    }
+)
+
+GET_STATES_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_ENTITY_ID): cv.entity_ids,
+        vol.Optional(ATTR_DEVICE_ID): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional(ATTR_REFRESH, default=False): cv.boolean,
+        vol.Optional(ATTR_MAX_AGE, default=DEFAULT_MAX_AGE): vol.All(vol.Coerce(float), vol.Range(min=0)),
+        vol.Optional(ATTR_MAX_CONCURRENCY): vol.All(vol.Coerce(int), vol.Range(min=1, max=50)),
+        vol.Optional(ATTR_TIMEOUT, default=DEFAULT_DEVICE_TIMEOUT): vol.All(
+            vol.Coerce(float), vol.Range(min=1)
+        ),
+    }
+)
+
+PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_DURATION, default=30): vol.All(vol.Coerce(float), vol.Range(min=1, max=600)),
+        vol.Optional(ATTR_TOP, default=20): vol.All(vol.Coerce(int), vol.Range(min=1, max=200)),
+    }
+)
+
+
+def resolve_coordinators(
+    hass: HomeAssistant,
+    entity_ids: Iterable[str] | None = None,
+    device_ids: Iterable[str] | None = None,
+) -> list[PranaCoordinator]:
+    """Map entity and device ids to coordinators, or return all when none are given."""
+    coordinators: dict[str, PranaCoordinator] = hass.data.get(DOMAIN, {})
+    if not entity_ids and not device_ids:
+        return list(coordinators.values())
+
+    entry_ids: set[str] = set()
+    entity_registry = er.async_get(hass)
+    for entity_id in entity_ids or ():
+        if (entity := entity_registry.async_get(entity_id)) and entity.config_entry_id:
+            entry_ids.add(entity.config_entry_id)
+    device_registry = dr.async_get(hass)
+    for device_id in device_ids or ():
+        if device := device_registry.async_get(device_id):
+            entry_ids.update(device.config_entries)
+
+    return [coordinators[entry_id] for entry_id in entry_ids if entry_id in coordinators]
+
+
+def _target_state(data: Mapping[str, Any]) -> dict[str, Any]:
+    """Map the state fields of a service call to PranaDevice.apply_state arguments."""
+    target: dict[str, Any] = {
+        "speed": data.get(ATTR_SPEED),
+        "heating": data.get(ATTR_HEATING),
+        "winter_mode": data.get(ATTR_WINTER_MODE),
+    }
+    if ATTR_STATE in data:
+        target["is_on"] = data[ATTR_STATE] == "on"
+    if ATTR_PRESET_MODE in data:
+        target["auto_mode"] = data[ATTR_PRESET_MODE] == "auto"
+    return target
+
+
+async def _async_apply_to_group(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    """Apply one target state to a set of ventilators concurrently."""
+    coordinators = resolve_coordinators(
+        hass, call.data.get(ATTR_ENTITY_ID), call.data.get(ATTR_DEVICE_ID)
+    )
+    target = _target_state(call.data)
+
+    async def _apply(coordinator: PranaCoordinator) -> None:
+        await coordinator.device.apply_state(**target)
+        coordinator.async_update_listeners()
+
+    limit = call.data.get(ATTR_MAX_CONCURRENCY) or default_concurrency(hass)
+    LOGGER.debug("Applying %s to %s devices, %s at a time", target, len(coordinators), limit)
+    results = await async_run_limited(coordinators, _apply, limit, call.data[ATTR_TIMEOUT])
+    return {
+        "results": results,
+        "failed": [mac for mac, result in results.items() if not result["success"]],
+    }
+
+
+async def _async_get_states(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    """Return the in-memory state of a set of ventilators, refreshing stale ones on request."""
+    coordinators = resolve_coordinators(
+        hass, call.data.get(ATTR_ENTITY_ID), call.data.get(ATTR_DEVICE_ID)
+    )
+    response: dict[str, Any] = {}
+    if call.data[ATTR_REFRESH]:
+        now = time.monotonic()
+        stale = [
+            coordinator for coordinator in coordinators
+            if (age := coordinator.frame_age(now)) is None or age > call.data[ATTR_MAX_AGE]
+        ]
+        limit = call.data.get(ATTR_MAX_CONCURRENCY) or default_concurrency(hass)
+        LOGGER.debug("Refreshing %s of %s devices, %s at a time", len(stale), len(coordinators), limit)
+        results = await async_run_limited(
+            stale, lambda coordinator: coordinator.async_read_state(), limit, call.data[ATTR_TIMEOUT]
+        )
+        response["refreshed"] = [mac for mac, result in results.items() if result["success"]]
+        response["failed"] = [mac for mac, result in results.items() if not result["success"]]
+    now = time.monotonic()
+    response["states"] = {coordinator.mac: coordinator.snapshot(now) for coordinator in coordinators}
+    return response
+
+
+@callback
+def _async_schedule(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    """Schedule a target state on a set of ventilators, connecting ahead of time.
+
+    At most max_concurrency devices are connected ahead of time at once,
+    larger groups go in waves that end at the requested time (see
+    prana_ble.schedule).
+    """
+    now = dt_util.utcnow()
+    when = dt_util.as_utc(call.data[ATTR_AT])
+    if when <= now:
+        raise HomeAssistantError(f"{call.data[ATTR_AT]} is not in the future")
+    target = _target_state(call.data)
+    coordinators = {
+        coordinator.mac: coordinator
+        for coordinator in resolve_coordinators(hass, call.data.get(ATTR_ENTITY_ID), call.data.get(ATTR_DEVICE_ID))
+    }
+    limit = call.data.get(ATTR_MAX_CONCURRENCY) or default_concurrency(hass)
+    leads = {mac: coordinator.connect_lead() for mac, coordinator in coordinators.items()}
+
+    connect_at: dict[str, str] = {}
+    apply_times: dict[str, str] = {}
+    for wave in plan_waves(leads, limit, when, now, SCHEDULE_WAVE_GAP):
+        for mac in wave.keys:
+            connect_at[mac] = coordinators[mac].async_schedule(wave.apply_at, target, wave.lead, wave.release).isoformat()
+            apply_times[mac] = wave.apply_at.isoformat()
+    return {"at": when.isoformat(), "connect_at": connect_at, "apply_at": apply_times}
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the Prana domain services."""
+    if hass.services.has_service(DOMAIN, SERVICE_APPLY_TO_GROUP):
+        return
+
+    async def _apply_to_group(call: ServiceCall) -> ServiceResponse:
+        return await _async_apply_to_group(hass, call)
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_APPLY_TO_GROUP,
+        _apply_to_group,
+        schema=APPLY_TO_GROUP_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+    async def _get_states(call: ServiceCall) -> ServiceResponse:
+        return await _async_get_states(hass, call)
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_STATES,
+        _get_states,
+        schema=GET_STATES_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+
+    @callback
+    def _schedule(call: ServiceCall) -> ServiceResponse:
+        return _async_schedule(hass, call)
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SCHEDULE,
+        _schedule,
+        schema=SCHEDULE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+    async def _profile(call: ServiceCall) -> ServiceResponse:
+        # Imported on use, profiling is rare
+        from .profiling import async_profile
+
+        return await async_profile(hass, call.data[ATTR_DURATION], call.data[ATTR_TOP])
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_PROFILE,
+        _profile,
+        schema=PROFILE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
@@ -1,39 +1,13 @@
-from homeassistant.components.switch import (
-    DOMAIN as ENTITY_DOMAIN,
-    SwitchEntity,
-    DEVICE_CLASS_SWITCH,
-    DEVICE_CLASS_OUTLET,
-)
-
-"""Support for Prana fan."""
-from . import DOMAIN
-
-from datetime import datetime, timedelta
+"""Support for Prana switches."""
 import logging
-import math
-from homeassistant.components.fan import (
-    SUPPORT_SET_SPEED,
-    SUPPORT_DIRECTION,
-    SUPPORT_PRESET_MODE,
-    FanEntity,
-)
-
-from homeassistant.helpers.update_coordinator import (
-    CoordinatorEntity,
-    DataUpdateCoordinator,
-    UpdateFailed,
-)
-
-from homeassistant.helpers import device_registry
-from homeassistant.helpers.entity import DeviceInfo
-from homeassistant.const import STATE_OFF
+
+from homeassistant.components.switch import SwitchEntity
 from homeassistant.core import callback
-from homeassistant.helpers.dispatcher import dispatcher_send, async_dispatcher_connect
-from homeassistant.util.percentage import (
-    int_states_in_range,
-    percentage_to_ranged_value,
-    ranged_value_to_percentage,
-)
+from homeassistant.helpers.device_registry import CONNECTION_NETWORK_MAC
+from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .const import DOMAIN
 
 LOGGER = logging.getLogger(__name__)
 
@@ -65,7 +39,7 @@ class BasePranaSwitch(CoordinatorEntity, SwitchEntity):
     @property
     def available(self):
         """Return state of the fan."""
-        return self.coordinator.lastRead != None and (self.coordinator.lastRead > datetime.now() - timedelta(minutes=5))
+        return self.coordinator.available
 
     @property
     def device_info(self):
@@ -76,7 +50,7 @@ class BasePranaSwitch(CoordinatorEntity, SwitchEntity):
                 (DOMAIN, self.coordinator.mac)
             },
             name=self.name,
-            connections={(device_registry.CONNECTION_NETWORK_MAC, self.coordinator.mac)},
+            connections={(CONNECTION_NETWORK_MAC, self.coordinator.mac)},
         )
 
 class PranaHeating(BasePranaSwitch):
@@ -92,11 +66,11 @@ class PranaHeating(BasePranaSwitch):
 
     async def async_turn_on(self, **kwargs) -> None:
         """Turn on the entity."""
-        await self.coordinator.set_heating(True)
+        await self.coordinator.device.set_heating(True)
 
     async def async_turn_off(self, **kwargs) -> None:
         """Turn off the entity."""
-        await self.coordinator.set_heating(False)
+        await self.coordinator.device.set_heating(False)
     
     @property
     def unique_id(self) -> str:
@@ -121,11 +95,11 @@ class PranaWinterMode(BasePranaSwitch):
 
     async def async_turn_on(self, **kwargs) -> None:
         """Turn on the entity."""
-        await self.coordinator.set_winter_mode(True)
+        await self.coordinator.device.set_winter_mode(True)
 
     async def async_turn_off(self, **kwargs) -> None:
         """Turn off the entity."""
-        await self.coordinator.set_winter_mode(False)
+        await self.coordinator.device.set_winter_mode(False)
 
 class PranaAutoMode(BasePranaSwitch):
     @property
@@ -145,8 +119,8 @@ class PranaAutoMode(BasePranaSwitch):
 
     async def async_turn_on(self, **kwargs) -> None:
         """Turn on the entity."""
-        await self.coordinator.toggle_auto_mode()
+        await self.coordinator.device.toggle_auto_mode()
 
     async def async_turn_off(self, **kwargs) -> None:
         """Turn off the entity."""
-        await self.coordinator.toggle_auto_mode()
\ No newline at end of file
+        await self.coordinator.device.toggle_auto_mode()
\ No newline at end of file
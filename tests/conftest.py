@@ -0,0 +1,28 @@
+"""Make the HA-free prana_ble package importable without Home Assistant."""
+import os
+from pathlib import Path
+import sys
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, os.fspath(ROOT))
+
+
+class _RootAsDirectory:
+    """Collect the repository root as a plain directory.
+
+    As a package pytest would import its __init__.py, the integration,
+    which needs Home Assistant. A conftest hook only applies below its own
+    directory, so this is registered as a plugin.
+    """
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_collect_directory(self, path, parent):
+        if path == ROOT:
+            return pytest.Dir.from_parent(parent, path=path)
+        return None
+
+
+def pytest_configure(config):
+    config.pluginmanager.register(_RootAsDirectory(), "prana-root-as-directory")
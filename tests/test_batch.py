@@ -0,0 +1,53 @@
+"""The vectorized batch decoder must agree with codec.parse_state."""
+import random
+
+import pytest
+
+pytest.importorskip("numpy")
+# The simulator raises bleak errors
+pytest.importorskip("bleak")
+
+from prana_ble import batch, codec  # noqa: E402
+from prana_ble.simulator import FIRMWARE_CO2, FIRMWARE_LEGACY, STATE_FRAME_LENGTH, SimulatedPrana  # noqa: E402
+
+
+def _frames(count: int, seed: int = 1) -> list[bytes]:
+    """State frames of simulators in random states, both firmware layouts, with and without sensors."""
+    rng = random.Random(seed)
+    frames = []
+    for index in range(count):
+        sim = SimulatedPrana(
+            firmware=rng.choice((FIRMWARE_CO2, FIRMWARE_LEGACY)),
+            has_sensors=rng.random() < 0.8,
+            seed=index,
+        )
+        sim.is_on = rng.random() < 0.7
+        sim.speed_locked, sim.speed_in, sim.speed_out = (rng.randint(0, 10) for _ in range(3))
+        sim.flows_locked = rng.random() < 0.5
+        sim.night_mode = rng.random() < 0.2
+        sim.auto_mode = rng.random() < 0.3
+        sim.mini_heating_enabled = rng.random() < 0.3
+        sim.winter_mode_enabled = rng.random() < 0.3
+        sim.is_input_fan_on = rng.random() < 0.9
+        sim.is_output_fan_on = rng.random() < 0.9
+        sim.brightness = rng.randint(1, 6)
+        sim.co2 = rng.randint(400, 3000)
+        sim.voc = rng.randint(0, 1000)
+        sim.temperature_in = round(rng.uniform(5, 30), 1)
+        sim.temperature_out = round(rng.uniform(-20, 35), 1)
+        sim.humidity = rng.randint(10, 90)
+        sim.pressure = rng.randint(700, 767)
+        frames.append(sim.state_frame())
+    return frames
+
+
+def test_batch_matches_scalar_decoder():
+    frames = _frames(500)
+    # Frames the scalar decoder rejects must be rejected by the batch decoder too
+    frames.append(b"\x00" * STATE_FRAME_LENGTH)
+    frames.append(b"\xde\xad" + frames[0][2:])
+    buffer = batch.pack_frames(frames, STATE_FRAME_LENGTH)
+
+    assert batch.verify_against_scalar(buffer, STATE_FRAME_LENGTH) == []
+    columns = batch.decode_frames(buffer, STATE_FRAME_LENGTH)
+    assert int(columns["valid"].sum()) == sum(codec.parse_state(frame) is not None for frame in frames)
@@ -0,0 +1,82 @@
+"""Scheduled commands in waves must not compete for adapter slots."""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+# The simulator and PranaDevice use bleak
+pytest.importorskip("bleak_retry_connector")
+
+from prana_ble.client import PranaDevice  # noqa: E402
+from prana_ble.schedule import plan_waves  # noqa: E402
+from prana_ble.simulator import SimulatedAdapter, SimulatedPrana  # noqa: E402
+
+NOW = datetime(2024, 1, 1, 7, tzinfo=timezone.utc)
+
+
+def test_plan_ends_at_requested_time():
+    leads = {"a": 1.0, "b": 3.0, "c": 2.0, "d": 1.0, "e": 2.0}
+    end = NOW + timedelta(seconds=60)
+    waves = plan_waves(leads, 2, end, NOW, 5.0)
+
+    assert [wave.keys for wave in waves] == [["b", "c"], ["e", "a"], ["d"]]
+    assert [wave.release for wave in waves] == [True, True, False]
+    assert waves[-1].apply_at == end
+    for wave, following in zip(waves, waves[1:]):
+        # Each wave is done and disconnected before the next connects
+        assert following.connect_at - wave.apply_at == timedelta(seconds=5.0)
+
+
+def test_plan_moves_later_instead_of_overlapping():
+    end = NOW + timedelta(seconds=1)
+    waves = plan_waves({"a": 2.0, "b": 2.0}, 1, end, NOW, 5.0)
+
+    assert waves[0].apply_at == NOW
+    assert waves[1].apply_at - waves[0].apply_at == timedelta(seconds=7.0)
+
+
+async def _run(limit: int, units: int = 5, slots: int = 2) -> tuple[SimulatedAdapter, list[int]]:
+    """Warm up and apply like the coordinator; return the shared adapter and the speeds."""
+    adapter = SimulatedAdapter(slots)
+    devices = {}
+    for index in range(units):
+        sim = SimulatedPrana(f"00:00:00:00:00:{index:02X}", latency=0.005, connect_latency=0.02, adapter=adapter, seed=index)
+        devices[sim.address] = PranaDevice(sim.ble_device)
+        sim.attach(devices[sim.address])
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    now = datetime.now(timezone.utc)
+    waves = plan_waves({address: 0.2 for address in devices}, limit, now + timedelta(seconds=1.5), now, 0.3)
+
+    async def _at(moment: datetime) -> None:
+        await asyncio.sleep(max((moment - now).total_seconds() - (loop.time() - started), 0))
+
+    async def _scheduled(device: PranaDevice, wave) -> None:
+        await _at(wave.connect_at)
+        await device.async_read_state()
+        await _at(wave.apply_at)
+        await device.apply_state(speed=6)
+        if wave.release:
+            await device.async_disconnect()
+
+    try:
+        await asyncio.gather(
+            *(_scheduled(devices[address], wave) for wave in waves for address in wave.keys),
+            return_exceptions=True,
+        )
+    finally:
+        for device in devices.values():
+            await device.stop()
+    return adapter, [device.speed for device in devices.values()]
+
+
+def test_waves_fit_the_adapter_slots():
+    adapter, speeds = asyncio.run(_run(limit=2))
+    assert adapter.slot_failures == 0
+    assert speeds == [6] * 5
+
+
+def test_one_wave_runs_out_of_slots():
+    # The check above would pass trivially if five units fit two slots anyway
+    adapter, _ = asyncio.run(_run(limit=5))
+    assert adapter.slot_failures > 0